@@ -0,0 +1,145 @@
+"""Memory-budgeted LRU cache for WhisperX alignment models
+
+对齐模型按语言加载（wav2vec2，每个几百 MB 到 1GB 以上），原来加载后永久保留，
+语言一多就会耗尽内存。这里按估算的参数内存设上限，超出时淘汰最久未使用的语言：
+
+- 每种语言一把加载锁，加载慢的语言不会阻塞其它语言的命中和加载
+- 可在启动时预加载常用语言
+- 记录命中、未命中、加载耗时和淘汰次数
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """估算 torch 模型参数和缓冲区占用的字节数，无法估算时返回 0"""
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return int(total)
+    except Exception:
+        return 0
+
+
+@dataclass
+class AlignCacheStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    load_failures: int = 0
+    evictions: int = 0
+    load_seconds: float = 0.0
+    # 每种语言最近一次加载耗时
+    last_load_seconds: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'loads': self.loads,
+            'load_failures': self.load_failures,
+            'evictions': self.evictions,
+            'load_seconds': round(self.load_seconds, 2),
+            'avg_load_seconds': round(self.load_seconds / self.loads, 2) if self.loads else 0.0,
+            'last_load_seconds': {code: round(value, 2) for code, value in self.last_load_seconds.items()},
+        }
+
+
+class AlignModelCache:
+    """按语言缓存对齐模型的 LRU，总占用不超过 budget_bytes（至少保留一个模型）"""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[Any, dict]],
+        budget_bytes: int,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            loader: 同步加载函数 language_code -> (align_model, metadata)，在线程池中执行
+            budget_bytes: 内存上限
+            on_evict: 淘汰后的回调（例如释放 CUDA 缓存）
+        """
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self.on_evict = on_evict
+        self._entries: 'OrderedDict[str, Tuple[Any, dict, int]]' = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = AlignCacheStats()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries.values())
+
+    def languages(self):
+        return list(self._entries)
+
+    async def get(self, language_code: str) -> Tuple[Any, dict]:
+        code = language_code or 'en'
+        entry = self._entries.get(code)
+        if entry is not None:
+            self._entries.move_to_end(code)
+            self.stats.hits += 1
+            return entry[0], entry[1]
+
+        self.stats.misses += 1
+        lock = self._locks.setdefault(code, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(code)
+            if entry is not None:
+                # 等锁期间已被其它协程加载
+                self._entries.move_to_end(code)
+                return entry[0], entry[1]
+            return await self._load(code)
+
+    async def _load(self, code: str) -> Tuple[Any, dict]:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            model, metadata = await loop.run_in_executor(None, self.loader, code)
+        except Exception:
+            self.stats.load_failures += 1
+            raise
+        elapsed = time.perf_counter() - start
+        size = estimate_model_bytes(model)
+
+        self.stats.loads += 1
+        self.stats.load_seconds += elapsed
+        self.stats.last_load_seconds[code] = elapsed
+        self._entries[code] = (model, metadata, size)
+        print(f'[align-cache] 已加载对齐模型 {code}（{size / 1024 / 1024:.0f}MB，耗时 {elapsed:.2f}s）')
+        self._evict(keep=code)
+        return model, metadata
+
+    def _evict(self, keep: str):
+        while self.total_bytes > self.budget_bytes and len(self._entries) > 1:
+            code = next(iter(self._entries))
+            if code == keep:
+                self._entries.move_to_end(code)
+                continue
+            _, _, size = self._entries.pop(code)
+            self.stats.evictions += 1
+            print(f'[align-cache] 超出内存上限，淘汰对齐模型 {code}（{size / 1024 / 1024:.0f}MB）')
+            if self.on_evict:
+                self.on_evict(code)
+
+    async def preload(self, language_codes: Iterable[str]):
+        """预加载对齐模型，单个语言加载失败只打印警告"""
+        for code in language_codes:
+            try:
+                await self.get(code)
+            except Exception as error:
+                print(f'[align-cache] 预加载对齐模型 {code} 失败: {error}')
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.stats.as_dict(),
+            'languages': self.languages(),
+            'total_bytes': self.total_bytes,
+            'budget_bytes': self.budget_bytes,
+        }
@@ -0,0 +1,279 @@
+"""Content-addressed local audio cache
+
+NPR / VOA 流程需要的音频都经过这一个缓存：
+
+- 文件按内容 SHA-256 存放在 objects/<前两位>/<sha256><后缀>，相同内容的不同 URL 只存一份
+- 索引是缓存目录下的 SQLite（index.db）：URL 哈希 -> (sha256, ETag, Last-Modified)，以及每个对象的大小和最近访问时间
+- 再次请求同一个 URL 时带 If-None-Match / If-Modified-Since 重新验证，304 直接复用本地文件，不产生下载流量
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+
+缓存文件只读共享，调用方通过 materialize() 拿到硬链接（不同文件系统时退化为复制），
+删除自己的那份不会影响缓存。
+"""
+import asyncio
+import contextlib
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    from .downloader import discard_partial, download_to_file
+    from .http_client import get_client
+except ImportError:
+    from downloader import discard_partial, download_to_file
+    from http_client import get_client
+
+AUDIO_CACHE_ENABLED = os.getenv('AUDIO_CACHE_ENABLED', 'true').lower() == 'true'
+AUDIO_CACHE_DIR = Path(os.getenv('AUDIO_CACHE_DIR', str(Path(__file__).parent / 'audio_cache')))
+AUDIO_CACHE_MAX_BYTES = int(float(os.getenv('AUDIO_CACHE_MAX_GB', '20')) * 1024 ** 3)
+# 距上次验证不超过该秒数时直接使用本地文件，不发请求（默认 0：每次都做条件请求）
+AUDIO_CACHE_REVALIDATE_SECONDS = float(os.getenv('AUDIO_CACHE_REVALIDATE_SECONDS', '0'))
+
+
+def _url_hash(url: str) -> str:
+    return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()
+
+
+def _suffix(url: str) -> str:
+    try:
+        return Path(urlparse(url).path).suffix or '.mp3'
+    except Exception:
+        return '.mp3'
+
+
+def _link_or_copy(src: Path, dest: Path):
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class AudioCache:
+    """内容寻址的音频缓存"""
+
+    def __init__(self, root: Path = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / 'objects'
+        self.tmp_dir = self.root / 'tmp'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.db'
+        # url_hash -> [锁, 持有或等待的任务数]，没有任务使用时删除，字典不会随 URL 数增长
+        self._url_locks: Dict[str, list] = {}
+        self.stats = {'hits': 0, 'revalidated': 0, 'downloads': 0, 'downloaded_bytes': 0, 'evicted': 0}
+        self._init_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_index(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    url_hash TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    validated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    sha256 TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_sha256 ON urls(sha256)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_objects_last_access ON objects(last_access)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _lookup(self, url_hash: str) -> Optional[sqlite3.Row]:
+        conn = self._connect()
+        try:
+            return conn.execute("""
+                SELECT u.sha256, u.etag, u.last_modified, u.validated_at, o.path
+                FROM urls u JOIN objects o ON o.sha256 = u.sha256
+                WHERE u.url_hash = ?
+            """, (url_hash,)).fetchone()
+        finally:
+            conn.close()
+
+    def _touch(self, url_hash: str, sha256: str, validated: bool):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (now, sha256))
+            if validated:
+                conn.execute("UPDATE urls SET validated_at = ? WHERE url_hash = ?", (now, url_hash))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _store(self, url: str, url_hash: str, tmp_path: Path, result) -> Path:
+        """把下载好的临时文件移入 objects/，更新索引并按需淘汰"""
+        object_path = self.objects_dir / result.sha256[:2] / f'{result.sha256}{_suffix(url)}'
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        if object_path.exists():
+            tmp_path.unlink(missing_ok=True)
+        else:
+            os.replace(tmp_path, object_path)
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO objects (sha256, path, size, last_access) VALUES (?, ?, ?, ?)
+            """, (result.sha256, str(object_path), result.size, now))
+            conn.execute("""
+                INSERT OR REPLACE INTO urls (url_hash, url, sha256, etag, last_modified, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (url_hash, url, result.sha256, result.etag, result.last_modified, now))
+            conn.commit()
+        finally:
+            conn.close()
+        self._evict(keep=result.sha256)
+        return object_path
+
+    def _evict(self, keep: str):
+        """总大小超过上限时按最近访问时间淘汰，keep 为刚写入的对象"""
+        conn = self._connect()
+        try:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT sha256, path, size FROM objects WHERE sha256 != ? ORDER BY last_access ASC",
+                (keep,),
+            ).fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                Path(row['path']).unlink(missing_ok=True)
+                conn.execute("DELETE FROM objects WHERE sha256 = ?", (row['sha256'],))
+                conn.execute("DELETE FROM urls WHERE sha256 = ?", (row['sha256'],))
+                total -= row['size']
+                self.stats['evicted'] += 1
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextlib.asynccontextmanager
+    async def _url_lock(self, url_hash: str):
+        """同一 URL 的 fetch 串行执行"""
+        entry = self._url_locks.get(url_hash)
+        if entry is None:
+            entry = self._url_locks[url_hash] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._url_locks[url_hash]
+
+    async def fetch(self, url: str, max_retries: int = 3) -> Path:
+        """
+        返回 url 对应音频在缓存中的路径（只读，不要删除或修改）
+
+        已缓存时做条件请求重新验证；未缓存或源文件变化时流式下载。
+        """
+        url_hash = _url_hash(url)
+        async with self._url_lock(url_hash):
+            row = await asyncio.to_thread(self._lookup, url_hash)
+            cached_path = Path(row['path']) if row else None
+            if cached_path is not None and not cached_path.exists():
+                row, cached_path = None, None
+
+            if row and time.time() - row['validated_at'] < AUDIO_CACHE_REVALIDATE_SECONDS:
+                await asyncio.to_thread(self._touch, url_hash, row['sha256'], False)
+                self.stats['hits'] += 1
+                return cached_path
+
+            conditional = {}
+            if row:
+                if row['etag']:
+                    conditional['If-None-Match'] = row['etag']
+                if row['last_modified']:
+                    conditional['If-Modified-Since'] = row['last_modified']
+
+            # 临时文件名由 URL 决定，失败留下的 .part 下次可以续传
+            tmp_path = self.tmp_dir / f'{url_hash}{_suffix(url)}'
+            result = await download_to_file(
+                url,
+                tmp_path,
+                client=get_client(url),
+                max_retries=max_retries,
+                conditional_headers=conditional or None,
+            )
+
+            if result.not_modified:
+                await asyncio.to_thread(self._touch, url_hash, row['sha256'], True)
+                self.stats['revalidated'] += 1
+                print(f'[audio-cache] 未变化，复用缓存: {url}')
+                return cached_path
+
+            self.stats['downloads'] += 1
+            self.stats['downloaded_bytes'] += result.size
+            object_path = await asyncio.to_thread(self._store, url, url_hash, tmp_path, result)
+            discard_partial(tmp_path)
+            print(f'[audio-cache] 已缓存 {result.size} bytes: {url}')
+            return object_path
+
+    async def materialize(self, url: str, dest: Path, max_retries: int = 3) -> Path:
+        """把 url 对应的音频放到 dest（硬链接，跨文件系统时复制），调用方可自行删除 dest"""
+        dest = Path(dest)
+        # 淘汰不持有 URL 锁：fetch 返回后、链接之前对象可能刚好被淘汰，这时重新 fetch（会重新下载）
+        for attempt in range(2):
+            cached_path = await self.fetch(url, max_retries=max_retries)
+            try:
+                await asyncio.to_thread(_link_or_copy, cached_path, dest)
+                return dest
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                print(f'[audio-cache] 缓存对象已被淘汰，重新获取: {url}')
+        return dest
+
+    def work_path(self, url: str) -> Path:
+        """与缓存同一文件系统下的临时路径，适合作为 materialize 的目标（可硬链接）"""
+        return self.tmp_dir / f'work-{uuid.uuid4().hex}{_suffix(url)}'
+
+    def summary(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        finally:
+            conn.close()
+        return {**self.stats, 'objects': count, 'total_bytes': total, 'max_bytes': self.max_bytes}
+
+
+_cache: Optional[AudioCache] = None
+
+
+def get_audio_cache() -> Optional[AudioCache]:
+    """进程内共享的缓存实例，AUDIO_CACHE_ENABLED=false 时返回 None"""
+    global _cache
+    if not AUDIO_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache
@@ -15,6 +15,7 @@ from datetime import datetime, timezone
 
 # 本地模块
 from cos_service import COSService
+from http_client import close_all, get_client
 from uploader import PodcastUploader
 from translator import translate_segments, get_translator
 from whisperx_service import _process_audio_file, _cleanup_temp_file
@@ -485,81 +486,82 @@ async def generate_tts_audio_gemini(
 
     audio_segments = []
 
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        for i, chunk in enumerate(chunks):
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-
-            # 构建请求体
-            text_with_prompt = f"{prompt}\n\n{chunk}" if prompt else chunk
-
-            request_body = {
-                "contents": [{
-                    "parts": [{
-                        "text": text_with_prompt
-                    }]
-                }],
-                "generationConfig": {
-                    "response_modalities": ["AUDIO"],
-                    "speech_config": {
-                        "voice_config": {
-                            "prebuilt_voice_config": {
-                                "voice_name": voice
-                            }
+    # 走共享的按 origin 连接池（keep-alive），不再每次合成单独建连接
+    client = get_client('https://generativelanguage.googleapis.com')
+    for i, chunk in enumerate(chunks):
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+
+        # 构建请求体
+        text_with_prompt = f"{prompt}\n\n{chunk}" if prompt else chunk
+
+        request_body = {
+            "contents": [{
+                "parts": [{
+                    "text": text_with_prompt
+                }]
+            }],
+            "generationConfig": {
+                "response_modalities": ["AUDIO"],
+                "speech_config": {
+                    "voice_config": {
+                        "prebuilt_voice_config": {
+                            "voice_name": voice
                         }
                     }
                 }
             }
+        }
 
-            # 重试机制
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    response = await client.post(url, json=request_body)
-                    response.raise_for_status()
-
-                    result = response.json()
-
-                    # 提取音频数据
-                    candidates = result.get('candidates', [])
-                    if not candidates:
-                        print(f'[tts-gemini] 块 {i + 1}: 无返回结果')
-                        break
-
-                    parts = candidates[0].get('content', {}).get('parts', [])
-                    for part in parts:
-                        if 'inlineData' in part:
-                            audio_data = part['inlineData'].get('data', '')
-                            mime_type = part['inlineData'].get('mimeType', '')
-                            if audio_data:
-                                audio_content = base64.b64decode(audio_data)
-                                audio_segments.append((audio_content, mime_type))
-                                break
-
-                    if (i + 1) % 5 == 0 or i == len(chunks) - 1:
-                        print(f'[tts-gemini] 已处理 {i + 1}/{len(chunks)} 块')
-                    break  # 成功，跳出重试循环
-
-                except httpx.HTTPStatusError as e:
-                    status_code = e.response.status_code
-                    print(f'[tts-gemini] API 错误 (块 {i + 1}): {status_code}')
-                    print(f'[tts-gemini] 响应: {e.response.text[:500]}')
-
-                    # 429 配额超限：保存已完成的块并抛出特殊异常
-                    if status_code == 429:
-                        if audio_segments:
-                            print(f'[tts-gemini] 429 配额超限，保存已完成的 {len(audio_segments)} 块...')
-                            partial_path = output_path.replace('.mp3', '_partial.mp3')
-                            _save_audio_segments(audio_segments, partial_path)
-                            print(f'[tts-gemini] 已保存部分进度: {partial_path}')
-                        raise QuotaExceededError(f'配额超限，已完成 {len(audio_segments)}/{len(chunks)} 块')
+        # 重试机制
+        max_retries = 3
+        for retry in range(max_retries):
+            try:
+                response = await client.post(url, json=request_body, timeout=300.0)
+                response.raise_for_status()
+
+                result = response.json()
+
+                # 提取音频数据
+                candidates = result.get('candidates', [])
+                if not candidates:
+                    print(f'[tts-gemini] 块 {i + 1}: 无返回结果')
+                    break
+
+                parts = candidates[0].get('content', {}).get('parts', [])
+                for part in parts:
+                    if 'inlineData' in part:
+                        audio_data = part['inlineData'].get('data', '')
+                        mime_type = part['inlineData'].get('mimeType', '')
+                        if audio_data:
+                            audio_content = base64.b64decode(audio_data)
+                            audio_segments.append((audio_content, mime_type))
+                            break
+
+                if (i + 1) % 5 == 0 or i == len(chunks) - 1:
+                    print(f'[tts-gemini] 已处理 {i + 1}/{len(chunks)} 块')
+                break  # 成功，跳出重试循环
+
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                print(f'[tts-gemini] API 错误 (块 {i + 1}): {status_code}')
+                print(f'[tts-gemini] 响应: {e.response.text[:500]}')
+
+                # 429 配额超限：保存已完成的块并抛出特殊异常
+                if status_code == 429:
+                    if audio_segments:
+                        print(f'[tts-gemini] 429 配额超限，保存已完成的 {len(audio_segments)} 块...')
+                        partial_path = output_path.replace('.mp3', '_partial.mp3')
+                        _save_audio_segments(audio_segments, partial_path)
+                        print(f'[tts-gemini] 已保存部分进度: {partial_path}')
+                    raise QuotaExceededError(f'配额超限，已完成 {len(audio_segments)}/{len(chunks)} 块')
+                return False
+            except Exception as e:
+                if retry < max_retries - 1:
+                    print(f'[tts-gemini] 块 {i + 1} 失败，重试 {retry + 2}/{max_retries}: {e}')
+                    await asyncio.sleep(2)  # 等待 2 秒后重试
+                else:
+                    print(f'[tts-gemini] 请求失败 (块 {i + 1}): {e}')
                     return False
-                except Exception as e:
-                    if retry < max_retries - 1:
-                        print(f'[tts-gemini] 块 {i + 1} 失败，重试 {retry + 2}/{max_retries}: {e}')
-                        await asyncio.sleep(2)  # 等待 2 秒后重试
-                    else:
-                        print(f'[tts-gemini] 请求失败 (块 {i + 1}): {e}')
-                        return False
 
     if not audio_segments:
         print('[tts-gemini] 错误: 未获取到任何音频数据')
@@ -1122,21 +1124,24 @@ async def main():
         args.skip_translate = True
         args.skip_upload = True
 
-    success = await process_book(
-        book_path=args.book,
-        output_dir=args.output,
-        company=args.company,
-        channel=args.channel,
-        server_url=args.server_url,
-        max_words=args.max_words,
-        split_chapters=args.split_chapters,
-        tts_engine=args.tts_engine,
-        skip_tts=args.skip_tts,
-        skip_transcribe=args.skip_transcribe,
-        skip_translate=args.skip_translate,
-        skip_upload=args.skip_upload,
-        start_chapter=args.start_chapter,
-    )
+    try:
+        success = await process_book(
+            book_path=args.book,
+            output_dir=args.output,
+            company=args.company,
+            channel=args.channel,
+            server_url=args.server_url,
+            max_words=args.max_words,
+            split_chapters=args.split_chapters,
+            tts_engine=args.tts_engine,
+            skip_tts=args.skip_tts,
+            skip_transcribe=args.skip_transcribe,
+            skip_translate=args.skip_translate,
+            skip_upload=args.skip_upload,
+            start_chapter=args.start_chapter,
+        )
+    finally:
+        await close_all()
 
     return 0 if success else 1
 
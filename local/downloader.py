@@ -0,0 +1,233 @@
+"""Streaming file downloader
+
+音频文件边收边写入磁盘，不会整体读入内存：
+- 先写到 <dest>.part，完成并校验后再原子替换为 dest
+- 中断后重试或再次调用时，用 HTTP Range 从 .part 已有的位置续传；
+  带 If-Range（ETag / Last-Modified），源文件变了服务端会返回完整内容，自动从头下载
+- 校验：Content-Length / Content-Range 给出的总大小，以及可选的 expected_sha256
+- 同一个 dest 的并发下载会串行化，不同文件之间互不影响
+- 可传入条件请求头（If-None-Match / If-Modified-Since），源文件未变化时返回 not_modified
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from .http_client import get_client
+except ImportError:
+    from http_client import get_client
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))
+DOWNLOAD_TIMEOUT = float(os.getenv('DOWNLOAD_TIMEOUT', '300'))
+
+# dest 路径 -> [锁, 持有或等待的任务数]；没有任务使用时删除，长期运行的进程里不会累积，
+# 也不会把绑定在已结束事件循环上的锁留给下一次 asyncio.run
+_dest_locks: Dict[str, list] = {}
+
+
+@contextlib.asynccontextmanager
+async def _dest_lock(dest: Path):
+    key = str(dest.resolve())
+    entry = _dest_locks.get(key)
+    if entry is None:
+        entry = _dest_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _dest_locks[key]
+
+
+class DownloadError(Exception):
+    """下载失败（重试耗尽或校验不通过）"""
+
+
+@dataclass
+class DownloadResult:
+    path: Path
+    size: int
+    sha256: str
+    # 本次从 .part 续传复用的字节数
+    resumed_bytes: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # 条件请求命中 304，dest 未被写入
+    not_modified: bool = False
+
+
+def _part_paths(dest: Path):
+    part = dest.with_name(dest.name + '.part')
+    meta = dest.with_name(dest.name + '.part.json')
+    return part, meta
+
+
+def discard_partial(dest: Path):
+    """删除 dest 未完成的下载（不再需要续传时调用）"""
+    for path in _part_paths(Path(dest)):
+        path.unlink(missing_ok=True)
+
+
+def _hash_existing(path: Path) -> 'hashlib._Hash':
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+
+def _load_validator(meta: Path) -> Optional[str]:
+    try:
+        data = json.loads(meta.read_text(encoding='utf-8'))
+        return data.get('etag') or data.get('last_modified')
+    except Exception:
+        return None
+
+
+def _save_validator(meta: Path, response: httpx.Response):
+    etag = response.headers.get('etag')
+    # 弱 ETag 不能用于 If-Range
+    if etag and etag.startswith('W/'):
+        etag = None
+    data = {'etag': etag, 'last_modified': response.headers.get('last-modified')}
+    meta.write_text(json.dumps(data), encoding='utf-8')
+
+
+def _total_size(response: httpx.Response) -> Optional[int]:
+    # 压缩传输时解码后的大小与 Content-Length 不一致，无法据此校验
+    if response.headers.get('content-encoding', 'identity') != 'identity':
+        return None
+    if response.status_code == 206:
+        content_range = response.headers.get('content-range', '')
+        total = content_range.rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('content-length')
+    return int(length) if length and length.isdigit() else None
+
+
+async def _download_once(
+    client: httpx.AsyncClient,
+    url: str,
+    part: Path,
+    meta: Path,
+    conditional_headers: Optional[Dict[str, str]] = None,
+) -> Optional[Tuple[int, httpx.Headers]]:
+    """执行一次（可能是续传的）请求，返回 (复用的已有字节数, 响应头)；304 时返回 None"""
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {}
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+        validator = _load_validator(meta)
+        if validator:
+            headers['If-Range'] = validator
+    elif conditional_headers:
+        headers.update(conditional_headers)
+
+    async with client.stream('GET', url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            return None
+        if response.status_code == 416:
+            # 已有部分超出源文件大小（源文件变了），从头下载
+            part.unlink(missing_ok=True)
+            meta.unlink(missing_ok=True)
+            raise httpx.TransportError('Range not satisfiable, restarting download')
+        response.raise_for_status()
+
+        if response.status_code != 206:
+            offset = 0
+        total = _total_size(response)
+        _save_validator(meta, response)
+
+        # 收到多少写多少：aiter_bytes(chunk_size) 会攒满一块才交出，连接中途断开时
+        # 最后不满一块的数据会丢失，续传只能从更早的位置开始（小文件则完全无法续传）
+        with open(part, 'ab' if offset else 'wb') as f:
+            async for chunk in response.aiter_bytes():
+                f.write(chunk)
+
+    size = part.stat().st_size
+    if total is not None and size != total:
+        raise httpx.TransportError(f'下载不完整: {size}/{total} bytes')
+    return offset, response.headers
+
+
+async def download_to_file(
+    url: str,
+    dest: Path,
+    client: Optional[httpx.AsyncClient] = None,
+    expected_sha256: Optional[str] = None,
+    max_retries: int = 3,
+    conditional_headers: Optional[Dict[str, str]] = None,
+) -> DownloadResult:
+    """
+    流式下载 url 到 dest
+
+    Args:
+        url: 下载地址
+        dest: 目标路径，下载完成前不会出现（中间结果在 dest.part）
+        client: 复用的 httpx 客户端，为空时使用 url 所在 origin 的共享客户端
+        expected_sha256: 期望的 SHA-256，不一致时删除已下载内容并抛出 DownloadError
+        max_retries: 最大尝试次数，每次失败后从已下载的位置续传
+        conditional_headers: 条件请求头，仅在没有未完成的 .part 时发送
+
+    Returns:
+        DownloadResult
+    """
+    dest = Path(dest)
+    part, meta = _part_paths(dest)
+
+    async with _dest_lock(dest):
+        if client is None:
+            client = get_client(url)
+        outcome = None
+        last_error: Optional[Exception] = None
+        for attempt in range(max_retries):
+            try:
+                outcome = await _download_once(client, url, part, meta, conditional_headers)
+                last_error = None
+                break
+            except httpx.HTTPStatusError as e:
+                # 4xx 重试没有意义
+                if e.response.status_code < 500:
+                    raise DownloadError(f'下载失败: HTTP {e.response.status_code}') from e
+                last_error = e
+            except httpx.TransportError as e:
+                last_error = e
+            if attempt < max_retries - 1:
+                wait_time = 2 ** attempt
+                print(f'[downloader] 下载中断 (重试 {attempt + 1}/{max_retries})，{wait_time}s 后续传: {last_error}')
+                await asyncio.sleep(wait_time)
+        if last_error is not None:
+            raise DownloadError(f'下载失败（已达最大重试次数）: {last_error}') from last_error
+
+        if outcome is None:
+            return DownloadResult(path=dest, size=0, sha256='', not_modified=True)
+        resumed, headers = outcome
+
+        sha256 = (await asyncio.to_thread(_hash_existing, part)).hexdigest()
+        if expected_sha256 and sha256 != expected_sha256.lower():
+            part.unlink(missing_ok=True)
+            meta.unlink(missing_ok=True)
+            raise DownloadError(f'校验失败: sha256={sha256}, 期望 {expected_sha256}')
+
+        size = part.stat().st_size
+        os.replace(part, dest)
+        meta.unlink(missing_ok=True)
+        if resumed:
+            print(f'[downloader] 续传完成：复用已下载的 {resumed} bytes')
+        return DownloadResult(
+            path=dest,
+            size=size,
+            sha256=sha256,
+            resumed_bytes=resumed,
+            etag=headers.get('etag'),
+            last_modified=headers.get('last-modified'),
+        )
@@ -0,0 +1,115 @@
+"""Process-wide pooled HTTP clients
+
+所有本地模块共用的 httpx.AsyncClient 注册表：每个 origin（scheme + host + port）一个客户端，
+连接在多次请求之间保持 keep-alive，不再每次请求都重新握手 TLS。
+
+- 每个 origin 的连接数单独限制（HTTP_MAX_CONNECTIONS_PER_HOST），下载大文件不会占满其它服务的连接
+- 安装了 h2 时启用 HTTP/2（HTTP2_ENABLED=false 可关闭）
+- 默认超时可配置，调用方仍可在单次请求上传 timeout= 覆盖
+- 与 httpx 默认一致不跟随重定向，需要时在单次请求上传 follow_redirects=True
+- httpx 客户端绑定创建它的事件循环，注册表按事件循环隔离，
+  scheduler 每天 asyncio.run 一次也不会复用到已关闭循环上的连接
+
+用法：
+
+    client = get_client(url)
+    response = await client.get(url, timeout=30.0)
+
+进程退出前（或一次 asyncio.run 结束前）调用 await close_all() 关闭连接。
+"""
+import asyncio
+import importlib.util
+import os
+import weakref
+from typing import Dict, Tuple
+
+import httpx
+
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '8'))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv('HTTP_MAX_KEEPALIVE_PER_HOST', '8'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '300'))
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'true').lower() == 'true'
+
+_Origin = Tuple[str, str, int]
+
+# event loop -> {origin: client}
+_registry: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_Origin, httpx.AsyncClient]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http2_available() -> bool:
+    return HTTP2_ENABLED and importlib.util.find_spec('h2') is not None
+
+
+def _origin(url: str) -> _Origin:
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    return parsed.scheme, parsed.host, port
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """返回 url 所在 origin 的共享客户端（必须在事件循环中调用）"""
+    loop = asyncio.get_running_loop()
+    clients = _registry.setdefault(loop, {})
+    key = _origin(url)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = _create_client()
+        clients[key] = client
+    return client
+
+
+async def close_all():
+    """关闭当前事件循环上的所有共享客户端"""
+    clients = _registry.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+async def _benchmark(url: str, requests: int):
+    """对比每次新建客户端与共享客户端顺序请求同一个 URL 的总耗时"""
+    import time
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            (await client.get(url)).raise_for_status()
+    fresh = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client = get_client(url)
+    for _ in range(requests):
+        (await client.get(url, timeout=30.0)).raise_for_status()
+    shared = time.perf_counter() - start
+    await close_all()
+
+    print(f'[http-client] {requests} 次请求 {url}')
+    print(f'[http-client]   每次新建客户端: {fresh:.2f}s（平均 {fresh / requests * 1000:.1f}ms）')
+    print(f'[http-client]   共享连接池:     {shared:.2f}s（平均 {shared / requests * 1000:.1f}ms）')
+    if shared > 0:
+        print(f'[http-client]   节省 {(1 - shared / fresh):.0%}')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='共享 HTTP 连接池耗时对比')
+    parser.add_argument('url', type=str, help='请求的 URL，例如 https://elegantfish.online/podcast/info/check/<id>')
+    parser.add_argument('--requests', type=int, default=100, help='请求次数（默认100，对应一次 100 期的上传）')
+    args = parser.parse_args()
+    asyncio.run(_benchmark(args.url, args.requests))
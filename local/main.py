@@ -4,6 +4,7 @@ import os
 from typing import Optional
 from .processor import fetch_and_process_today_podcasts
 from .uploader import PodcastUploader
+from .http_client import close_all
 
 async def main(days: int = 1, upload: bool = True, server_url: Optional[str] = None):
     """
@@ -23,7 +24,10 @@ async def main(days: int = 1, upload: bool = True, server_url: Optional[str] = N
     
     # 获取并处理podcasts
     print(f'\n[main] 开始获取并处理前{days}天的podcasts...')
-    processed_podcasts = await fetch_and_process_today_podcasts(days=days, uploader=uploader)
+    try:
+        processed_podcasts = await fetch_and_process_today_podcasts(days=days, uploader=uploader)
+    finally:
+        await close_all()
     
     if not processed_podcasts:
         print('[main] 没有需要处理的podcasts，退出')
@@ -19,6 +19,7 @@ from whisperx_service import _process_audio_file
 from translator import translate_segments, get_translator
 from cos_service import COSService
 from uploader import PodcastUploader
+from http_client import close_all
 
 
 # ============ 配置 ============
@@ -328,11 +329,14 @@ async def main():
     server_url = args.server_url or SERVER_URL
 
     processor = NCEProcessor(server_url=server_url)
-    await processor.process_all(
-        start=args.start,
-        limit=args.limit,
-        skip_processed=not args.no_skip
-    )
+    try:
+        await processor.process_all(
+            start=args.start,
+            limit=args.limit,
+            skip_processed=not args.no_skip
+        )
+    finally:
+        await close_all()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+"""Staged pipeline executor
+
+把一批任务按阶段串起来执行：阶段之间用有界 asyncio.Queue 连接，每个阶段有自己的并发数，
+这样下载、GPU 转录、LLM 翻译、上传可以同时处理不同的 podcast。
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    单个阶段
+
+    handler 接收上一阶段的输出，返回值传给下一阶段；返回 None 表示该任务到此结束（如已跳过），
+    抛出异常表示该任务失败。
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+
+
+@dataclass
+class StageStats:
+    name: str
+    concurrency: int
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    # 处理完成后等待下游队列空位的时间（下游是瓶颈时会变大）
+    blocked_seconds: float = 0.0
+
+    def utilization(self, wall_seconds: float) -> float:
+        if wall_seconds <= 0:
+            return 0.0
+        return self.busy_seconds / (wall_seconds * self.concurrency)
+
+
+@dataclass
+class PipelineReport:
+    results: List[Any]
+    stages: List[StageStats]
+    wall_seconds: float
+    failed: int = 0
+    dropped: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def print_summary(self, prefix: str = '[pipeline]'):
+        print(f'{prefix} 各阶段利用率（总耗时 {self.wall_seconds:.1f}s）：')
+        for stats in self.stages:
+            print(
+                f'{prefix}   {stats.name:<10} 并发 {stats.concurrency}  完成 {stats.processed:>3}  '
+                f'结束 {stats.dropped:>3}  失败 {stats.failed:>3}  忙碌 {stats.busy_seconds:7.1f}s  '
+                f'等待下游 {stats.blocked_seconds:6.1f}s  利用率 {stats.utilization(self.wall_seconds):6.1%}'
+            )
+
+
+class StagedPipeline:
+    """多阶段流水线执行器"""
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 2,
+        on_error: Optional[Callable[[Any, str, BaseException], Any]] = None,
+    ):
+        """
+        Args:
+            stages: 按顺序执行的阶段
+            queue_size: 阶段之间队列的容量，限制上游最多领先下游多少个任务
+            on_error: 任务在某阶段失败时的回调 (item, stage_name, error)，用于清理临时文件等
+        """
+        if not stages:
+            raise ValueError('stages不能为空')
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+
+    async def run(self, items: Iterable[Any]) -> PipelineReport:
+        items = list(items)
+        stats = [StageStats(stage.name, max(1, stage.concurrency)) for stage in self.stages]
+        # 第一个队列不限容量：输入在内存里已经是现成的
+        queues = [asyncio.Queue()] + [asyncio.Queue(self.queue_size) for _ in self.stages[1:]]
+        results: List[tuple] = []
+        errors: List[Dict[str, Any]] = []
+
+        for index, item in enumerate(items):
+            queues[0].put_nowait((index, item))
+        for _ in range(stats[0].concurrency):
+            queues[0].put_nowait(_DONE)
+
+        async def worker(stage_index: int):
+            stage = self.stages[stage_index]
+            stage_stats = stats[stage_index]
+            inbox = queues[stage_index]
+            outbox = queues[stage_index + 1] if stage_index + 1 < len(queues) else None
+            while True:
+                entry = await inbox.get()
+                if entry is _DONE:
+                    return
+                index, item = entry
+                start = time.perf_counter()
+                try:
+                    output = await stage.handler(item)
+                except Exception as error:
+                    stage_stats.busy_seconds += time.perf_counter() - start
+                    stage_stats.failed += 1
+                    errors.append({'index': index, 'stage': stage.name, 'error': str(error)})
+                    if self.on_error:
+                        try:
+                            self.on_error(item, stage.name, error)
+                        except Exception as callback_error:
+                            print(f'[pipeline] on_error 回调失败: {callback_error}')
+                    continue
+                stage_stats.busy_seconds += time.perf_counter() - start
+
+                if output is None:
+                    stage_stats.dropped += 1
+                    continue
+                stage_stats.processed += 1
+                if outbox is None:
+                    results.append((index, output))
+                    continue
+                put_start = time.perf_counter()
+                await outbox.put((index, output))
+                stage_stats.blocked_seconds += time.perf_counter() - put_start
+
+        async def run_stage(stage_index: int):
+            workers = [
+                asyncio.create_task(worker(stage_index))
+                for _ in range(stats[stage_index].concurrency)
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                if stage_index + 1 < len(queues):
+                    for _ in range(stats[stage_index + 1].concurrency):
+                        await queues[stage_index + 1].put(_DONE)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(run_stage(i) for i in range(len(self.stages))))
+        wall_seconds = time.perf_counter() - wall_start
+
+        results.sort(key=lambda entry: entry[0])
+        return PipelineReport(
+            results=[output for _, output in results],
+            stages=stats,
+            wall_seconds=wall_seconds,
+            failed=sum(s.failed for s in stats),
+            dropped=sum(s.dropped for s in stats),
+            errors=sorted(errors, key=lambda error: error['index']),
+        )
@@ -1,7 +1,11 @@
-import httpx
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any
 
+try:
+    from .http_client import get_client
+except ImportError:
+    from http_client import get_client
+
 class PodcastFetcherService:
     
     @staticmethod
@@ -26,96 +30,96 @@ class PodcastFetcherService:
         iteration = 0
         found_dates = set()
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            headers = {
-                'accept': 'application/json',
-                'user-agent': 'NPR/1452.1 CFNetwork/3860.300.31 Darwin/25.2.0',
-                'x-supports': 'dr,up,step,music,livestream',
-                'accept-language': 'en',
-                'authorization': authorization
-            }
+        client = get_client(base_url)
+        headers = {
+            'accept': 'application/json',
+            'user-agent': 'NPR/1452.1 CFNetwork/3860.300.31 Darwin/25.2.0',
+            'x-supports': 'dr,up,step,music,livestream',
+            'accept-language': 'en',
+            'authorization': authorization
+        }
+        
+        while iteration < max_iterations and len(found_dates) < len(target_dates):
+            iteration += 1
+            response = await client.get(url, headers=headers, timeout=30.0)
+            response.raise_for_status()
+            
+            data = response.json()
+            attrs = data.get('attributes', {})
+            show_date_str = attrs.get('showDate', '')
+            
+            current_date_str = None
+            if show_date_str:
+                try:
+                    current_date_str = show_date_str.split('T')[0]
+                except:
+                    pass
             
-            while iteration < max_iterations and len(found_dates) < len(target_dates):
-                iteration += 1
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                attrs = data.get('attributes', {})
-                show_date_str = attrs.get('showDate', '')
-                
-                current_date_str = None
-                if show_date_str:
-                    try:
-                        current_date_str = show_date_str.split('T')[0]
-                    except:
-                        pass
-                
-                print(f'[podcast-fetcher] All Things Considered 当前API返回的日期: {current_date_str}')
-                
-                items = data.get('items', [])
-                if not items:
-                    print(f'[podcast-fetcher] All Things Considered API返回的items为空')
-                    break
-                
-                # 当前日期在目标日期列表中
-                if current_date_str and current_date_str in target_dates:
-                    print(f'[podcast-fetcher] All Things Considered 找到目标日期 {current_date_str}，处理items...')
-                    found_dates.add(current_date_str)
-                    for item in items:
-                        item_attrs = item.get('attributes', {})
-                        item_links = item.get('links', {})
-                        # 提取音频URL
-                        audio_url = None
-                        audio_links = item_links.get('audio', [])
-                        for link in audio_links:
-                            href = link.get('href', '')
-                            if href and '.mp3' in href:
-                                audio_url = href.split('?')[0]
-                                break
-                        
-                        if not audio_url:
-                            continue
-                        # 解析日期
-                        item_date_str = item_attrs.get('date', '')
-                        if item_date_str:
-                            try:
-                                date_part = item_date_str.split('T')[0]
-                                item_date = datetime.strptime(date_part, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                                item_date_str_formatted = item_date.strftime('%Y-%m-%d')
-                            except:
-                                item_date_str_formatted = current_date_str
-                                item_date = datetime.strptime(current_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        else:
+            print(f'[podcast-fetcher] All Things Considered 当前API返回的日期: {current_date_str}')
+            
+            items = data.get('items', [])
+            if not items:
+                print(f'[podcast-fetcher] All Things Considered API返回的items为空')
+                break
+            
+            # 当前日期在目标日期列表中
+            if current_date_str and current_date_str in target_dates:
+                print(f'[podcast-fetcher] All Things Considered 找到目标日期 {current_date_str}，处理items...')
+                found_dates.add(current_date_str)
+                for item in items:
+                    item_attrs = item.get('attributes', {})
+                    item_links = item.get('links', {})
+                    # 提取音频URL
+                    audio_url = None
+                    audio_links = item_links.get('audio', [])
+                    for link in audio_links:
+                        href = link.get('href', '')
+                        if href and '.mp3' in href:
+                            audio_url = href.split('?')[0]
+                            break
+                    
+                    if not audio_url:
+                        continue
+                    # 解析日期
+                    item_date_str = item_attrs.get('date', '')
+                    if item_date_str:
+                        try:
+                            date_part = item_date_str.split('T')[0]
+                            item_date = datetime.strptime(date_part, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                            item_date_str_formatted = item_date.strftime('%Y-%m-%d')
+                        except:
                             item_date_str_formatted = current_date_str
                             item_date = datetime.strptime(current_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        # 只处理匹配当前日期的items
-                        if item_date_str_formatted == current_date_str:
-                            title = item_attrs.get('title', '') or item_attrs.get('audioTitle', '')
-                            description = item_attrs.get('description', '')
-                            duration = item_attrs.get('duration')
-                            podcast = {
-                                'company': company,
-                                'channel': channel,
-                                'audioURL': audio_url,
-                                'title': title,
-                                'subtitle': description,
-                                'timestamp': int(item_date.timestamp()),
-                                'language': 'en',
-                                'duration': duration,
-                                'segments': []
-                            }
-                            all_episodes.append(podcast)
-                
-                links = data.get('links', {})
-                prev_links = links.get('prev', [])
-                if not prev_links:
-                    print(f'[podcast-fetcher] All Things Considered 没有prev链接，无法获取更早的数据')
-                    break                
-                prev_link = prev_links[0]
-                url = prev_link.get('href', '')
-                if not url:
-                    break
+                    else:
+                        item_date_str_formatted = current_date_str
+                        item_date = datetime.strptime(current_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                    # 只处理匹配当前日期的items
+                    if item_date_str_formatted == current_date_str:
+                        title = item_attrs.get('title', '') or item_attrs.get('audioTitle', '')
+                        description = item_attrs.get('description', '')
+                        duration = item_attrs.get('duration')
+                        podcast = {
+                            'company': company,
+                            'channel': channel,
+                            'audioURL': audio_url,
+                            'title': title,
+                            'subtitle': description,
+                            'timestamp': int(item_date.timestamp()),
+                            'language': 'en',
+                            'duration': duration,
+                            'segments': []
+                        }
+                        all_episodes.append(podcast)
+            
+            links = data.get('links', {})
+            prev_links = links.get('prev', [])
+            if not prev_links:
+                print(f'[podcast-fetcher] All Things Considered 没有prev链接，无法获取更早的数据')
+                break                
+            prev_link = prev_links[0]
+            url = prev_link.get('href', '')
+            if not url:
+                break
         
         # 按时间戳倒序排列
         all_episodes.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
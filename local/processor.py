@@ -1,12 +1,20 @@
 """Main processor for podcast fetching, transcription and translation"""
 import asyncio
 import hashlib
+import os
+from pathlib import Path
 from typing import List, Dict, Any, Optional
+from .pipeline import Stage, StagedPipeline
 from .podcast_fetcher_service import PodcastFetcherService
-from .whisperx_service import transcribe_audio_url
+from .whisperx_service import TRANSCRIBE_CONCURRENCY, download_audio, _process_audio_file, resources
 from .translator import translate_segments, get_translator
 from .cos_service import COSService
 
+# 流水线中下载/翻译/上传阶段的并发数（转录阶段固定为 1）
+PIPELINE_CONCURRENCY = int(os.getenv('PIPELINE_CONCURRENCY', '2'))
+# 阶段之间队列的容量：下载最多领先转录这么多个音频，限制临时文件占用的磁盘
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))
+
 def generate_podcast_id(company: str, channel: str, timestamp: int, audio_url: str, title: Optional[str] = None) -> str:
     normalized_company = (company or "").strip().lower()
     normalized_channel = (channel or "").strip().lower()
@@ -16,7 +24,8 @@ def generate_podcast_id(company: str, channel: str, timestamp: int, audio_url: s
     hash_obj = hashlib.sha256(content.encode('utf-8'))
     return hash_obj.hexdigest()[:32]
 
-async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, Any]:
+async def _prepare_podcast(podcast: Dict[str, Any], uploader=None) -> Optional[Dict[str, Any]]:
+    """生成podcast_id并检查服务端是否已有完整数据，已存在时返回 None"""
     audio_url = podcast.get('audioURL')
     if not audio_url:
         raise ValueError('podcast必须包含audioURL字段')
@@ -37,20 +46,30 @@ async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, A
         is_complete = await uploader.check_podcast_complete(podcast_id)
         if is_complete:
             print(f'[processor] 服务端已有完整的podcast，跳过处理：podcast ID = {podcast_id}')
-            # 返回 None 表示跳过处理
             return None
-    
-    # 如果没有找到完整的podcast，继续正常处理流程
-    temp_audio_path = None
+    return {'podcast': podcast, 'podcast_id': podcast_id, 'audio_url': audio_url}
+
+
+async def _download_podcast_audio(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    ctx['temp_audio_path'] = str(await download_audio(ctx['audio_url']))
+    return ctx
+
+
+async def _transcribe_podcast(ctx: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        transcription_result = await transcribe_audio_url(audio_url)
-        segments = transcription_result.get('segments', [])
-        detected_language = transcription_result.get('language', 'en')
-        temp_audio_path = transcription_result.get('temp_file_path')  # 获取临时文件路径
-        print(f'[processor] 转录完成：{len(segments)} 个片段')
+        transcription_result = await _process_audio_file(Path(ctx['temp_audio_path']))
     except Exception as e:
         print(f'[processor] 转录失败: {e}')
-        raise
+        raise Exception(f'转录失败: {str(e)}')
+    ctx['segments'] = transcription_result.get('segments', [])
+    ctx['language'] = transcription_result.get('language', 'en')
+    print(f'[processor] 转录完成：{len(ctx["segments"])} 个片段')
+    return ctx
+
+
+async def _translate_podcast(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    segments = ctx['segments']
+    detected_language = ctx['language']
     try:
         print(f'[processor] 开始翻译 {len(segments)} 个片段...')
         translations = await translate_segments(
@@ -72,7 +91,7 @@ async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, A
     
     # 翻译标题
     title_translation = None
-    title = podcast.get('title')
+    title = ctx['podcast'].get('title')
     if title:
         try:
             print(f'[processor] 开始翻译标题: {title}')
@@ -92,8 +111,16 @@ async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, A
                 print(f'[processor] 标题翻译为空')
         except Exception as e:
             print(f'[processor] 标题翻译失败: {e}')
-    
-    # 上传音频和segments到COS
+    ctx['title_translation'] = title_translation
+    return ctx
+
+
+def _upload_podcast_to_cos(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """上传音频和segments到COS，清理临时文件，返回完整的podcast数据"""
+    podcast = ctx['podcast']
+    podcast_id = ctx['podcast_id']
+    segments = ctx['segments']
+    temp_audio_path = ctx.get('temp_audio_path')
     cos_service = COSService()
     audio_key = None
     segments_key = None
@@ -134,25 +161,19 @@ async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, A
             raise Exception(f'上传segments到COS失败: {str(e)}')
     
     # 清理临时音频文件
-    if temp_audio_path:
-        try:
-            from pathlib import Path
-            Path(temp_audio_path).unlink(missing_ok=True)
-            print(f'[processor] 已清理临时音频文件')
-        except Exception as e:
-            print(f'[processor] 清理临时文件失败: {e}')
+    _cleanup_podcast_audio(ctx)
 
     complete_podcast = {
         'id': podcast_id,
         'company': podcast.get('company', ''),
         'channel': podcast.get('channel', ''),
         'audioKey': audio_key,
-        'rawAudioUrl': audio_url,
+        'rawAudioUrl': ctx['audio_url'],
         'title': podcast.get('title'),
-        'titleTranslation': title_translation,
+        'titleTranslation': ctx.get('title_translation'),
         'subtitle': podcast.get('subtitle'),
         'timestamp': podcast.get('timestamp', 0),
-        'language': detected_language,
+        'language': ctx['language'],
         'duration': podcast.get('duration'),
         'segmentsKey': segments_key,
         'segmentCount': len(segments) if segments else 0
@@ -161,65 +182,105 @@ async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, A
     return complete_podcast
 
 
+def _cleanup_podcast_audio(ctx: Dict[str, Any]):
+    temp_audio_path = ctx.pop('temp_audio_path', None)
+    if temp_audio_path:
+        try:
+            Path(temp_audio_path).unlink(missing_ok=True)
+            print(f'[processor] 已清理临时音频文件')
+        except Exception as e:
+            print(f'[processor] 清理临时文件失败: {e}')
+
+
+async def process_podcast(podcast: Dict[str, Any], uploader=None) -> Dict[str, Any]:
+    ctx = await _prepare_podcast(podcast, uploader=uploader)
+    if ctx is None:
+        # 返回 None 表示跳过处理
+        return None
+    await _download_podcast_audio(ctx)
+    try:
+        await _transcribe_podcast(ctx)
+        await _translate_podcast(ctx)
+        return await asyncio.to_thread(_upload_podcast_to_cos, ctx)
+    finally:
+        _cleanup_podcast_audio(ctx)
+
+
 async def process_podcasts_batch(
     podcasts: List[Dict[str, Any]],
-    max_concurrent: int = 1,
+    max_concurrent: int = PIPELINE_CONCURRENCY,
     uploader=None
 ) -> List[Dict[str, Any]]:
     """
-    批量处理podcasts，处理完一个就上传一个（如果提供了uploader）
+    批量处理podcasts：下载 -> 转录 -> 翻译 -> 上传 四个阶段流水线执行
+    
+    阶段之间用有界队列连接，转录阶段只占一个槽位（WhisperX 模型不是线程安全的；
+    CPU 多进程转录时为工作进程数），
+    其余阶段按 max_concurrent 并发，因此 GPU 转录当前 podcast 时，
+    下一个 podcast 在下载、上一个 podcast 在翻译和上传。
     
     Args:
         podcasts: podcast列表
-        max_concurrent: 最大并发数，默认1
+        max_concurrent: 下载/翻译/上传阶段的并发数
         uploader: 上传器实例，如果提供则处理完一个就上传一个
     
     Returns:
-        处理完成的podcast列表
+        处理完成的podcast列表（与输入顺序一致）
     """
-    print(f'[processor] 开始批量处理 {len(podcasts)} 个podcasts（并发数: {max_concurrent}）')
+    print(f'[processor] 开始批量处理 {len(podcasts)} 个podcasts（流水线，并发数: {max_concurrent}）')
     if uploader:
         print(f'[processor] 启用实时上传模式：处理完一个podcast就立即上传')
     
-    semaphore = asyncio.Semaphore(max_concurrent)
-    successful = []
-    failed_count = 0
-    skipped_count = 0
-    
-    async def process_with_semaphore(podcast):
-        async with semaphore:
-            try:
-                processed = await process_podcast(podcast, uploader=uploader)
-                # 如果返回 None，说明已跳过（服务端已有完整数据）
-                if processed is None:
-                    return 'skipped'
-                
-                # 如果提供了uploader，处理完立即上传
-                if uploader:
-                    print(f'[processor] 处理完成，立即上传: {processed.get("id")}')
-                    upload_success = await uploader.upload_podcast(processed)
-                    if upload_success:
-                        print(f'[processor] ✓ 上传成功: {processed.get("title", "Unknown")}')
-                    else:
-                        print(f'[processor] ✗ 上传失败: {processed.get("title", "Unknown")}')
-                
-                return processed
-            except Exception as e:
-                print(f'[processor] 处理podcast失败: {e}')
-                return 'failed'
-    
-    # 逐个处理（而不是并发），这样可以立即上传
-    for i, podcast in enumerate(podcasts, 1):
-        print(f'\n[processor] 处理进度: {i}/{len(podcasts)}')
-        result = await process_with_semaphore(podcast)
-        if result == 'skipped':
-            skipped_count += 1
-        elif result == 'failed':
-            failed_count += 1
-        elif result:
-            successful.append(result)
+    total = len(podcasts)
+    started = 0
+
+    async def download(podcast):
+        nonlocal started
+        started += 1
+        print(f'\n[processor] 处理进度: {started}/{total}')
+        ctx = await _prepare_podcast(podcast, uploader=uploader)
+        if ctx is None:
+            return None
+        return await _download_podcast_audio(ctx)
+
+    async def upload(ctx):
+        processed = await asyncio.to_thread(_upload_podcast_to_cos, ctx)
+        # 如果提供了uploader，处理完立即上传
+        if uploader:
+            print(f'[processor] 处理完成，立即上传: {processed.get("id")}')
+            upload_success = await uploader.upload_podcast(processed)
+            if upload_success:
+                print(f'[processor] ✓ 上传成功: {processed.get("title", "Unknown")}')
+            else:
+                print(f'[processor] ✗ 上传失败: {processed.get("title", "Unknown")}')
+        return processed
+
+    def on_error(item, stage_name, error):
+        print(f'[processor] 处理podcast失败（{stage_name}阶段）: {error}')
+        if isinstance(item, dict) and 'podcast_id' in item:
+            _cleanup_podcast_audio(item)
+
+    pipeline = StagedPipeline(
+        [
+            Stage('download', download, concurrency=max_concurrent),
+            Stage('transcribe', _transcribe_podcast, concurrency=TRANSCRIBE_CONCURRENCY),
+            Stage('translate', _translate_podcast, concurrency=max_concurrent),
+            Stage('upload', upload, concurrency=max_concurrent),
+        ],
+        queue_size=PIPELINE_QUEUE_SIZE,
+        on_error=on_error,
+    )
+    report = await pipeline.run(podcasts)
+    successful = report.results
     
-    print(f'\n[processor] 批量处理完成：成功 {len(successful)}/{len(podcasts)} 个，跳过 {skipped_count} 个，失败 {failed_count} 个')
+    print(f'\n[processor] 批量处理完成：成功 {len(successful)}/{len(podcasts)} 个，跳过 {report.dropped} 个，失败 {report.failed} 个')
+    report.print_summary('[processor]')
+    align_stats = resources.align_stats()
+    print(
+        f"[processor] 对齐模型缓存：命中 {align_stats['hits']}，未命中 {align_stats['misses']}，"
+        f"加载 {align_stats['loads']} 次（共 {align_stats['load_seconds']}s），淘汰 {align_stats['evictions']}，"
+        f"已加载语言 {align_stats['languages']}"
+    )
     return successful
 
 async def fetch_and_process_today_podcasts(days: int = 1, uploader=None) -> List[Dict[str, Any]]:
@@ -241,5 +302,5 @@ async def fetch_and_process_today_podcasts(days: int = 1, uploader=None) -> List
         return []
     print(f'[processor] 获取到 {len(podcasts)} 个podcasts，开始处理...')
     # 2. 批量处理（如果提供了uploader，会实时上传）
-    processed = await process_podcasts_batch(podcasts, max_concurrent=1, uploader=uploader)
+    processed = await process_podcasts_batch(podcasts, uploader=uploader)
     return processed
\ No newline at end of file
@@ -4,30 +4,96 @@ import time
 import asyncio
 import os
 from .main import main
+from .whisperx_service import resources, warm_up
+
+
+def _task_kwargs():
+    return {
+        'days': int(os.getenv('SCHEDULER_DAYS', '1')),
+        'upload': os.getenv('SCHEDULER_UPLOAD', 'true').lower() == 'true',
+        'server_url': os.getenv('SERVER_URL', 'http://localhost:8001'),
+    }
 
 
 def run_scheduled_task():
-    print(f'[scheduler] 执行定时任务: {time.strftime("%Y-%m-%d %H:%M:%S")}')    
-    days = int(os.getenv('SCHEDULER_DAYS', '1'))
-    upload = os.getenv('SCHEDULER_UPLOAD', 'true').lower() == 'true'
-    server_url = os.getenv('SERVER_URL', 'http://localhost:8001')
-    asyncio.run(main(
-        days=days,
-        upload=upload,
-        server_url=server_url
-    ))
+    print(f'[scheduler] 执行定时任务: {time.strftime("%Y-%m-%d %H:%M:%S")}')
+    resources.reset_job_stats()
+    asyncio.run(main(**_task_kwargs()))
+    _report_first_job()
+
+
+def _report_first_job(warmup: dict = None):
+    first_job = resources.first_job
+    if not first_job:
+        return
+    if first_job['cold']:
+        print(f'[scheduler] 首个转录任务延迟 {first_job["seconds"]}s（冷启动，含模型加载）')
+    elif warmup:
+        # 常驻模式下没有冷启动的首个任务可测，这里只是估算；实测冷启动延迟需关闭 SCHEDULER_WARM_WORKER 运行一次
+        cold_estimate = first_job['seconds'] + warmup['load_seconds'] + warmup['warmup_seconds']
+        print(
+            f'[scheduler] 首个转录任务延迟 {first_job["seconds"]}s（常驻预热，实测），'
+            f'冷启动估算 {cold_estimate:.2f}s（非实测：本次延迟 + 模型加载 {warmup["load_seconds"]}s '
+            f'+ 预热 {warmup["warmup_seconds"]}s）'
+        )
+    else:
+        print(f'[scheduler] 首个转录任务延迟 {first_job["seconds"]}s（模型已常驻）')
+
+
+async def _run_warm_worker(schedule_time: str, run_once: bool):
+    """
+    常驻预热模式：启动时加载并预热模型，所有定时任务在同一个事件循环里执行，
+    模型在两次任务之间保持常驻，首个任务不再承担模型加载和 CUDA 初始化
+    """
+    try:
+        warmup = await warm_up()
+    except Exception as error:
+        # 模型加载失败（如 GPU 不可用）时不退出调度器：首个任务按需加载模型，失败的任务下次定时再重试
+        print(f'[scheduler] 模型预热失败，改为首个任务时加载: {error}')
+        warmup = None
+    due = []
+    schedule.every().day.at(schedule_time).do(lambda: due.append(True))
+
+    async def run_task():
+        print(f'[scheduler] 执行定时任务: {time.strftime("%Y-%m-%d %H:%M:%S")}')
+        resources.reset_job_stats()
+        try:
+            await main(**_task_kwargs())
+        except Exception as error:
+            print(f'[scheduler] 定时任务失败: {error}')
+        _report_first_job(warmup)
+
+    if run_once:
+        print('[scheduler] 立即执行一次...')
+        await run_task()
+    print('[scheduler] 调度器运行中（常驻预热模式），按 Ctrl+C 退出...')
+    while True:
+        schedule.run_pending()
+        if due:
+            due.clear()
+            await run_task()
+        await asyncio.sleep(60)  # 每分钟检查一次
 
 
 def start_scheduler():
     """启动定时调度器"""
     schedule_time = os.getenv('SCHEDULER_TIME', '04:30')
+    warm_worker = os.getenv('SCHEDULER_WARM_WORKER', 'false').lower() == 'true'
+    run_once = os.getenv('SCHEDULER_RUN_ONCE', 'false').lower() == 'true'
     print(f'[scheduler] 启动定时调度器，执行时间: 每天 {schedule_time}')
     print(f'[scheduler] 配置:')
     print(f'  - 处理天数: {os.getenv("SCHEDULER_DAYS", "1")}')
     print(f'  - 是否上传: {os.getenv("SCHEDULER_UPLOAD", "true")}')
     print(f'  - 服务器URL: {os.getenv("SERVER_URL", "http://localhost:8001")}')
-    schedule.every().day.at(schedule_time).do(run_scheduled_task)    
-    if os.getenv('SCHEDULER_RUN_ONCE', 'false').lower() == 'true':
+    print(f'  - 常驻预热: {warm_worker}')
+    if warm_worker:
+        try:
+            asyncio.run(_run_warm_worker(schedule_time, run_once))
+        except KeyboardInterrupt:
+            print('\n[scheduler] 调度器已停止')
+        return
+    schedule.every().day.at(schedule_time).do(run_scheduled_task)
+    if run_once:
         print('[scheduler] 立即执行一次...')
         run_scheduled_task()
     print('[scheduler] 调度器运行中，按 Ctrl+C 退出...')
@@ -40,4 +106,3 @@ def start_scheduler():
 
 if __name__ == '__main__':
     start_scheduler()
-
@@ -0,0 +1,234 @@
+"""Persistent WhisperX transcription cache
+
+转录结果按 (音频内容 SHA-256, 模型 ID, 计算类型, 对齐模型) 存在 SQLite 里，
+重试失败的 podcast（例如只有翻译失败）时不再重新跑 WhisperX：
+
+- raw_segments：model.transcribe 的原始输出
+- aligned_segments：对齐后的结果；对齐失败时为空，下次只重跑对齐
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+
+命令行查看/清理：
+
+    python transcription_cache.py --stats
+    python transcription_cache.py --clear
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+TRANSCRIPTION_CACHE_ENABLED = os.getenv('TRANSCRIPTION_CACHE_ENABLED', 'true').lower() == 'true'
+TRANSCRIPTION_CACHE_PATH = Path(
+    os.getenv('TRANSCRIPTION_CACHE_PATH', str(Path(__file__).parent / 'transcription_cache.db'))
+)
+TRANSCRIPTION_CACHE_MAX_MB = float(os.getenv('TRANSCRIPTION_CACHE_MAX_MB', '1024'))
+
+
+def _json_default(value: Any):
+    # 对齐结果里可能混有 numpy 标量
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+@dataclass
+class CachedTranscription:
+    language: str
+    raw_segments: List[Dict[str, Any]]
+    aligned_segments: Optional[List[Dict[str, Any]]]
+
+
+class TranscriptionCache:
+    """转录结果缓存（线程安全，多个进程可共用同一个数据库文件）"""
+
+    def __init__(self, path: Path = TRANSCRIPTION_CACHE_PATH, max_mb: float = TRANSCRIPTION_CACHE_MAX_MB):
+        self.path = Path(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'partial_hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    audio_sha256 TEXT NOT NULL,
+                    model_id TEXT NOT NULL,
+                    compute_type TEXT NOT NULL,
+                    align_model TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    raw_segments TEXT NOT NULL,
+                    aligned_segments TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (audio_sha256, model_id, compute_type, align_model)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_transcriptions_last_access
+                ON transcriptions(last_access)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(
+        self, audio_sha256: str, model_id: str, compute_type: str, align_model: str
+    ) -> Optional[CachedTranscription]:
+        key = (audio_sha256, model_id, compute_type, align_model)
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("""
+                    SELECT language, raw_segments, aligned_segments FROM transcriptions
+                    WHERE audio_sha256 = ? AND model_id = ? AND compute_type = ? AND align_model = ?
+                """, key).fetchone()
+                if row is None:
+                    self.stats['misses'] += 1
+                    return None
+                conn.execute("""
+                    UPDATE transcriptions SET last_access = ?, hits = hits + 1
+                    WHERE audio_sha256 = ? AND model_id = ? AND compute_type = ? AND align_model = ?
+                """, (time.time(), *key))
+                conn.commit()
+            finally:
+                conn.close()
+
+        aligned = json.loads(row['aligned_segments']) if row['aligned_segments'] else None
+        self.stats['hits' if aligned is not None else 'partial_hits'] += 1
+        return CachedTranscription(
+            language=row['language'],
+            raw_segments=json.loads(row['raw_segments']),
+            aligned_segments=aligned,
+        )
+
+    def put(
+        self,
+        audio_sha256: str,
+        model_id: str,
+        compute_type: str,
+        align_model: str,
+        language: str,
+        raw_segments: List[Dict[str, Any]],
+        aligned_segments: Optional[List[Dict[str, Any]]],
+    ):
+        raw_json = json.dumps(raw_segments, ensure_ascii=False, default=_json_default)
+        aligned_json = (
+            json.dumps(aligned_segments, ensure_ascii=False, default=_json_default)
+            if aligned_segments is not None else None
+        )
+        size = len(raw_json) + len(aligned_json or '')
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                    INSERT OR REPLACE INTO transcriptions (
+                        audio_sha256, model_id, compute_type, align_model, language,
+                        raw_segments, aligned_segments, size, created_at, last_access
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    audio_sha256, model_id, compute_type, align_model, language,
+                    raw_json, aligned_json, size, now, now,
+                ))
+                conn.commit()
+                self.stats['stores'] += 1
+                self._evict(conn)
+            finally:
+                conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("""
+            SELECT rowid, size FROM transcriptions ORDER BY last_access ASC
+        """).fetchall()
+        # 保留最近写入的一条
+        for row in rows[:-1]:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM transcriptions WHERE rowid = ?", (row['rowid'],))
+            total -= row['size']
+            self.stats['evicted'] += 1
+        conn.commit()
+
+    def summary(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            row = conn.execute("""
+                SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS total_bytes,
+                       COALESCE(SUM(hits), 0) AS lifetime_hits,
+                       COALESCE(SUM(aligned_segments IS NULL), 0) AS unaligned
+                FROM transcriptions
+            """).fetchone()
+        finally:
+            conn.close()
+        lookups = self.stats['hits'] + self.stats['partial_hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] + self.stats['partial_hits']) / lookups if lookups else 0.0
+        return {
+            **self.stats,
+            'hit_rate': round(hit_rate, 4),
+            'entries': row['entries'],
+            'unaligned_entries': row['unaligned'],
+            'total_bytes': row['total_bytes'],
+            'max_bytes': self.max_bytes,
+            'lifetime_hits': row['lifetime_hits'],
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM transcriptions")
+                conn.commit()
+            finally:
+                conn.close()
+
+
+_cache: Optional[TranscriptionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache() -> Optional[TranscriptionCache]:
+    """进程内共享的缓存实例，TRANSCRIPTION_CACHE_ENABLED=false 时返回 None"""
+    global _cache
+    if not TRANSCRIPTION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptionCache()
+        return _cache
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='WhisperX 转录结果缓存')
+    parser.add_argument('--stats', action='store_true', help='显示缓存统计')
+    parser.add_argument('--clear', action='store_true', help='清空缓存')
+    args = parser.parse_args()
+
+    cache = TranscriptionCache()
+    if args.clear:
+        cache.clear()
+        print(f'[transcription-cache] 已清空 {cache.path}')
+    summary = cache.summary()
+    print(f'[transcription-cache] {cache.path}')
+    print(f'[transcription-cache]   条目数: {summary["entries"]}（未对齐 {summary["unaligned_entries"]}）')
+    print(f'[transcription-cache]   大小: {summary["total_bytes"] / 1024 / 1024:.1f}MB / {summary["max_bytes"] / 1024 / 1024:.0f}MB')
+    print(f'[transcription-cache]   累计命中: {summary["lifetime_hits"]}')
@@ -0,0 +1,106 @@
+"""Multi-process CPU transcription pool
+
+CPU 上（int8）单个 WhisperX 模型只能用到少数几个核，且模型不是线程安全的。
+这里启动 N 个工作进程，每个进程加载一份自己的模型，CPU 线程数在进程之间平分，
+多个音频可以同时转录。
+
+- 音频由主进程解码一次，通过共享内存交给工作进程，不经过 pickle 复制
+- 工作进程与进程内路径用同一个 load_whisper_model 加载模型（模型 ID、计算类型、CPU 线程数相同），
+  转录使用相同的 batch_size。两条路径的线程数都取 WHISPERX_THREADS_PER_WORKER，
+  但它的默认值随工作进程数变化（CPU 核数 / 进程数）；线程数不同时浮点累加顺序不同，
+  转录文本可能有细微差别，没有逐字节一致的保证
+- 对齐仍在主进程里执行（对齐模型按语言缓存，开销远小于转录）
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict
+
+import numpy as np
+
+_worker_model = None
+
+
+def load_whisper_model(model_id: str, device: str, compute_type: str, threads: int):
+    """
+    加载 WhisperX 模型（进程内路径和工作进程共用，保证两边配置一致）
+
+    CPU 上把 torch 和 CTranslate2 的线程数都设为 threads；GPU 上使用 whisperx 的默认线程数。
+    """
+    import torch
+    import whisperx
+
+    if device != 'cpu':
+        return whisperx.load_model(model_id, device, compute_type=compute_type)
+    torch.set_num_threads(threads)
+    return whisperx.load_model(model_id, device, compute_type=compute_type, threads=threads)
+
+
+def _init_worker(model_id: str, device: str, compute_type: str, threads: int):
+    """工作进程初始化：限制线程数并加载模型"""
+    global _worker_model
+    # whisperx_service 在导入时会修补 torch.load，模型加载依赖这个修补
+    try:
+        from . import whisperx_service  # noqa: F401
+    except ImportError:
+        import whisperx_service  # noqa: F401
+
+    _worker_model = load_whisper_model(model_id, device, compute_type, threads)
+    print(f'[transcription-pool] 工作进程 {os.getpid()} 模型已加载（{threads} 线程）')
+
+
+def _transcribe_shared(shm_name: str, length: int, batch_size: int) -> Dict[str, Any]:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+        result = _worker_model.transcribe(audio, batch_size=batch_size)
+        del audio
+        return result
+    finally:
+        shm.close()
+
+
+class TranscriptionPool:
+    """每个工作进程持有一个 WhisperX 模型的进程池"""
+
+    def __init__(
+        self,
+        workers: int,
+        threads_per_worker: int,
+        model_id: str,
+        device: str,
+        compute_type: str,
+    ):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        # spawn：torch / CTranslate2 在 fork 出来的子进程里不安全
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_id, device, compute_type, threads_per_worker),
+        )
+        print(f'[transcription-pool] 启动 {workers} 个转录进程，每个 {threads_per_worker} 线程')
+
+    async def transcribe(self, audio: np.ndarray, batch_size: int) -> Dict[str, Any]:
+        """在工作进程中转录已解码的音频，返回值与 model.transcribe 相同"""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+        try:
+            np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, _transcribe_shared, shm.name, len(audio), batch_size
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def default_threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
@@ -1,6 +1,7 @@
 """Translator包 - 翻译服务模块"""
 from .translator import Translator, translate_segments, get_translator
 from .models import BaseModelProvider, AlibabaModelProvider, XYKSModelProvider
+from .router import ProviderRouter
 
 __all__ = [
     'Translator',
@@ -9,5 +10,6 @@ __all__ = [
     'BaseModelProvider',
     'AlibabaModelProvider',
     'XYKSModelProvider',
+    'ProviderRouter',
 ]
 
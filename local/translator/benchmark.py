@@ -0,0 +1,242 @@
+"""翻译吞吐基准测试（本地模拟提供商 MockModelProvider，不调用真实 API）
+
+- sliding：滑动窗口模式（use_full_context=False）逐段顺序翻译与并发翻译的耗时对比
+- modes：每种 translate_batch 模式的吞吐（段/s）、每段模型调用次数、每段 HTTP 请求次数（含重试）
+  和单次模型调用的尾延迟（p50 / p95 / p99，含重试等待）
+- routing：一快一慢两个模拟提供商经 ProviderRouter 路由，检查慢的提供商不会因为对冲中被取消而被当成最快的
+
+    cd local && python -m translator.benchmark --segments 200 --latency 0.2
+    cd local && python -m translator.benchmark --suite modes --error-rate 0.02 --rate-limit-rate 0.05 --http
+    cd local && python -m translator.benchmark --suite routing
+"""
+import argparse
+import asyncio
+import random
+import time
+import unicodedata
+from typing import List, Optional
+
+from .models.base import TRANSLATION_PROMPT_TOKEN_BUDGET, BaseModelProvider
+from .models.concurrency import AdaptiveLimiter
+from .models.mock import MockBehavior, MockLLMServer, MockModelProvider
+from .models.prompts import PromptBuilder
+from .models.resilience import CircuitBreaker, ProviderHealth
+from .router import ProviderRouter
+
+try:
+    from ..http_client import close_all
+except ImportError:
+    from http_client import close_all
+
+# 模式名 -> translate_batch 参数
+MODES = {
+    'simple': dict(use_context=False, use_reflection=False),
+    'reflection': dict(use_context=False, use_reflection=True),
+    'sliding_window': dict(use_context=True, use_full_context=False),
+    'summary_window': dict(use_context=True, use_full_context=True, segments_per_call=1),
+    'summary_batched': dict(use_context=True, use_full_context=True, segments_per_call=8),
+}
+
+_WORDS = (
+    'the speaker explains how the new model translates every segment of the transcript '
+    'while keeping names numbers and technical terms intact across long recordings'
+).split()
+
+
+def _make_segments(count: int, seed: int = 0) -> List[str]:
+    """长短不一的英文片段（部分超过 50 字符，会触发反思翻译）"""
+    rng = random.Random(seed)
+    return [f'Segment {i}: ' + ' '.join(rng.choices(_WORDS, k=rng.randint(3, 16))) + '.' for i in range(count)]
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def _fresh_provider(behavior: MockBehavior, endpoint: str = '', name: str = '') -> MockModelProvider:
+    provider = MockModelProvider(behavior, endpoint)
+    if name:
+        provider.provider_name = name
+    # 基准测试不走翻译缓存，否则第二轮全部命中；每轮使用独立的限流器、熔断器和延迟统计，
+    # 避免上一轮调大的并发上限或打开的熔断器影响下一轮
+    provider.cache = None
+    provider.limiter = AdaptiveLimiter(provider.provider_name)
+    provider.breaker = CircuitBreaker(provider.provider_name)
+    provider.health = ProviderHealth(provider.provider_name)
+    return provider
+
+
+async def _translate_sequential(provider: BaseModelProvider, texts: list[str], context_window: int) -> list[str]:
+    """原来的实现：逐段 await，作为对照"""
+    translated = []
+    for i, text in enumerate(texts):
+        context_before, context_after = provider._window_context(texts, i, i + 1, context_window)
+        prompt = PromptBuilder.build_context_prompt(
+            text, context_before, context_after, token_budget=TRANSLATION_PROMPT_TOKEN_BUDGET
+        )
+        translated.append((await provider._generate(prompt)).strip())
+    return translated
+
+
+async def benchmark_sliding_window(segments: int, latency: float, context_window: int = 2):
+    texts = [f'Segment number {i} of the transcript.' for i in range(segments)]
+    expected = [f'译:{text}' for text in texts]
+    behavior = MockBehavior(latency_ms=latency * 1000, distribution='uniform', sigma=0.2,
+                            error_rate=0, rate_limit_rate=0)
+
+    provider = _fresh_provider(behavior)
+    start = time.perf_counter()
+    sequential = await _translate_sequential(provider, texts, context_window)
+    sequential_seconds = time.perf_counter() - start
+
+    provider = _fresh_provider(behavior)
+    start = time.perf_counter()
+    concurrent = await provider.translate_batch(
+        texts, use_context=True, use_full_context=False, context_window=context_window
+    )
+    concurrent_seconds = time.perf_counter() - start
+
+    print(f'\n滑动窗口模式：{segments} 段，模拟延迟 {latency}s')
+    print(f'  逐段顺序: {sequential_seconds:.2f}s（{segments / sequential_seconds:.1f} 段/s）')
+    print(f'  并发:     {concurrent_seconds:.2f}s（{segments / concurrent_seconds:.1f} 段/s），'
+          f'加速 {sequential_seconds / concurrent_seconds:.1f}x')
+    print(f'  结果顺序一致: {sequential == expected and concurrent == expected}')
+    print(f'  限流器: {provider.limiter.summary()}')
+
+
+async def benchmark_mode(mode: str, texts: List[str], behavior: MockBehavior,
+                         endpoint: str = '', context_window: int = 2) -> dict:
+    """跑一种 translate_batch 模式，返回吞吐、调用次数和尾延迟"""
+    provider = _fresh_provider(behavior, endpoint)
+    try:
+        start = time.perf_counter()
+        translated = await provider.translate_batch(texts, context_window=context_window, **MODES[mode])
+        seconds = time.perf_counter() - start
+    finally:
+        await provider.close()
+
+    latencies = provider.call_latencies
+    return {
+        'mode': mode,
+        'seconds': seconds,
+        'segments_per_second': len(texts) / seconds,
+        'calls_per_segment': len(latencies) / len(texts),
+        'requests_per_segment': provider.http_requests / len(texts),
+        'p50': _percentile(latencies, 50),
+        'p95': _percentile(latencies, 95),
+        'p99': _percentile(latencies, 99),
+        'correct': sum(out == f'译:{text}' for out, text in zip(translated, texts)) / len(texts),
+        'limit': provider.limiter.current_limit,
+        'breaker_opened': provider.breaker.stats['opened'],
+    }
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return f'{value:.3f}' if value is not None else '-'
+
+
+def _rjust(text: str, width: int) -> str:
+    """按显示宽度右对齐（中文字符占两列）"""
+    display = sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    return ' ' * max(0, width - display) + text
+
+
+async def benchmark_modes(segments: int, behavior: MockBehavior, modes: List[str],
+                          use_http: bool = False, context_window: int = 2) -> List[dict]:
+    texts = _make_segments(segments)
+    server = MockLLMServer(behavior) if use_http else None
+    endpoint = server.start() if server else ''
+    try:
+        results = [await benchmark_mode(mode, texts, behavior, endpoint, context_window) for mode in modes]
+    finally:
+        await close_all()
+        if server:
+            server.stop()
+
+    print(f'\n各翻译模式：{segments} 段，延迟 {behavior.distribution} 中位 {behavior.latency * 1000:.0f}ms，'
+          f'5xx {behavior.error_rate:.0%}，429 {behavior.rate_limit_rate:.0%}，'
+          f'{"HTTP 替身服务" if use_http else "进程内模拟"}')
+    headers = [('耗时(s)', 9), ('段/s', 9), ('调用/段', 9), ('请求/段', 9), ('p50(s)', 9),
+               ('p95(s)', 9), ('p99(s)', 9), ('正确率', 8), ('并发上限', 10), ('熔断', 6)]
+    print('  模式' + ' ' * 12 + ''.join(_rjust(name, width) for name, width in headers))
+    for r in results:
+        print(f'  {r["mode"]:<16}{r["seconds"]:>9.2f}{r["segments_per_second"]:>9.1f}'
+              f'{r["calls_per_segment"]:>9.2f}{r["requests_per_segment"]:>9.2f}'
+              f'{_format_seconds(r["p50"]):>9}{_format_seconds(r["p95"]):>9}{_format_seconds(r["p99"]):>9}'
+              f'{r["correct"]:>8.0%}{r["limit"]:>10}{r["breaker_opened"]:>6}')
+    return results
+
+
+async def benchmark_routing(batches: int = 120, fast_ms: float = 100, slow_ms: float = 1500,
+                            hedge_default_seconds: float = 0.3) -> bool:
+    """
+    一快一慢两个模拟提供商，慢的排在配置首位，逐批 pick + generate
+
+    期望：慢的提供商最多在没有样本时被选中一次，对冲后按已等待时间（下限）记样本，此后不再被选中；
+    作为对冲请求输掉被取消的调用不记样本。返回是否符合期望
+    """
+    fast = _fresh_provider(MockBehavior(latency_ms=fast_ms, distribution='lognormal', sigma=0.5,
+                                        error_rate=0, rate_limit_rate=0), name='mock-fast')
+    slow = _fresh_provider(MockBehavior(latency_ms=slow_ms, distribution='fixed',
+                                        error_rate=0, rate_limit_rate=0), name='mock-slow')
+    router = ProviderRouter([slow, fast], hedge_default_seconds=hedge_default_seconds)
+    picks = {slow.provider_name: 0, fast.provider_name: 0}
+    texts = _make_segments(batches)
+    start = time.perf_counter()
+    for text in texts:
+        primary = router.pick()
+        picks[primary.provider_name] += 1
+        await router.generate(primary, PromptBuilder.build_simple_prompt(text))
+    seconds = time.perf_counter() - start
+
+    slow_samples = list(slow.health._latencies)
+    # 慢的提供商只在作为主提供商输掉对冲时记样本（每次被选中最多一个），且不小于对冲等待时间
+    ok = (picks[slow.provider_name] <= 1 and len(slow_samples) <= picks[slow.provider_name]
+          and all(sample >= hedge_default_seconds for sample in slow_samples))
+    print(f'\n多提供商路由：{batches} 批，{fast.provider_name} ~{fast_ms:.0f}ms，{slow.provider_name} {slow_ms:.0f}ms，'
+          f'无样本时 {hedge_default_seconds}s 后对冲，耗时 {seconds:.2f}s')
+    print(f'  首选次数: {picks}')
+    print(f'  {slow.provider_name} 延迟样本: {[round(sample, 3) for sample in slow_samples]}')
+    print(f'  路由统计: {router.summary()}')
+    print(f'  符合预期: {ok}')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='翻译吞吐基准测试（模拟提供商）')
+    parser.add_argument('--suite', choices=['all', 'sliding', 'modes', 'routing'], default='all', help='要运行的基准测试')
+    parser.add_argument('--modes', default=','.join(MODES), help=f'逗号分隔的模式（{", ".join(MODES)}）')
+    parser.add_argument('--segments', type=int, default=200, help='片段数')
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟的单次请求延迟中位数（秒）')
+    parser.add_argument('--distribution', default='lognormal',
+                        choices=['fixed', 'uniform', 'lognormal', 'exponential'], help='延迟分布（modes）')
+    parser.add_argument('--sigma', type=float, default=0.5, help='lognormal 的对数标准差 / uniform 的 ±比例')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的比例（modes）')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='返回 429 的比例（modes）')
+    parser.add_argument('--retry-after', default='1', help='429 响应的 Retry-After（秒）')
+    parser.add_argument('--http', action='store_true', help='通过本地 HTTP 替身服务请求（modes）')
+    parser.add_argument('--context-window', type=int, default=2, help='上下文窗口大小')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f'未知的模式: {", ".join(unknown)}')
+
+    if args.suite in ('all', 'sliding'):
+        asyncio.run(benchmark_sliding_window(args.segments, args.latency, args.context_window))
+    if args.suite in ('all', 'modes'):
+        behavior = MockBehavior(
+            latency_ms=args.latency * 1000, distribution=args.distribution, sigma=args.sigma,
+            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        )
+        asyncio.run(benchmark_modes(args.segments, behavior, modes, args.http, args.context_window))
+    if args.suite in ('all', 'routing'):
+        asyncio.run(benchmark_routing())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,28 @@
 from .base import BaseModelProvider
 from .alibaba import AlibabaModelProvider
 from .xyks import XYKSModelProvider
+from .mock import MockBehavior, MockLLMServer, MockModelProvider
 from .utils import TranslationLogger, ResponseParser
+from .cache import TranslationCache, get_translation_cache
+from .concurrency import AdaptiveLimiter, get_limiter
+from .resilience import CircuitBreaker, CircuitOpenError, ProviderHealth, get_breaker, get_health
 
-__all__ = ['BaseModelProvider', 'AlibabaModelProvider', 'XYKSModelProvider', 'TranslationLogger', 'ResponseParser']
\ No newline at end of file
+__all__ = [
+    'BaseModelProvider',
+    'AlibabaModelProvider',
+    'XYKSModelProvider',
+    'MockModelProvider',
+    'MockBehavior',
+    'MockLLMServer',
+    'TranslationLogger',
+    'ResponseParser',
+    'TranslationCache',
+    'get_translation_cache',
+    'AdaptiveLimiter',
+    'get_limiter',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'get_breaker',
+    'ProviderHealth',
+    'get_health',
+]
\ No newline at end of file
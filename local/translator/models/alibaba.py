@@ -4,24 +4,30 @@ from typing import Optional
 import httpx
 
 from .base import BaseModelProvider
+from .resilience import parse_retry_after
 from .utils import ResponseParser
 
+try:
+    from ...http_client import get_client
+except ImportError:
+    from http_client import get_client
+
 QWEN_API_KEY = os.getenv('QWEN_API_KEY', 'sk-9b13c38aaf14432dae7bd830d2396169')
 QWEN_API_ENDPOINT = 'https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation'
+QWEN_MODEL = 'qwen-mt-plus'
 
 
 class AlibabaModelProvider(BaseModelProvider):    
+    provider_name = 'alibaba'
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__()
         self.api_key = api_key or QWEN_API_KEY
-        self.client = httpx.AsyncClient(timeout=30.0)
-    
-    async def close(self):
-        await self.client.aclose()
+        self.model = QWEN_MODEL
     
     def _build_payload(self, prompt: str) -> dict:
         return {
-            'model': 'qwen-mt-plus',
+            'model': self.model,
             'input': {
                 'messages': [
                     {
@@ -36,6 +42,11 @@ class AlibabaModelProvider(BaseModelProvider):
             }
         }
     
+    @staticmethod
+    def _is_overload(status_code: int, error_code: str = '') -> bool:
+        """429 / 5xx 或限流错误码（Throttling.*）视为过载，交给限流器降低并发"""
+        return status_code == 429 or status_code >= 500 or error_code.startswith('Throttling')
+
     async def call_model(self, prompt: str, max_retries: int = 5) -> str:
         """
         调用阿里云模型API（实现基类的抽象方法）
@@ -60,15 +71,17 @@ class AlibabaModelProvider(BaseModelProvider):
         
         payload = self._build_payload(prompt)
         last_error = None
+        retry_after = None
         for attempt in range(max_retries):
+            if attempt > 0:
+                await self._backoff(attempt, max_retries, retry_after)
+                retry_after = None
+            # 熔断器打开时直接失败，不再重试
+            self.breaker.check()
             start_time = asyncio.get_event_loop().time()
             try:
-                if attempt > 0:
-                    wait_time = min(5 * attempt, 15)
-                    self.logger.log('warn', f'第 {attempt + 1}/{max_retries} 次重试，等待 {wait_time} 秒...')
-                    await asyncio.sleep(wait_time)
-                
-                response = await self.client.post(
+                # 进程内共享连接池（http_client），连接在多次调用之间保持 keep-alive
+                response = await get_client(QWEN_API_ENDPOINT).post(
                     QWEN_API_ENDPOINT,
                     headers=headers,
                     json=payload,
@@ -81,6 +94,9 @@ class AlibabaModelProvider(BaseModelProvider):
                 if 'code' in result:
                     error_code = result.get('code', '')
                     error_message = result.get('message', '')
+                    if self._is_overload(response.status_code, error_code):
+                        self._record_failure(f'HTTP {response.status_code} {error_code}')
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
                     
                     self.logger.log_api_call(
                         QWEN_API_ENDPOINT,
@@ -102,6 +118,7 @@ class AlibabaModelProvider(BaseModelProvider):
                         raise Exception(f"API调用失败: {last_error}")
                 
                 response.raise_for_status()
+                self._record_success(duration)
                 
                 self.logger.log_api_call(
                     QWEN_API_ENDPOINT,
@@ -146,7 +163,9 @@ class AlibabaModelProvider(BaseModelProvider):
                     self.logger.log('error', error_msg)
                     raise Exception(error_msg)
                 
-                if e.response.status_code == 429 or e.response.status_code >= 500:
+                if self._is_overload(e.response.status_code):
+                    self._record_failure(f'HTTP {e.response.status_code}')
+                    retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
                     last_error = f"HTTP {e.response.status_code}: {error_detail}"
                     if attempt < max_retries - 1:
                         continue
@@ -158,6 +177,8 @@ class AlibabaModelProvider(BaseModelProvider):
                         
             except (httpx.TimeoutException, httpx.NetworkError) as e:
                 duration = asyncio.get_event_loop().time() - start_time
+                timed_out = isinstance(e, httpx.TimeoutException)
+                self._record_failure('请求超时' if timed_out else f'网络错误: {e}', overload=timed_out)
                 self.logger.log_api_call(
                     QWEN_API_ENDPOINT,
                     payload,
@@ -1,12 +1,46 @@
 """模型提供器基类，定义模型调用接口和翻译业务逻辑"""
 import asyncio
+import contextvars
+import os
 from abc import ABC, abstractmethod
+from typing import Callable, Optional
+from .cache import cache_key, get_translation_cache, summary_key
+from .concurrency import get_limiter
 from .prompts import PromptBuilder
-from .utils import TranslationLogger
+from .resilience import backoff_delay, get_breaker, get_health
+from .utils import ResponseParser, TranslationLogger
+
+# 总结+滑动窗口模式下每次请求翻译的段数（1 表示逐段翻译）
+TRANSLATION_SEGMENTS_PER_CALL = int(os.getenv('TRANSLATION_SEGMENTS_PER_CALL', '1'))
+
+# 全文超过这个字符数时分层生成总结（分段总结后合并，0 表示不分段）
+TRANSLATION_SUMMARY_CHUNK_CHARS = int(os.getenv('TRANSLATION_SUMMARY_CHUNK_CHARS', '12000'))
+
+# 带上下文的翻译提示词的 token 上限（近似估算），超出时裁剪前后文和总结（0 表示不限制）
+TRANSLATION_PROMPT_TOKEN_BUDGET = int(os.getenv('TRANSLATION_PROMPT_TOKEN_BUDGET', '2000'))
+
+# 当前 translate_batch 调用的统计（gather 出来的子任务共享同一个 dict）
+_run_stats: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('translator_run_stats', default=None)
+
+# Translator 多提供商模式下当前 translate_batch 使用的路由器（对冲请求 / 故障切换）
+current_router: contextvars.ContextVar = contextvars.ContextVar('translator_router', default=None)
+
 
 class BaseModelProvider(ABC):    
+    # 缓存键中的提供商名，子类覆盖
+    provider_name = 'base'
+
     def __init__(self):
         self.logger = TranslationLogger()
+        self.cache = get_translation_cache()
+        self.limiter = get_limiter(self.provider_name)
+        self.breaker = get_breaker(self.provider_name)
+        self.health = get_health(self.provider_name)
+
+    @property
+    def model_name(self) -> str:
+        """缓存键中的模型名"""
+        return getattr(self, 'model', '') or ''
     
     @abstractmethod
     async def call_model(self, prompt: str) -> str:
@@ -26,9 +60,90 @@ class BaseModelProvider(ABC):
         """
         pass
     
+    async def _backoff(self, attempt: int, max_retries: int, retry_after: Optional[float] = None):
+        """重试前等待：有 Retry-After 时按其等待，否则指数退避 + full jitter"""
+        wait_time = backoff_delay(attempt, retry_after)
+        hint = f'（Retry-After: {retry_after:.0f}s）' if retry_after is not None else ''
+        self.logger.log('warn', f'第 {attempt + 1}/{max_retries} 次重试，等待 {wait_time:.1f} 秒{hint}...')
+        await asyncio.sleep(wait_time)
+
+    def _record_success(self, latency: float):
+        """一次 HTTP 请求成功：更新并发限流器和熔断器"""
+        self.limiter.record_success(latency)
+        self.breaker.record_success()
+
+    def _record_failure(self, reason: str, overload: bool = True):
+        """一次 HTTP 请求因 429 / 5xx / 超时（overload）或网络错误失败"""
+        if overload:
+            self.limiter.record_overload(reason)
+        self.breaker.record_failure(reason)
+
+    async def _generate(self, prompt: str, validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        翻译流程中的模型调用都走这里
+
+        Translator 配置了多个提供商时交给路由器（可能对冲或切换到其它提供商），
+        否则直接由本提供商处理。
+        """
+        router = current_router.get()
+        if router is not None:
+            return await router.generate(self, prompt, validate)
+        return await self._generate_cached(prompt, validate)
+
+    async def _generate_cached(self, prompt: str, validate: Optional[Callable[[str], bool]] = None,
+                               started: Optional[asyncio.Event] = None) -> str:
+        """
+        经过翻译缓存调用本提供商的模型
+
+        命中缓存时不调用 call_model；只缓存非空结果，传入 validate 时只缓存校验通过的结果。
+        started 在拿到限流器槽位、真正开始调用模型时置位（路由器据此计算对冲等待时间）。
+        """
+        stats = _run_stats.get()
+        key = None
+        if self.cache is not None:
+            key = cache_key(prompt, self.provider_name, self.model_name, PromptBuilder.VERSION)
+            try:
+                cached = await self.cache.get(key)
+            except Exception as e:
+                self.logger.log('warn', f'读取翻译缓存失败: {e}')
+                cached = None
+            if cached is not None and (validate is None or validate(cached)):
+                if stats is not None:
+                    stats['cache_hits'] += 1
+                return cached
+
+        if stats is not None:
+            prompt_tokens = PromptBuilder.estimate_tokens(prompt)
+            stats['api_calls'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['max_prompt_tokens'] = max(stats['max_prompt_tokens'], prompt_tokens)
+        # 进程级自适应限流：所有 translate_batch 共享同一个提供商的并发上限
+        async with self.limiter.slot():
+            if started is not None:
+                started.set()
+            start = asyncio.get_running_loop().time()
+            try:
+                result = await self.call_model(prompt)
+            except asyncio.CancelledError:
+                # 被取消的调用不记延迟样本：对冲中输掉的一方可能刚发出请求就被取消，
+                # 已等待的时间远小于真实延迟（主提供商输掉时由路由器按下限记录）
+                raise
+            except Exception:
+                self.health.record(None, ok=False)
+                raise
+            self.health.record(asyncio.get_running_loop().time() - start, ok=True)
+        if stats is not None:
+            stats['completion_tokens'] += PromptBuilder.estimate_tokens(result)
+        if key is not None and result and result.strip() and (validate is None or validate(result)):
+            try:
+                await self.cache.put(key, self.provider_name, self.model_name, PromptBuilder.VERSION, result)
+            except Exception as e:
+                self.logger.log('warn', f'写入翻译缓存失败: {e}')
+        return result
+
     async def translate(self, text: str, source_lang: str = 'auto', target_lang: str = 'zh') -> str:
         prompt = PromptBuilder.build_simple_prompt(text)
-        return await self.call_model(prompt)
+        return await self._generate(prompt)
     
     async def translate_batch(self, texts: list[str], source_lang: str = 'auto', 
                              target_lang: str = 'zh', use_reflection: bool = True,
@@ -36,30 +151,61 @@ class BaseModelProvider(ABC):
                              use_full_context: bool = True, **kwargs) -> list[str]:
         if not texts:
             return []
+        stats = {'cache_hits': 0, 'api_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'max_prompt_tokens': 0}
+        token = _run_stats.set(stats)
+        try:
+            return await self._translate_batch(
+                texts, source_lang, target_lang, use_reflection=use_reflection,
+                use_context=use_context, context_window=context_window,
+                use_full_context=use_full_context, **kwargs
+            )
+        finally:
+            _run_stats.reset(token)
+            self._report_run_stats(stats, len(texts))
+
+    def _report_run_stats(self, stats: dict, segment_count: int):
+        lookups = stats['cache_hits'] + stats['api_calls']
+        if not lookups:
+            return
+        hit_rate = stats['cache_hits'] / lookups
+        message = (
+            f'本次翻译 {segment_count} 段：模型请求 {lookups} 次，缓存命中 {stats["cache_hits"]} 次'
+            f'（命中率 {hit_rate:.1%}），实际调用 API {stats["api_calls"]} 次，'
+            f'{self.provider_name} 当前并发上限 {self.limiter.current_limit}，熔断器 {self.breaker.state}'
+        )
+        if stats['api_calls']:
+            message += (
+                f'；估算 token：输入 {stats["prompt_tokens"]}，输出 {stats["completion_tokens"]}，'
+                f'单次请求平均 {stats["prompt_tokens"] // stats["api_calls"]}、最大 {stats["max_prompt_tokens"]}'
+            )
+        self.logger.log('info', message)
+        print(f'[translator] {message}')
+
+    async def _translate_batch(self, texts: list[str], source_lang: str = 'auto', 
+                               target_lang: str = 'zh', use_reflection: bool = True,
+                               use_context: bool = True, context_window: int = 2,
+                               use_full_context: bool = True, **kwargs) -> list[str]:
         # 如果禁用上下文或只有一段文本，使用逐句翻译
         if not use_context or len(texts) == 1:
-            semaphore = asyncio.Semaphore(5)
-            
             async def translate_one(text: str):
-                async with semaphore:
-                    if use_reflection:
-                        # 使用自我反思机制
-                        initial_prompt = PromptBuilder.build_simple_prompt(text)
-                        initial = await self.call_model(initial_prompt)
-                        if len(text) < 50:
-                            return initial.strip()
-                        try:
-                            reflection_prompt = PromptBuilder.build_reflection_prompt(text, initial)
-                            optimized = await self.call_model(reflection_prompt)
-                            if optimized and len(optimized) > len(initial) * 0.8:
-                                return optimized.strip()
-                            return initial.strip()
-                        except Exception as e:
-                            self.logger.log('warn', f'翻译反思步骤失败，使用初步翻译: {e}')
-                            return initial.strip()
-                    else:
-                        prompt = PromptBuilder.build_simple_prompt(text)
-                        return await self.call_model(prompt)
+                if use_reflection:
+                    # 使用自我反思机制
+                    initial_prompt = PromptBuilder.build_simple_prompt(text)
+                    initial = await self._generate(initial_prompt)
+                    if len(text) < 50:
+                        return initial.strip()
+                    try:
+                        reflection_prompt = PromptBuilder.build_reflection_prompt(text, initial)
+                        optimized = await self._generate(reflection_prompt)
+                        if optimized and len(optimized) > len(initial) * 0.8:
+                            return optimized.strip()
+                        return initial.strip()
+                    except Exception as e:
+                        self.logger.log('warn', f'翻译反思步骤失败，使用初步翻译: {e}')
+                        return initial.strip()
+                else:
+                    prompt = PromptBuilder.build_simple_prompt(text)
+                    return await self._generate(prompt)
             
             tasks = [translate_one(text) for text in texts]
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -73,73 +219,69 @@ class BaseModelProvider(ABC):
             self.logger.log('info', f'使用"总结+滑动窗口"翻译模式（全文长度: {len(full_text)}字符，{len(texts)}个片段）')
             try:
                 return await self._translate_with_summary_and_window(
-                    texts, full_text, source_lang, target_lang, context_window=context_window
+                    texts, full_text, source_lang, target_lang, context_window=context_window,
+                    segments_per_call=kwargs.get('segments_per_call', TRANSLATION_SEGMENTS_PER_CALL),
                 )
             except Exception as e:
                 self.logger.log('warn', f'总结+滑动窗口翻译失败，回退到传统模式: {e}')
             
             # 传统模式：每个片段都发送全文（或使用滑动窗口）
-            semaphore = asyncio.Semaphore(3)
-            
             async def translate_with_full_ctx(idx: int, txt: str):
-                async with semaphore:
-                    if not txt or not txt.strip():
-                        return ''
-                    
-                    if len(full_text) > 5000:
-                        if idx == 0:
-                            self.logger.log('info', f'全文较长（{len(full_text)}字符），使用滑动窗口上下文模式')
-                        start_idx = max(0, idx - 3)
-                        end_idx = min(len(texts), idx + 4)
-                        context_before = ' '.join(texts[start_idx:idx]) if idx > 0 else ''
-                        context_after = ' '.join(texts[idx+1:end_idx]) if idx < len(texts) - 1 else ''
-                        prompt = PromptBuilder.build_context_prompt(txt, context_before, context_after)
-                        return await self.call_model(prompt)
-                    else:
-                        prompt = PromptBuilder.build_full_context_prompt(txt, full_text)
-                        return await self.call_model(prompt)
+                if not txt or not txt.strip():
+                    return ''
+                
+                if len(full_text) > 5000:
+                    if idx == 0:
+                        self.logger.log('info', f'全文较长（{len(full_text)}字符），使用滑动窗口上下文模式')
+                    start_idx = max(0, idx - 3)
+                    end_idx = min(len(texts), idx + 4)
+                    context_before = ' '.join(texts[start_idx:idx]) if idx > 0 else ''
+                    context_after = ' '.join(texts[idx+1:end_idx]) if idx < len(texts) - 1 else ''
+                    prompt = PromptBuilder.build_context_prompt(
+                        txt, context_before, context_after, token_budget=TRANSLATION_PROMPT_TOKEN_BUDGET
+                    )
+                    return await self._generate(prompt)
+                else:
+                    prompt = PromptBuilder.build_full_context_prompt(txt, full_text)
+                    return await self._generate(prompt)
             
             tasks = [translate_with_full_ctx(i, text) for i, text in enumerate(texts)]
             results = await asyncio.gather(*tasks, return_exceptions=True)
             return self._process_batch_results(results, texts)
         
-        # 使用滑动窗口上下文模式
-        translated = []
-        semaphore = asyncio.Semaphore(3)
-        
-        for i, text in enumerate(texts):
-            if not text or not text.strip():
-                translated.append('')
-                continue
-            
-            start_idx = max(0, i - context_window)
-            end_idx = min(len(texts), i + context_window + 1)
-            context_before = ' '.join(texts[start_idx:i]) if i > 0 else ''
-            context_after = ' '.join(texts[i+1:end_idx]) if i < len(texts) - 1 else ''
-            
-            async def translate_with_ctx(idx: int, txt: str, before: str, after: str):
-                async with semaphore:
-                    prompt = PromptBuilder.build_context_prompt(txt, before, after)
-                    return await self.call_model(prompt)
-            
-            result = await translate_with_ctx(i, text, context_before, context_after)
-            translated.append(result.strip() if result else '')
+        # 使用滑动窗口上下文模式：所有片段并发翻译（并发数由提供商的自适应限流器控制），
+        # gather 按输入顺序返回结果
+        async def translate_with_ctx(idx: int, txt: str):
+            if not txt or not txt.strip():
+                return ''
+            context_before, context_after = self._window_context(texts, idx, idx + 1, context_window)
+            prompt = PromptBuilder.build_context_prompt(
+                txt, context_before, context_after, token_budget=TRANSLATION_PROMPT_TOKEN_BUDGET
+            )
+            return await self._generate(prompt)
         
-        return translated
+        tasks = [translate_with_ctx(i, text) for i, text in enumerate(texts)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return self._process_batch_results(results, texts)
     
     async def _translate_with_summary_and_window(self, texts: list[str], full_text: str,
                                                  source_lang: str, target_lang: str,
-                                                 context_window: int = 2) -> list[str]:
-        """使用总结+滑动窗口的翻译方式（通用实现）"""
+                                                 context_window: int = 2,
+                                                 segments_per_call: int = 1) -> list[str]:
+        """
+        使用总结+滑动窗口的翻译方式（通用实现）
+
+        segments_per_call > 1 时，每次请求翻译连续的多段（共享同一份总结和上下文），
+        模型返回带序号的 JSON 数组，缺失或对不上的段落再逐段翻译。
+        """
         if not texts:
             return []
         
         self.logger.log('info', f'开始"总结+滑动窗口"翻译模式（共{len(texts)}段，全文{len(full_text)}字符）')
         
-        # 生成全文总结
-        summary_prompt = PromptBuilder.build_summary_prompt(full_text)
+        # 生成全文总结（优先复用已缓存的总结）
         try:
-            summary = await self.call_model(summary_prompt)
+            summary = await self._summarize(texts, full_text)
             self.logger.log('info', f'全文总结生成成功（长度: {len(summary)}字符）')
         except Exception as e:
             self.logger.log('warn', f'全文总结生成失败: {e}，将使用空总结继续翻译')
@@ -148,35 +290,19 @@ class BaseModelProvider(ABC):
         if not summary:
             summary = "（无法生成总结，直接翻译）"
         
-        # 使用总结+滑动窗口并发翻译所有片段
-        semaphore = asyncio.Semaphore(5)
-        
-        async def translate_with_window(idx: int, txt: str):
-            async with semaphore:
-                if not txt or not txt.strip():
-                    return ''
-                
-                start_idx = max(0, idx - context_window)
-                end_idx = min(len(texts), idx + context_window + 1)
-                context_before = ' '.join(texts[start_idx:idx]) if idx > 0 else ''
-                context_after = ' '.join(texts[idx+1:end_idx]) if idx < len(texts) - 1 else ''
-                
-                prompt = PromptBuilder.build_sliding_window_prompt(
-                    txt, summary, context_before, context_after
-                )
-                
-                try:
-                    result = await self.call_model(prompt)
-                    if result and result.strip():
-                        return result.strip()
-                    else:
-                        self.logger.log('warn', f'第 {idx+1} 段翻译返回空结果')
-                        return ''
-                except Exception as e:
-                    self.logger.log('warn', f'第 {idx+1} 段翻译失败: {e}')
-                    return ''
+        # 使用总结+滑动窗口并发翻译所有片段（并发数由提供商的自适应限流器控制）
+        if segments_per_call > 1:
+            results = await self._translate_windows_batched(
+                texts, summary, context_window, segments_per_call
+            )
+            success_count = sum(1 for t in results if t)
+            self.logger.log('info', f'总结+滑动窗口翻译完成：{success_count}/{len(texts)} 段成功')
+            return results
         
-        tasks = [translate_with_window(i, text) for i, text in enumerate(texts)]
+        tasks = [
+            self._translate_segment_with_window(texts, i, summary, context_window)
+            for i in range(len(texts))
+        ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         translated = []
@@ -192,6 +318,158 @@ class BaseModelProvider(ABC):
         
         return translated
     
+    async def _summarize(self, texts: list[str], full_text: str) -> str:
+        """
+        生成全文总结，按全文哈希缓存（与提供商无关，重试和切换提供商时直接复用）
+
+        全文超过 TRANSLATION_SUMMARY_CHUNK_CHARS 时分层总结：按片段边界切成若干部分并发总结，
+        再合并为全文总结，避免一个超长提示词。
+        """
+        key = summary_key(full_text, PromptBuilder.VERSION) if self.cache is not None else None
+        if key is not None:
+            try:
+                cached = await self.cache.get_summary(key)
+            except Exception as e:
+                self.logger.log('warn', f'读取总结缓存失败: {e}')
+                cached = None
+            if cached:
+                self.logger.log('info', '复用已缓存的全文总结')
+                return cached
+
+        chunks = self._split_for_summary(texts, TRANSLATION_SUMMARY_CHUNK_CHARS)
+        complete = True
+        if len(chunks) <= 1:
+            summary = await self._generate(PromptBuilder.build_summary_prompt(full_text))
+        else:
+            self.logger.log('info', f'全文较长（{len(full_text)}字符），分 {len(chunks)} 部分并发总结后合并')
+            results = await asyncio.gather(*(
+                self._generate(PromptBuilder.build_chunk_summary_prompt(chunk, i, len(chunks)))
+                for i, chunk in enumerate(chunks, 1)
+            ), return_exceptions=True)
+            partials = [r.strip() for r in results if isinstance(r, str) and r.strip()]
+            if len(partials) < len(chunks):
+                # 不完整的总结只用于本次翻译，不写入总结缓存；重试时已成功的部分总结命中翻译缓存，只重新请求失败的部分
+                complete = False
+                self.logger.log('warn', f'分段总结失败 {len(chunks) - len(partials)}/{len(chunks)} 部分，用其余部分合并（不缓存）')
+            if not partials:
+                raise Exception('分段总结全部失败')
+            summary = await self._generate(PromptBuilder.build_merge_summary_prompt(partials))
+
+        summary = summary.strip() if summary else ''
+        if key is not None and summary and complete:
+            try:
+                await self.cache.put_summary(key, summary, len(full_text))
+            except Exception as e:
+                self.logger.log('warn', f'写入总结缓存失败: {e}')
+        return summary
+
+    @staticmethod
+    def _split_for_summary(texts: list[str], chunk_chars: int) -> list[str]:
+        """按片段边界把全文切成不超过 chunk_chars 的若干部分（chunk_chars <= 0 时不切分）"""
+        if chunk_chars <= 0:
+            return [' '.join(texts)]
+        chunks, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) + 1 > chunk_chars:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 1
+        if current:
+            chunks.append(' '.join(current))
+        return chunks
+
+    @staticmethod
+    def _window_context(texts: list[str], start: int, end: int, context_window: int):
+        """texts[start:end] 的前后文（各 context_window 段）"""
+        before = ' '.join(texts[max(0, start - context_window):start])
+        after = ' '.join(texts[end:end + context_window])
+        return before, after
+
+    async def _translate_segment_with_window(self, texts: list[str], idx: int,
+                                             summary: str, context_window: int) -> str:
+        """总结+滑动窗口模式下翻译单个片段，失败时返回空字符串"""
+        txt = texts[idx]
+        if not txt or not txt.strip():
+            return ''
+        
+        context_before, context_after = self._window_context(texts, idx, idx + 1, context_window)
+        prompt = PromptBuilder.build_sliding_window_prompt(
+            txt, summary, context_before, context_after, token_budget=TRANSLATION_PROMPT_TOKEN_BUDGET
+        )
+        
+        try:
+            result = await self._generate(prompt)
+            if result and result.strip():
+                return result.strip()
+            else:
+                self.logger.log('warn', f'第 {idx+1} 段翻译返回空结果')
+                return ''
+        except Exception as e:
+            self.logger.log('warn', f'第 {idx+1} 段翻译失败: {e}')
+            return ''
+
+    async def _translate_windows_batched(self, texts: list[str], summary: str, context_window: int,
+                                         segments_per_call: int) -> list[str]:
+        """每次请求翻译连续 segments_per_call 段，解析失败的段落逐段回退"""
+        translated = [''] * len(texts)
+        groups = [
+            list(range(start, min(start + segments_per_call, len(texts))))
+            for start in range(0, len(texts), segments_per_call)
+        ]
+        fallback_count = 0
+
+        async def translate_group(indices: list[int]):
+            nonlocal fallback_count
+            items = [(number, texts[i]) for number, i in enumerate(indices, 1) if texts[i] and texts[i].strip()]
+            if not items:
+                return
+            context_before, context_after = self._window_context(
+                texts, indices[0], indices[-1] + 1, context_window
+            )
+            prompt = PromptBuilder.build_batch_window_prompt(
+                items, summary, context_before, context_after, token_budget=TRANSLATION_PROMPT_TOKEN_BUDGET
+            )
+            numbers = [number for number, _ in items]
+            parsed: dict[int, str] = {}
+            try:
+                response = await self._generate(
+                    prompt,
+                    validate=lambda text: len(ResponseParser.parse_indexed_translations(text, numbers)) == len(numbers),
+                )
+                parsed = ResponseParser.parse_indexed_translations(response, numbers)
+            except Exception as e:
+                self.logger.log('warn', f'第 {indices[0]+1}-{indices[-1]+1} 段批量翻译失败: {e}')
+
+            missing = []
+            for number, _ in items:
+                i = indices[number - 1]
+                if number in parsed:
+                    translated[i] = parsed[number]
+                else:
+                    missing.append(i)
+            if missing:
+                fallback_count += len(missing)
+                self.logger.log(
+                    'warn',
+                    f'第 {indices[0]+1}-{indices[-1]+1} 段批量结果缺失 {len(missing)} 段，逐段重新翻译'
+                )
+
+                async def fallback(i: int):
+                    translated[i] = await self._translate_segment_with_window(
+                        texts, i, summary, context_window
+                    )
+
+                await asyncio.gather(*(fallback(i) for i in missing))
+
+        await asyncio.gather(*(translate_group(indices) for indices in groups))
+        self.logger.log(
+            'info',
+            f'批量翻译：{len(texts)} 段分 {len(groups)} 次请求（每次 {segments_per_call} 段），'
+            f'逐段回退 {fallback_count} 段'
+        )
+        return translated
+
     def _process_batch_results(self, results: list, texts: list[str]) -> list[str]:
         """处理批量翻译结果，统计并记录日志（通用实现）"""
         translated = []
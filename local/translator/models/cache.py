@@ -0,0 +1,208 @@
+"""Translation memory: persistent cache of model responses
+
+按 (规范化后的提示词哈希, 提供商, 模型, 提示词版本) 缓存模型输出，提示词里已经包含了
+当前文本和上下文（前后文、全文总结），因此上下文变化会自然落到不同的键上。
+
+- 重新处理同一期节目、重跑失败的 VOA、反复出现的片头片尾都直接命中
+- SQLite 存储，Alibaba / XYKS 共用同一个库（键里区分提供商和模型）
+- 全文总结另存一张表，按规范化全文的哈希（和提示词版本）索引，与提供商无关，
+  翻译重试、切换提供商时都直接复用
+- 过期时间（TTL）和总大小上限，超出后按最近访问时间淘汰
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+TRANSLATION_CACHE_ENABLED = os.getenv('TRANSLATION_CACHE_ENABLED', 'true').lower() == 'true'
+TRANSLATION_CACHE_PATH = Path(
+    os.getenv('TRANSLATION_CACHE_PATH', str(Path(__file__).resolve().parents[2] / 'translation_cache.db'))
+)
+TRANSLATION_CACHE_TTL_DAYS = float(os.getenv('TRANSLATION_CACHE_TTL_DAYS', '90'))
+TRANSLATION_CACHE_MAX_MB = float(os.getenv('TRANSLATION_CACHE_MAX_MB', '512'))
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """合并空白字符，空格、换行上的差异不影响命中"""
+    return _WHITESPACE.sub(' ', prompt).strip()
+
+
+def summary_key(full_text: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(prompt_version.encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update(normalize_prompt(full_text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cache_key(prompt: str, provider: str, model: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (provider, model, prompt_version, normalize_prompt(prompt)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """模型响应缓存（线程安全；读写在线程池中执行，不阻塞事件循环）"""
+
+    def __init__(
+        self,
+        path: Path = TRANSLATION_CACHE_PATH,
+        ttl_days: float = TRANSLATION_CACHE_TTL_DAYS,
+        max_mb: float = TRANSLATION_CACHE_MAX_MB,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        self._writes_since_evict = 0
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    text_chars INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put_sync(self, key: str, provider: str, model: str, prompt_version: str, response: str):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses
+                    (key, provider, model, prompt_version, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, provider, model, prompt_version, response, size, now, now))
+            self._conn.commit()
+            self._writes_since_evict += 1
+            # 淘汰需要全表统计，每 200 次写入检查一次
+            if self._writes_since_evict >= 200:
+                self._writes_since_evict = 0
+                self._evict()
+
+    def get_summary_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put_summary_sync(self, key: str, summary: str, text_chars: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO summaries (key, summary, text_chars, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, summary, text_chars, now, now))
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl_seconds > 0:
+            cutoff = time.time() - self.ttl_seconds
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (cutoff,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            # 一次淘汰到上限的 90%，避免每次写入都触发
+            target = int(self.max_bytes * 0.9)
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def put(self, key: str, provider: str, model: str, prompt_version: str, response: str):
+        await asyncio.to_thread(self.put_sync, key, provider, model, prompt_version, response)
+
+    async def get_summary(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_summary_sync, key)
+
+    async def put_summary(self, key: str, summary: str, text_chars: int):
+        await asyncio.to_thread(self.put_summary_sync, key, summary, text_chars)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            summaries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {'entries': count, 'summaries': summaries, 'total_bytes': total, 'max_bytes': self.max_bytes}
+
+
+_cache: Optional[TranslationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> Optional[TranslationCache]:
+    """进程内共享的缓存实例，TRANSLATION_CACHE_ENABLED=false 时返回 None"""
+    global _cache
+    if not TRANSLATION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
@@ -0,0 +1,167 @@
+"""Adaptive (AIMD) concurrency limiter shared by all translation batches
+
+原来每次 translate_batch 各自创建 Semaphore(3/5)，多个 podcast 同时翻译时并发数成倍叠加，
+容易触发限流；单个 podcast 翻译时又用不满配额。这里每个提供商一个进程级限流器：
+
+- 加性增：请求成功且延迟正常、并发已用满时，上限每轮约 +1
+- 乘性减：遇到 429 / 5xx / 超时，上限减半；平滑延迟超过基线的 tolerance 倍时，上限 ×0.9
+- 每个冷却窗口（约一次请求的耗时）最多减一次，避免同一波失败把上限连续打到底
+
+不依赖某个事件循环，定时任务每次 asyncio.run 新建事件循环时也可以复用同一个实例。
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+TRANSLATION_CONCURRENCY_INITIAL = int(os.getenv('TRANSLATION_CONCURRENCY_INITIAL', '5'))
+TRANSLATION_CONCURRENCY_MIN = int(os.getenv('TRANSLATION_CONCURRENCY_MIN', '1'))
+TRANSLATION_CONCURRENCY_MAX = int(os.getenv('TRANSLATION_CONCURRENCY_MAX', '32'))
+# 平滑延迟超过基线延迟的倍数时视为拥塞（0 表示只按 429/5xx/超时调整）
+TRANSLATION_LATENCY_TOLERANCE = float(os.getenv('TRANSLATION_LATENCY_TOLERANCE', '3.0'))
+
+
+class AdaptiveLimiter:
+    """AIMD 并发限流器，limit 为当前允许的同时请求数"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = TRANSLATION_CONCURRENCY_INITIAL,
+        min_limit: int = TRANSLATION_CONCURRENCY_MIN,
+        max_limit: int = TRANSLATION_CONCURRENCY_MAX,
+        latency_tolerance: float = TRANSLATION_LATENCY_TOLERANCE,
+        backoff: float = 0.5,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._baseline: Optional[float] = None
+        self._smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+        self.stats = {'requests': 0, 'successes': 0, 'overloads': 0, 'increases': 0, 'decreases': 0, 'peak_limit': int(self.limit)}
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已经分到槽位但被取消，交给下一个等待者
+                self.in_flight -= 1
+                self._wake()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.current_limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            # 等待者可能属于已结束的事件循环（旧的 asyncio.run），此时跳过
+            try:
+                future.get_loop().call_soon_threadsafe(self._resolve, future)
+            except RuntimeError:
+                self.in_flight -= 1
+
+    def _resolve(self, future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+        else:
+            self.in_flight -= 1
+            self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        self.stats['requests'] += 1
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def record_success(self, latency: float):
+        """一次请求成功返回，latency 为该次 HTTP 请求耗时（秒）"""
+        self.stats['successes'] += 1
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            # 基线缓慢上移，避免早期一次特别快的请求永久压低基线
+            self._baseline += 0.01 * (latency - self._baseline)
+        self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+
+        if self.latency_tolerance > 0 and self._smoothed > self._baseline * self.latency_tolerance:
+            self._decrease(0.9, f'延迟升高（平滑 {self._smoothed:.2f}s，基线 {self._baseline:.2f}s）')
+            return
+        # 只有并发接近用满时才增加，空闲时上限不会无限上涨
+        if self.in_flight >= self.current_limit - 1 and self.limit < self.max_limit:
+            before = self.current_limit
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if self.current_limit > before:
+                self.stats['increases'] += 1
+                self.stats['peak_limit'] = max(self.stats['peak_limit'], self.current_limit)
+                self._wake()
+
+    def record_overload(self, reason: str):
+        """请求被限流或服务端过载（429 / 5xx / 超时）"""
+        self.stats['overloads'] += 1
+        self._decrease(self.backoff, reason)
+
+    def _decrease(self, factor: float, reason: str):
+        now = time.monotonic()
+        cooldown = max(1.0, self._smoothed or 0.0)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        before = self.current_limit
+        self.limit = max(float(self.min_limit), self.limit * factor)
+        if self.current_limit < before:
+            self.stats['decreases'] += 1
+            print(f'[translator] {self.name} 并发上限 {before} → {self.current_limit}（{reason}）')
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            **self.stats,
+            'limit': self.current_limit,
+            'in_flight': self.in_flight,
+            'baseline_latency': round(self._baseline, 3) if self._baseline is not None else None,
+            'smoothed_latency': round(self._smoothed, 3) if self._smoothed is not None else None,
+        }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> AdaptiveLimiter:
+    """按提供商名称返回进程内共享的限流器"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = AdaptiveLimiter(provider)
+        return limiter
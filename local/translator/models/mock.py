@@ -0,0 +1,248 @@
+"""本地模拟模型提供器，用于基准测试和离线调试（不调用 DashScope / XYKS）
+
+- 延迟分布：fixed / uniform / lognormal / exponential，中位数与离散程度可配
+- 按比例注入 5xx 错误和 429 限流（带 Retry-After），走与真实提供商相同的重试、限流和熔断逻辑
+- 可以进程内模拟，也可以请求本地 HTTP 替身服务（MockLLMServer），覆盖 httpx 连接与解析开销
+- 根据提示词类型返回合理格式的结果：批量翻译返回带序号的 JSON，总结提示词返回总结，其余返回「译:原文」
+
+    TRANSLATOR_PROVIDER=mock python local/run.py --no-upload
+    cd local && python -m translator.models.mock --port 8765   # 单独启动 HTTP 替身服务
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+import httpx
+
+from .base import BaseModelProvider
+from .resilience import parse_retry_after
+
+try:
+    from ...http_client import get_client
+except ImportError:
+    from http_client import get_client
+
+MOCK_LLM_LATENCY_MS = float(os.getenv('MOCK_LLM_LATENCY_MS', '300'))
+MOCK_LLM_LATENCY_DISTRIBUTION = os.getenv('MOCK_LLM_LATENCY_DISTRIBUTION', 'lognormal')
+MOCK_LLM_LATENCY_SIGMA = float(os.getenv('MOCK_LLM_LATENCY_SIGMA', '0.5'))
+MOCK_LLM_ERROR_RATE = float(os.getenv('MOCK_LLM_ERROR_RATE', '0'))
+MOCK_LLM_429_RATE = float(os.getenv('MOCK_LLM_429_RATE', '0'))
+MOCK_LLM_RETRY_AFTER = os.getenv('MOCK_LLM_RETRY_AFTER', '1')
+# 设置后通过 HTTP 请求替身服务（例如 http://127.0.0.1:8765/chat），否则进程内模拟
+MOCK_LLM_ENDPOINT = os.getenv('MOCK_LLM_ENDPOINT', '')
+
+_BATCH_ITEM = re.compile(r'^\[(\d+)\] (.*)$', re.M)
+_CURRENT_TEXT = re.compile(r'^【(?:当前文本|原文|当前片段|片段 \d+)】(?:（[^）]*）)?\n?(.*?)\n', re.S | re.M)
+_INITIAL_TRANSLATION = re.compile(r'【初步翻译】\n(.*?)\n\n', re.S)
+
+
+class MockBehavior:
+    """模拟的延迟分布和错误注入"""
+
+    def __init__(
+        self,
+        latency_ms: float = MOCK_LLM_LATENCY_MS,
+        distribution: str = MOCK_LLM_LATENCY_DISTRIBUTION,
+        sigma: float = MOCK_LLM_LATENCY_SIGMA,
+        error_rate: float = MOCK_LLM_ERROR_RATE,
+        rate_limit_rate: float = MOCK_LLM_429_RATE,
+        retry_after: Optional[str] = MOCK_LLM_RETRY_AFTER,
+    ):
+        """
+        Args:
+            latency_ms: 延迟中位数（fixed 时为固定值，exponential 时为均值）
+            distribution: fixed / uniform / lognormal / exponential
+            sigma: lognormal 的对数标准差，uniform 时为 ±比例
+            error_rate: 返回 500 的比例
+            rate_limit_rate: 返回 429 的比例
+            retry_after: 429 响应的 Retry-After 头（None 表示不返回）
+        """
+        if distribution not in ('fixed', 'uniform', 'lognormal', 'exponential'):
+            raise ValueError(f'不支持的延迟分布: {distribution}')
+        self.latency = latency_ms / 1000
+        self.distribution = distribution
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+
+    def sample_latency(self) -> float:
+        if self.distribution == 'fixed' or self.latency <= 0:
+            return max(self.latency, 0.0)
+        if self.distribution == 'uniform':
+            return self.latency * random.uniform(1 - self.sigma, 1 + self.sigma)
+        if self.distribution == 'exponential':
+            return random.expovariate(1 / self.latency)
+        return random.lognormvariate(math.log(self.latency), self.sigma)
+
+    def sample_status(self) -> int:
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return 200
+
+
+def mock_completion(prompt: str) -> str:
+    """按提示词类型生成格式合理的模拟输出"""
+    if '【待翻译片段】\n' in prompt:
+        block = prompt.rsplit('【待翻译片段】\n', 1)[1].split('\n\n', 1)[0]
+        items = [{'i': int(i), 't': f'译:{text.strip()}'} for i, text in _BATCH_ITEM.findall(block)]
+        return json.dumps({'translations': items}, ensure_ascii=False)
+    if '请直接输出总结' in prompt:
+        return '模拟总结：文章讨论了若干事件，涉及的人物与术语保持原文。'
+    initial = _INITIAL_TRANSLATION.search(prompt)
+    if initial:
+        return initial.group(1).strip()
+    match = _CURRENT_TEXT.search(prompt)
+    return f'译:{match.group(1).strip()}' if match else '译:' + prompt.strip()[-40:]
+
+
+class MockModelProvider(BaseModelProvider):
+    """模拟提供商，call_model 的重试、限流、熔断流程与真实提供商一致"""
+    provider_name = 'mock'
+
+    def __init__(self, behavior: Optional[MockBehavior] = None, endpoint: Optional[str] = None):
+        super().__init__()
+        self.behavior = behavior or MockBehavior()
+        self.endpoint = endpoint if endpoint is not None else MOCK_LLM_ENDPOINT
+        self.model = f'mock-{self.behavior.distribution}'
+        # HTTP 请求次数（含重试）和每次 call_model 的总耗时（含重试等待），供基准测试统计
+        self.http_requests = 0
+        self.call_latencies: List[float] = []
+
+    async def _request(self, prompt: str) -> Tuple[int, str, Optional[str]]:
+        """返回 (状态码, 内容, Retry-After)"""
+        if not self.endpoint:
+            await asyncio.sleep(self.behavior.sample_latency())
+            status = self.behavior.sample_status()
+            retry_after = self.behavior.retry_after if status == 429 else None
+            return status, mock_completion(prompt) if status == 200 else '', retry_after
+        response = await get_client(self.endpoint).post(self.endpoint, json={'prompt': prompt}, timeout=30.0)
+        content = ''
+        if response.status_code == 200:
+            content = response.json().get('choices', [{}])[0].get('message', {}).get('content', '')
+        return response.status_code, content, response.headers.get('Retry-After')
+
+    async def call_model(self, prompt: str, max_retries: int = 5) -> str:
+        loop = asyncio.get_running_loop()
+        call_start = loop.time()
+        last_error = None
+        retry_after = None
+        try:
+            for attempt in range(max_retries):
+                if attempt > 0:
+                    await self._backoff(attempt, max_retries, retry_after)
+                    retry_after = None
+                self.breaker.check()
+                self.http_requests += 1
+                start_time = loop.time()
+                try:
+                    status, content, retry_after_header = await self._request(prompt)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    timed_out = isinstance(e, httpx.TimeoutException)
+                    self._record_failure('请求超时' if timed_out else f'网络错误: {e}', overload=timed_out)
+                    last_error = f'网络错误: {e}'
+                    continue
+                duration = loop.time() - start_time
+
+                if status == 200 and content:
+                    self._record_success(duration)
+                    return content
+                if status == 429 or status >= 500:
+                    self._record_failure(f'HTTP {status}')
+                    retry_after = parse_retry_after(retry_after_header)
+                    last_error = f'HTTP {status}'
+                    continue
+                raise Exception(f'API请求失败: HTTP {status}')
+            raise Exception(f"模型调用失败（已重试 {max_retries} 次）: {last_error or '未知错误'}")
+        finally:
+            self.call_latencies.append(loop.time() - call_start)
+
+
+class MockLLMServer:
+    """本地 HTTP 替身服务（标准库实现，后台线程运行），POST 任意路径，请求体 {"prompt": "..."}"""
+
+    def __init__(self, behavior: Optional[MockBehavior] = None, host: str = '127.0.0.1', port: int = 0):
+        self.behavior = behavior or MockBehavior()
+        behavior = self.behavior
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    prompt = json.loads(self.rfile.read(length) or b'{}').get('prompt', '')
+                except ValueError:
+                    self._reply(400, {'error': 'invalid json'})
+                    return
+                time_to_wait = behavior.sample_latency()
+                threading.Event().wait(time_to_wait)
+                status = behavior.sample_status()
+                if status == 200:
+                    self._reply(200, {'choices': [{'message': {'content': mock_completion(prompt)}}]})
+                else:
+                    headers = {'Retry-After': behavior.retry_after} if status == 429 and behavior.retry_after else {}
+                    self._reply(status, {'error': 'rate limited' if status == 429 else 'internal error'}, headers)
+
+            def _reply(self, status: int, body: dict, headers: Optional[dict] = None):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/chat'
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-llm-server', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 LLM HTTP 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = MockLLMServer(host=args.host, port=args.port)
+    print(f'[mock] 模拟 LLM 服务已启动: {server.url}（设置 MOCK_LLM_ENDPOINT 指向该地址）')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,89 @@
+import re
+from typing import Callable, Optional
+
+# 近似分词：中日韩字符每字 1 个 token，英文单词每 4 个字符约 1 个 token，标点 1 个 token
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_]')
+
+
 class PromptBuilder:    
+    # 提示词版本，修改任何提示词模板时递增，翻译缓存随之失效
+    VERSION = '1'
+
     @staticmethod
     def get_base_principles() -> str:
         return """【遗忘之律】忘记英文的句法。忘记英文的语序。只记住它要说的事。
 【重生之律】如果你是中国作者，面对中国读者，你会怎么讲这个故事？
 【地道之律】追求地道的表达，而非字面翻译。中文有自己的韵律和节奏感。"""
 
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """本地近似估算 token 数（不依赖具体模型的分词器，误差在 ±20% 左右）"""
+        if not text:
+            return 0
+        return sum(
+            (len(piece) + 3) // 4 if piece[0].isascii() and piece[0].isalnum() else 1
+            for piece in _TOKEN_PATTERN.findall(text)
+        )
+
+    @staticmethod
+    def trim_to_tokens(text: str, max_tokens: int, keep: str = 'head') -> str:
+        """裁剪到不超过 max_tokens（按近似分词的边界），keep='tail' 时保留结尾（用于前文）"""
+        if max_tokens <= 0 or not text:
+            return ''
+        if PromptBuilder.estimate_tokens(text) <= max_tokens:
+            return text
+        pieces = list(_TOKEN_PATTERN.finditer(text))
+        if keep == 'tail':
+            pieces.reverse()
+        # 留 1 个 token 给省略号
+        used, cut = 0, None
+        for piece in pieces:
+            used += PromptBuilder.estimate_tokens(piece.group())
+            if used > max_tokens - 1:
+                break
+            cut = piece.start() if keep == 'tail' else piece.end()
+        if cut is None:
+            return ''
+        return '…' + text[cut:].lstrip() if keep == 'tail' else text[:cut].rstrip() + '…'
+
+    @staticmethod
+    def fit_to_budget(render: Callable[[str, str, str], str], summary: str, context_before: str,
+                      context_after: str, token_budget: Optional[int]) -> tuple[str, str, str]:
+        """把提示词压缩到 token_budget 以内，返回裁剪后的 (summary, context_before, context_after)
+
+        当前文本从不裁剪；先按比例裁剪前后文（前文保留靠近当前文本的结尾，后文保留开头），
+        去掉前后文仍超出预算时再截短总结。
+
+        Args:
+            render: (summary, context_before, context_after) -> 完整提示词
+            token_budget: 提示词 token 上限，None 或 <= 0 表示不限制
+        """
+        if not token_budget or token_budget <= 0:
+            return summary, context_before, context_after
+        if PromptBuilder.estimate_tokens(render(summary, context_before, context_after)) <= token_budget:
+            return summary, context_before, context_after
+
+        before_tokens = PromptBuilder.estimate_tokens(context_before)
+        after_tokens = PromptBuilder.estimate_tokens(context_after)
+        # 用占位前后文计算固定部分（前后文为空时部分模板会换成更短的版本）
+        available = token_budget - PromptBuilder.estimate_tokens(render(summary, '…', '…'))
+        # 估算与实际拼接仍可能有出入，超出时按超出量收紧后重试
+        for _ in range(3):
+            if available <= 0:
+                break
+            # 各分一半，一侧用不完的额度让给另一侧
+            before_share = max(available // 2, available - after_tokens)
+            after_share = max(available - min(before_tokens, before_share), 0)
+            before = PromptBuilder.trim_to_tokens(context_before, before_share, keep='tail')
+            after = PromptBuilder.trim_to_tokens(context_after, after_share, keep='head')
+            used = PromptBuilder.estimate_tokens(render(summary, before, after))
+            if used <= token_budget:
+                return summary, before, after
+            available -= used - token_budget
+
+        summary_budget = token_budget - PromptBuilder.estimate_tokens(render('', '', ''))
+        return PromptBuilder.trim_to_tokens(summary, summary_budget, keep='head'), '', ''
+
     @staticmethod
     def build_simple_prompt(text: str) -> str:
         return f"""你是专业的中文母语翻译者。
@@ -25,7 +104,13 @@ class PromptBuilder:
 请直接输出中文翻译，不要添加任何标记或解释。"""
     
     @staticmethod
-    def build_context_prompt(text: str, context_before: str = '', context_after: str = '') -> str:
+    def build_context_prompt(text: str, context_before: str = '', context_after: str = '',
+                             token_budget: Optional[int] = None) -> str:
+        if token_budget:
+            _, context_before, context_after = PromptBuilder.fit_to_budget(
+                lambda _summary, before, after: PromptBuilder.build_context_prompt(text, before, after),
+                '', context_before, context_after, token_budget,
+            )
         principles = PromptBuilder.get_base_principles()
         if context_before or context_after:
             prompt = f"""你是专业的中文母语翻译者。
@@ -211,7 +296,65 @@ class PromptBuilder:
 请直接输出总结："""
 
     @staticmethod
-    def build_sliding_window_prompt(text: str, summary: str, context_before: str = '', context_after: str = '') -> str:
+    def build_chunk_summary_prompt(chunk_text: str, index: int, total: int) -> str:
+        """构建长文分段总结提示词（分层总结的第一步）
+
+        Args:
+            chunk_text: 原文的一部分
+            index: 第几部分（从1开始）
+            total: 总部分数
+
+        Returns:
+            格式化后的提示词
+        """
+        return f"""以下是一篇英文文章的第 {index}/{total} 部分，请提供这一部分的简洁总结（100字以内），包括：
+1. 这一部分的主要内容
+2. 出现的关键人物、地点、事件
+3. 重要的专有名词和术语（保留英文原词）
+
+请用中文输出总结，简明扼要即可。
+
+---
+
+【第 {index}/{total} 部分原文】
+{chunk_text}
+
+---
+
+请直接输出总结："""
+
+    @staticmethod
+    def build_merge_summary_prompt(chunk_summaries: list[str]) -> str:
+        """构建合并分段总结的提示词（分层总结的第二步）
+
+        Args:
+            chunk_summaries: 按顺序排列的各部分总结
+
+        Returns:
+            格式化后的提示词
+        """
+        parts = '\n\n'.join(
+            f'【第 {i}/{len(chunk_summaries)} 部分】\n{summary}'
+            for i, summary in enumerate(chunk_summaries, 1)
+        )
+        return f"""以下是一篇英文文章各部分的中文总结（按原文顺序排列），请将它们合并为全文的简洁总结（150字以内），包括：
+1. 文章主题和核心内容
+2. 关键人物、地点、事件
+3. 重要的专有名词和术语（保留英文原词）
+
+请用中文输出总结，简明扼要即可。
+
+---
+
+{parts}
+
+---
+
+请直接输出总结："""
+
+    @staticmethod
+    def build_sliding_window_prompt(text: str, summary: str, context_before: str = '', context_after: str = '',
+                                    token_budget: Optional[int] = None) -> str:
         """构建基于总结和滑动窗口的翻译提示词
 
         Args:
@@ -219,10 +362,16 @@ class PromptBuilder:
             summary: 全文总结
             context_before: 前文上下文（1-2段）
             context_after: 后文上下文（1-2段）
+            token_budget: 提示词 token 上限，超出时裁剪上下文和总结
 
         Returns:
             格式化后的提示词
         """
+        if token_budget:
+            summary, context_before, context_after = PromptBuilder.fit_to_budget(
+                lambda s, before, after: PromptBuilder.build_sliding_window_prompt(text, s, before, after),
+                summary, context_before, context_after, token_budget,
+            )
         prompt = f"""你是专业的中文母语翻译者。
 
 ## 翻译原则
@@ -254,3 +403,61 @@ class PromptBuilder:
 
         return prompt
 
+
+    @staticmethod
+    def build_batch_window_prompt(items: list[tuple[int, str]], summary: str,
+                                  context_before: str = '', context_after: str = '',
+                                  token_budget: Optional[int] = None) -> str:
+        """构建一次翻译多个连续片段的提示词（总结+滑动窗口）
+
+        Args:
+            items: [(序号, 文本)]，序号从1开始
+            summary: 全文总结
+            context_before: 第一个片段之前的上下文
+            context_after: 最后一个片段之后的上下文
+            token_budget: 提示词 token 上限，超出时裁剪上下文和总结（待翻译片段不裁剪）
+
+        Returns:
+            格式化后的提示词，要求模型返回 {"translations": [{"i": 序号, "t": "译文"}]}
+        """
+        if token_budget:
+            summary, context_before, context_after = PromptBuilder.fit_to_budget(
+                lambda s, before, after: PromptBuilder.build_batch_window_prompt(items, s, before, after),
+                summary, context_before, context_after, token_budget,
+            )
+        prompt = f"""你是专业的中文母语翻译者。
+
+## 翻译原则
+{PromptBuilder.get_base_principles()}
+
+## 文章背景
+{summary}
+
+## 翻译任务
+下面是 {len(items)} 个连续的【待翻译片段】，每个片段前有序号。请逐个翻译，确保：
+1. 每个片段单独翻译，不要合并、拆分或调换片段
+2. 术语翻译与全文保持一致
+3. 准确理解代词和指代关系
+4. 保持口语化风格（如果是对话）
+
+## 输出格式
+只输出一个 JSON 对象，不要添加任何其它内容：
+{{"translations": [{{"i": 序号, "t": "该片段的中文翻译"}}]}}
+translations 中必须包含全部 {len(items)} 个序号，每个序号出现一次。
+
+---
+"""
+
+        if context_before:
+            prompt += f"\n【前文参考】（不要翻译）\n{context_before}\n"
+
+        prompt += "\n【待翻译片段】\n"
+        for number, text in items:
+            prompt += f"[{number}] {text}\n"
+
+        if context_after:
+            prompt += f"\n【后文参考】（不要翻译）\n{context_after}\n"
+
+        prompt += "\n---\n\n请直接输出 JSON："
+
+        return prompt
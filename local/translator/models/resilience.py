@@ -0,0 +1,213 @@
+"""Retry backoff and per-provider circuit breaker for model calls
+
+原来两个提供商都按 min(5*attempt, 15) 线性等待、没有抖动、忽略 Retry-After，
+提供商故障时几百个片段任务同时按相同节奏重试，每个最多等待约 50 秒。这里提供：
+
+- 指数退避 + full jitter：等待时间在 [0, min(上限, 基数 * 2^attempt)] 内均匀随机
+- 服务端返回 Retry-After 时按其等待（有上限）
+- 每个提供商一个熔断器：连续失败达到阈值后打开，打开期间直接失败（CircuitOpenError），
+  冷却后放行一个探测请求，成功则关闭、失败则重新打开
+- 每个提供商的延迟 / 错误率 EWMA 和最近延迟分布，供多提供商路由选择和对冲请求使用
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+TRANSLATION_RETRY_BASE_SECONDS = float(os.getenv('TRANSLATION_RETRY_BASE_SECONDS', '1'))
+TRANSLATION_RETRY_MAX_SECONDS = float(os.getenv('TRANSLATION_RETRY_MAX_SECONDS', '15'))
+TRANSLATION_RETRY_AFTER_MAX_SECONDS = float(os.getenv('TRANSLATION_RETRY_AFTER_MAX_SECONDS', '60'))
+TRANSLATION_BREAKER_FAILURES = int(os.getenv('TRANSLATION_BREAKER_FAILURES', '5'))
+TRANSLATION_BREAKER_RECOVERY_SECONDS = float(os.getenv('TRANSLATION_BREAKER_RECOVERY_SECONDS', '30'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开期间的快速失败"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f'{provider} 熔断器已打开，{retry_in:.0f} 秒后重试探测')
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    base: float = TRANSLATION_RETRY_BASE_SECONDS,
+    cap: float = TRANSLATION_RETRY_MAX_SECONDS,
+) -> float:
+    """
+    第 attempt 次重试前的等待秒数（attempt 从 1 开始）
+
+    有 Retry-After 时以它为准（不超过 TRANSLATION_RETRY_AFTER_MAX_SECONDS），
+    否则为 full jitter 指数退避。
+    """
+    if retry_after is not None:
+        return min(retry_after, TRANSLATION_RETRY_AFTER_MAX_SECONDS)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """连续失败计数的熔断器（线程安全，不依赖事件循环）"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = TRANSLATION_BREAKER_FAILURES,
+        recovery_seconds: float = TRANSLATION_BREAKER_RECOVERY_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def check(self):
+        """请求前调用，熔断器打开时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.recovery_seconds - now
+                if remaining > 0:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._transition(HALF_OPEN, '冷却结束，放行探测请求')
+            # 半开状态只放行一个探测请求；探测结果迟迟不来时（例如非计数类错误）超时后再放行一个
+            if self._probe_started is not None and now - self._probe_started < self.recovery_seconds:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self._probe_started + self.recovery_seconds - now)
+            self._probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self._consecutive_failures = 0
+            if self.state != CLOSED:
+                self._probe_started = None
+                self._transition(CLOSED, '探测请求成功')
+
+    def record_failure(self, reason: str):
+        with self._lock:
+            self.stats['failures'] += 1
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._probe_started = None
+                self._open(f'探测请求失败: {reason}')
+            elif self.state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open(f'连续失败 {self._consecutive_failures} 次，最近一次: {reason}')
+
+    def _open(self, reason: str):
+        self._opened_at = time.monotonic()
+        self.stats['opened'] += 1
+        self._transition(OPEN, reason)
+
+    def _transition(self, state: str, reason: str):
+        print(f'[translator] {self.name} 熔断器 {self.state} → {state}（{reason}）')
+        self.state = state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.recovery_seconds
+
+    def summary(self) -> Dict[str, object]:
+        return {**self.stats, 'state': self.state, 'consecutive_failures': self._consecutive_failures}
+
+
+class ProviderHealth:
+    """一个提供商的模型调用延迟和错误率（只统计实际调用 API 的请求，不含缓存命中）"""
+
+    def __init__(self, name: str, alpha: float = 0.2, window: int = 200):
+        self.name = name
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.calls = 0
+        self.errors = 0
+        self._latencies: deque = deque(maxlen=window)
+
+    def record(self, latency: Optional[float], ok: bool):
+        """latency 为 None 表示没有有效耗时（例如熔断器打开时的快速失败）"""
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.error_ewma += self.alpha * ((0.0 if ok else 1.0) - self.error_ewma)
+        if ok and latency is not None:
+            self._latencies.append(latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """最近成功请求延迟的第 p 百分位（0-100）"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'latency_ewma': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'error_ewma': round(self.error_ewma, 3),
+            'p95': round(self.percentile(95), 3) if self._latencies else None,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """按提供商名称返回进程内共享的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+
+_health: Dict[str, ProviderHealth] = {}
+
+
+def get_health(provider: str) -> ProviderHealth:
+    """按提供商名称返回进程内共享的延迟 / 错误率统计"""
+    with _breakers_lock:
+        health = _health.get(provider)
+        if health is None:
+            health = _health[provider] = ProviderHealth(provider)
+        return health
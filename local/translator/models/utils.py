@@ -1,47 +1,194 @@
+import atexit
 import json
+import os
+import queue
+import random
+import re
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 LOG_DIR = Path('logs/translator')
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+# 单个日志文件的大小上限，超出后轮转为 .1、.2 ...（默认: 50MB，保留 5 个）
+TRANSLATION_LOG_MAX_MB = float(os.getenv('TRANSLATION_LOG_MAX_MB', '50'))
+TRANSLATION_LOG_BACKUPS = int(os.getenv('TRANSLATION_LOG_BACKUPS', '5'))
+# 成功的 API 调用按这个比例记录完整的请求 / 响应体（失败的调用总是记录）
+TRANSLATION_LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('TRANSLATION_LOG_PAYLOAD_SAMPLE_RATE', '1.0'))
+# 请求 / 响应体序列化后超过这个字符数时截断（0 表示不截断）
+TRANSLATION_LOG_PAYLOAD_MAX_CHARS = int(os.getenv('TRANSLATION_LOG_PAYLOAD_MAX_CHARS', '4000'))
+# 待写入队列的容量，写盘跟不上时丢弃新日志而不是阻塞翻译
+TRANSLATION_LOG_QUEUE_SIZE = int(os.getenv('TRANSLATION_LOG_QUEUE_SIZE', '10000'))
+
+
+def _truncate_body(body, max_chars: int):
+    """序列化后不超过 max_chars 的原样保留，否则截断为字符串"""
+    text = json.dumps(body, ensure_ascii=False)
+    if max_chars <= 0 or len(text) <= max_chars:
+        return body, len(text)
+    return f'{text[:max_chars]}...(已截断，共 {len(text)} 字符)', len(text)
+
+
+class _LogWriter:
+    """
+    后台写日志线程：调用方只把日志放进队列，格式化、序列化和写盘都在这个线程里完成
+
+    每次取出队列里积压的所有日志，按文件分组后一次写入；文件超过大小上限时轮转。
+    """
+
+    def __init__(self, max_bytes: int, backups: int, queue_size: int):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='translation-log-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, when: datetime, record):
+        try:
+            self._queue.put_nowait((kind, when, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None):
+        """等待队列中已有的日志全部写入"""
+        done = threading.Event()
+        try:
+            self._queue.put((None, None, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        grouped: Dict[Path, list] = {}
+        markers = []
+        for kind, when, record in batch:
+            if kind is None:
+                markers.append(record)
+                continue
+            try:
+                line = _format_record(kind, when, record)
+            except Exception as e:
+                line = f'[{when:%Y-%m-%d %H:%M:%S}] [error] 日志格式化失败: {e}\n'
+            prefix = 'translation' if kind == 'log' else 'api_calls'
+            path = LOG_DIR / f"{prefix}_{when.strftime('%Y%m%d')}.log"
+            grouped.setdefault(path, []).append(line)
+
+        for path, lines in grouped.items():
+            try:
+                self._append(path, lines)
+            except Exception as e:
+                print(f'[error] 写入日志失败: {e}')
+        if self.dropped:
+            print(f'[warn] 翻译日志队列已满，丢弃 {self.dropped} 条日志')
+            self.dropped = 0
+        for done in markers:
+            done.set()
+
+    def _append(self, path: Path, lines: list):
+        """追加写入，写满 max_bytes 时轮转（一批日志可能跨多个文件）"""
+        size = path.stat().st_size if path.exists() else 0
+        chunk, chunk_bytes = [], 0
+        for line in lines:
+            line_bytes = len(line.encode('utf-8'))
+            if self.max_bytes > 0 and size + chunk_bytes + line_bytes > self.max_bytes and size + chunk_bytes > 0:
+                if chunk:
+                    with open(path, 'a', encoding='utf-8') as f:
+                        f.write(''.join(chunk))
+                self._rotate(path)
+                size, chunk, chunk_bytes = 0, [], 0
+            chunk.append(line)
+            chunk_bytes += line_bytes
+        if chunk:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(chunk))
+
+    def _rotate(self, path: Path):
+        if self.backups <= 0:
+            path.unlink(missing_ok=True)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = path.with_name(f'{path.name}.{index}')
+            if older.exists():
+                older.replace(path.with_name(f'{path.name}.{index + 1}'))
+        if path.exists():
+            path.replace(path.with_name(f'{path.name}.1'))
+
+
+def _format_record(kind: str, when: datetime, record) -> str:
+    timestamp = when.strftime('%Y-%m-%d %H:%M:%S')
+    if kind == 'log':
+        level, message = record
+        return f"[{timestamp}] [{level}] {message}\n"
+
+    endpoint, payload, response, duration, success, with_bodies = record
+    payload_body, payload_size = _truncate_body(payload, TRANSLATION_LOG_PAYLOAD_MAX_CHARS)
+    if response:
+        response_body, response_size = _truncate_body(response, TRANSLATION_LOG_PAYLOAD_MAX_CHARS)
+    else:
+        response_body, response_size = response, 0
+    log_entry = {
+        'timestamp': timestamp,
+        'endpoint': endpoint,
+        'payload_size': payload_size,
+        'response_size': response_size,
+        'duration_ms': round(duration * 1000, 2),
+        'success': success,
+    }
+    if with_bodies:
+        log_entry['payload'] = payload_body
+        log_entry['response'] = response_body
+    return json.dumps(log_entry, ensure_ascii=False) + '\n'
+
+
+_writer: Optional[_LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _LogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _LogWriter(
+                int(TRANSLATION_LOG_MAX_MB * 1024 * 1024), TRANSLATION_LOG_BACKUPS, TRANSLATION_LOG_QUEUE_SIZE
+            )
+            # 进程退出前把队列里剩下的日志写完
+            atexit.register(_writer.flush, 5.0)
+        return _writer
+
+
 class TranslationLogger:    
+    """翻译日志：写入由后台线程批量完成，调用方（事件循环）只做入队"""
+
     def __init__(self):
-        self.log_file = LOG_DIR / f"translation_{datetime.now().strftime('%Y%m%d')}.log"
-        self.api_log_file = LOG_DIR / f"api_calls_{datetime.now().strftime('%Y%m%d')}.log"
+        self._writer = _get_writer()
     
     def log(self, level: str, message: str):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f"[{timestamp}] [{level}] {message}\n"
-
-        try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-        except Exception as e:
-            print(f'[error] 写入日志失败: {e}')
+        self._writer.submit('log', datetime.now(), (level, message))
         
         if level in ('error', 'warn'):
             print(f'[{level}] {message}')
     
     def log_api_call(self, endpoint: str, payload: dict, response: dict, duration: float, success: bool):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = {
-            'timestamp': timestamp,
-            'endpoint': endpoint,
-            'payload_size': len(json.dumps(payload)),
-            'response_size': len(json.dumps(response)) if response else 0,
-            'duration_ms': round(duration * 1000, 2),
-            'success': success,
-            'payload': payload,
-            'response': response,
-        }
-        
-        try:
-            with open(self.api_log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-        except Exception as e:
-            print(f'[error] 写入 API 日志失败: {e}')
+        # 请求 / 响应体在后台线程里序列化；是否记录完整内容在这里抽样决定
+        with_bodies = not success or random.random() < TRANSLATION_LOG_PAYLOAD_SAMPLE_RATE
+        self._writer.submit('api', datetime.now(), (endpoint, payload, response, duration, success, with_bodies))
+
+    def flush(self, timeout: Optional[float] = None):
+        """等待已提交的日志写入磁盘"""
+        self._writer.flush(timeout)
 
 
 class ResponseParser:    
@@ -65,3 +212,42 @@ class ResponseParser:
         if not translated_text:
             translated_text = result.get('text', '')
         return translated_text.strip() if translated_text else None
+
+    @staticmethod
+    def parse_indexed_translations(text: str, expected_indices: Iterable[int]) -> Dict[int, str]:
+        """
+        解析批量翻译返回的 {"translations": [{"i": 序号, "t": "译文"}]}
+
+        只返回序号在 expected_indices 中、译文非空的条目；JSON 无法解析、
+        序号重复或不是整数时返回空字典（整批回退逐段翻译）。
+        """
+        if not text:
+            return {}
+        expected = set(expected_indices)
+        cleaned = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+        start = min((pos for pos in (cleaned.find('{'), cleaned.find('[')) if pos >= 0), default=-1)
+        if start < 0:
+            return {}
+        try:
+            data, _ = json.JSONDecoder().raw_decode(cleaned[start:])
+        except ValueError:
+            return {}
+
+        items = data.get('translations') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {}
+
+        parsed: Dict[int, str] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index, translation = item.get('i'), item.get('t')
+            if isinstance(index, str) and index.strip().isdigit():
+                index = int(index)
+            if not isinstance(index, int) or isinstance(index, bool):
+                return {}
+            if index in parsed:
+                return {}
+            if index in expected and isinstance(translation, str) and translation.strip():
+                parsed[index] = translation.strip()
+        return parsed
@@ -7,8 +7,14 @@ from typing import Optional
 import httpx
 
 from .base import BaseModelProvider
+from .resilience import parse_retry_after
 from .utils import ResponseParser
 
+try:
+    from ...http_client import get_client
+except ImportError:
+    from http_client import get_client
+
 XYKS_API_KEY = os.getenv('XYKS_API_KEY', '')
 XYKS_API_ENDPOINT = 'https://leo.zhenguanyu.com/leo-cms-python/llm/chat'
 XYKS_MODEL = os.getenv('XYKS_MODEL', 'gpt-4o')
@@ -16,16 +22,13 @@ XYKS_BIZ = int(os.getenv('XYKS_BIZ', '6'))
 
 
 class XYKSModelProvider(BaseModelProvider):    
+    provider_name = 'xyks'
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, biz: Optional[int] = None):
         super().__init__()
         self.api_key = api_key or XYKS_API_KEY
         self.model = model or XYKS_MODEL
         self.biz = biz or XYKS_BIZ
-        self.client = httpx.AsyncClient(timeout=30.0)
-    
-    async def close(self):
-        """关闭 HTTP 客户端"""
-        await self.client.aclose()
     
     async def call_model(self, prompt: str, max_retries: int = 5) -> str:
         """
@@ -62,15 +65,17 @@ class XYKSModelProvider(BaseModelProvider):
         }
         
         last_error = None
+        retry_after = None
         for attempt in range(max_retries):
+            if attempt > 0:
+                await self._backoff(attempt, max_retries, retry_after)
+                retry_after = None
+            # 熔断器打开时直接失败，不再重试
+            self.breaker.check()
             start_time = asyncio.get_event_loop().time()
             try:
-                if attempt > 0:
-                    wait_time = min(5 * attempt, 15)
-                    self.logger.log('warn', f'第 {attempt + 1}/{max_retries} 次重试，等待 {wait_time} 秒...')
-                    await asyncio.sleep(wait_time)
-                
-                response = await self.client.post(
+                # 进程内共享连接池（http_client），连接在多次调用之间保持 keep-alive
+                response = await get_client(XYKS_API_ENDPOINT).post(
                     XYKS_API_ENDPOINT,
                     json=payload,
                     headers=headers,
@@ -79,6 +84,7 @@ class XYKSModelProvider(BaseModelProvider):
                 duration = asyncio.get_event_loop().time() - start_time
                 
                 if response.status_code == 200:
+                    self._record_success(duration)
                     text = response.text
                     
                     try:
@@ -165,6 +171,8 @@ class XYKSModelProvider(BaseModelProvider):
                     
                     last_error = f"HTTP {response.status_code}: {error_text[:200]}"
                     if response.status_code == 429 or response.status_code >= 500:
+                        self._record_failure(f'HTTP {response.status_code}')
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
                         if attempt < max_retries - 1:
                             continue
                         else:
@@ -174,6 +182,8 @@ class XYKSModelProvider(BaseModelProvider):
                             
             except (httpx.TimeoutException, httpx.NetworkError) as e:
                 duration = asyncio.get_event_loop().time() - start_time
+                timed_out = isinstance(e, httpx.TimeoutException)
+                self._record_failure('请求超时' if timed_out else f'网络错误: {e}', overload=timed_out)
                 self.logger.log_api_call(
                     XYKS_API_ENDPOINT,
                     payload,
@@ -0,0 +1,131 @@
+"""多提供商路由：按批选择提供商、对冲请求和故障切换
+
+TRANSLATOR_PROVIDER 配置多个提供商（例如 "xyks,alibaba"）时启用：
+
+- 每次 translate_batch 选择当前更快的提供商（延迟 EWMA，按错误率加权；熔断器打开的排除）
+- 单次模型调用超过该提供商最近延迟的第 TRANSLATION_HEDGE_PERCENTILE 百分位仍未返回时，
+  向另一个提供商发出同样的请求，谁先返回用谁，另一个取消
+- 主提供商熔断器打开或调用失败时，直接切换到另一个提供商
+"""
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models.base import BaseModelProvider
+
+# 对冲请求的延迟百分位（0 表示不对冲，只做故障切换）
+TRANSLATION_HEDGE_PERCENTILE = float(os.getenv('TRANSLATION_HEDGE_PERCENTILE', '95'))
+# 延迟样本少于这个数时使用 TRANSLATION_HEDGE_DEFAULT_SECONDS 作为对冲等待时间
+TRANSLATION_HEDGE_MIN_SAMPLES = int(os.getenv('TRANSLATION_HEDGE_MIN_SAMPLES', '20'))
+TRANSLATION_HEDGE_DEFAULT_SECONDS = float(os.getenv('TRANSLATION_HEDGE_DEFAULT_SECONDS', '15'))
+
+
+class ProviderRouter:
+    """在多个提供商之间选择、对冲和切换（providers 的顺序即默认优先级）"""
+
+    def __init__(
+        self,
+        providers: List[BaseModelProvider],
+        hedge_percentile: float = TRANSLATION_HEDGE_PERCENTILE,
+        hedge_min_samples: int = TRANSLATION_HEDGE_MIN_SAMPLES,
+        hedge_default_seconds: float = TRANSLATION_HEDGE_DEFAULT_SECONDS,
+    ):
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_seconds = hedge_default_seconds
+        self.stats = {'hedges': 0, 'hedge_wins': 0, 'failovers': 0}
+
+    def _ranked(self, exclude: Optional[BaseModelProvider] = None) -> List[BaseModelProvider]:
+        candidates = [p for p in self.providers if p is not exclude]
+
+        # 还没有延迟样本的提供商排在有样本的之后（它们之间保持配置顺序）
+        def score(provider: BaseModelProvider):
+            latency = provider.health.latency_ewma
+            if latency is None:
+                return (provider.breaker.is_open, True, 0.0)
+            return (provider.breaker.is_open, False, latency * (1 + 4 * provider.health.error_ewma))
+
+        return sorted(candidates, key=score)
+
+    def pick(self) -> BaseModelProvider:
+        """为一批翻译选择主提供商"""
+        return self._ranked()[0]
+
+    def _hedge_delay(self, provider: BaseModelProvider) -> Optional[float]:
+        if self.hedge_percentile <= 0:
+            return None
+        if provider.health.samples < self.hedge_min_samples:
+            return self.hedge_default_seconds
+        return provider.health.percentile(self.hedge_percentile)
+
+    async def generate(self, primary: BaseModelProvider, prompt: str,
+                       validate: Optional[Callable[[str], bool]] = None) -> str:
+        alternates = [p for p in self._ranked(exclude=primary) if not p.breaker.is_open]
+        if not alternates:
+            return await primary._generate_cached(prompt, validate)
+        secondary = alternates[0]
+
+        if primary.breaker.is_open:
+            self.stats['failovers'] += 1
+            return await secondary._generate_cached(prompt, validate)
+
+        started = asyncio.Event()
+        primary_task = asyncio.ensure_future(primary._generate_cached(prompt, validate, started))
+        # 对冲等待从真正发出请求开始计时，排队等限流器槽位的时间不算
+        started_task = asyncio.ensure_future(started.wait())
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait({primary_task, started_task}, return_when=asyncio.FIRST_COMPLETED)
+            sent_at = loop.time()
+            done, _ = await asyncio.wait({primary_task}, timeout=self._hedge_delay(primary))
+            if done:
+                try:
+                    return primary_task.result()
+                except Exception as e:
+                    self.stats['failovers'] += 1
+                    primary.logger.log('warn', f'{primary.provider_name} 调用失败，切换到 {secondary.provider_name}: {e}')
+                    return await secondary._generate_cached(prompt, validate)
+
+            # 主提供商超过延迟百分位仍未返回，向另一个提供商发对冲请求
+            self.stats['hedges'] += 1
+            secondary_task = asyncio.ensure_future(secondary._generate_cached(prompt, validate))
+            result, hedge_won = await self._first_success(primary_task, secondary_task)
+            if hedge_won and not primary_task.done():
+                # 对冲请求先返回、主提供商被取消：已等待的时间是它这次延迟的下限，记为一个样本，
+                # 让一直慢的主提供商排到后面。输掉的对冲请求不记，它可能刚发出就被取消
+                primary.health.record(loop.time() - sent_at, ok=True)
+            return result
+        finally:
+            started_task.cancel()
+            if not primary_task.done():
+                primary_task.cancel()
+
+    async def _first_success(self, primary_task: asyncio.Future,
+                             secondary_task: asyncio.Future) -> Tuple[str, bool]:
+        """返回 (先成功的结果, 是否为对冲请求)"""
+        pending = {primary_task, secondary_task}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is secondary_task:
+                        self.stats['hedge_wins'] += 1
+                    return task.result(), task is secondary_task
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            **self.stats,
+            'providers': {
+                p.provider_name: {**p.health.summary(), 'breaker': p.breaker.state}
+                for p in self.providers
+            },
+        }
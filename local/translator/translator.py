@@ -1,7 +1,17 @@
 """翻译服务主模块"""
 import os
 from typing import Optional
-from .models import BaseModelProvider, AlibabaModelProvider, XYKSModelProvider
+from .models import BaseModelProvider, AlibabaModelProvider, XYKSModelProvider, MockModelProvider
+from .models.base import current_router
+from .router import ProviderRouter
+
+_PROVIDERS = {
+    'alibaba': AlibabaModelProvider,
+    'xyks': XYKSModelProvider,
+    # 本地模拟提供商，离线调试和基准测试用
+    'mock': MockModelProvider,
+}
+
 
 class Translator:
     """翻译器类，支持多个提供商"""
@@ -11,21 +21,27 @@ class Translator:
         初始化翻译器
         
         Args:
-            provider: 翻译提供商（'alibaba' 或 'xyks'），默认从环境变量读取
-            **kwargs: 传递给具体提供商的参数
+            provider: 翻译提供商（'alibaba'、'xyks' 或本地模拟的 'mock'），默认从环境变量读取；
+                逗号分隔多个时（如 'xyks,alibaba'）启用多提供商路由，第一个为默认首选
+            **kwargs: 传递给（首选）提供商的参数
         """
         provider = provider or os.getenv('TRANSLATOR_PROVIDER', 'xyks')
-        if provider == 'alibaba':
-            self._impl: BaseModelProvider = AlibabaModelProvider(**kwargs)
-        elif provider == 'xyks':
-            self._impl: BaseModelProvider = XYKSModelProvider(**kwargs)
-        else:
-            raise ValueError(f"不支持的翻译器提供商: {provider}。支持的提供商: alibaba, xyks")
+        names = [name.strip() for name in provider.split(',') if name.strip()]
+        for name in names:
+            if name not in _PROVIDERS:
+                raise ValueError(f"不支持的翻译器提供商: {name}。支持的提供商: {', '.join(_PROVIDERS)}")
+        self.providers: list[BaseModelProvider] = [
+            _PROVIDERS[name](**kwargs) if i == 0 else _PROVIDERS[name]()
+            for i, name in enumerate(names)
+        ]
+        self._impl: BaseModelProvider = self.providers[0]
+        self.router: Optional[ProviderRouter] = ProviderRouter(self.providers) if len(self.providers) > 1 else None
         self.provider = provider
     
     async def close(self):
         """关闭翻译器，释放资源"""
-        await self._impl.close()
+        for impl in self.providers:
+            await impl.close()
     
     async def translate_batch(
         self, 
@@ -54,16 +70,27 @@ class Translator:
         Returns:
             翻译后的文本列表
         """
-        return await self._impl.translate_batch(
-            texts,
-            source_lang,
-            target_lang,
-            use_reflection=use_reflection,
-            use_context=use_context,
-            context_window=context_window,
-            use_full_context=use_full_context,
-            **kwargs
-        )
+        impl = self._impl
+        token = None
+        if self.router is not None:
+            # 每批选择当前更快的提供商，批内的模型调用经路由器对冲 / 故障切换
+            impl = self.router.pick()
+            token = current_router.set(self.router)
+        try:
+            return await impl.translate_batch(
+                texts,
+                source_lang,
+                target_lang,
+                use_reflection=use_reflection,
+                use_context=use_context,
+                context_window=context_window,
+                use_full_context=use_full_context,
+                **kwargs
+            )
+        finally:
+            if token is not None:
+                current_router.reset(token)
+                print(f'[translator] 本批首选 {impl.provider_name}，路由统计: {self.router.summary()}')
 
 
 # 全局翻译器实例（单例模式）
@@ -2,6 +2,11 @@
 import httpx
 from typing import List, Dict, Any, Optional
 
+try:
+    from .http_client import get_client
+except ImportError:
+    from http_client import get_client
+
 class PodcastUploader:
     """Podcast上传器"""
     
@@ -19,14 +24,14 @@ class PodcastUploader:
         检查服务端是否已有完整的podcast
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(f'{self.base_url}/check/{podcast_id}')
-                if response.status_code == 404:
-                    return False
-                response.raise_for_status()
-                result = response.json()
-                # 返回是否完整的状态
-                return result.get('success', False) and result.get('is_complete', False)
+            client = get_client(self.base_url)
+            response = await client.get(f'{self.base_url}/check/{podcast_id}', timeout=30.0)
+            if response.status_code == 404:
+                return False
+            response.raise_for_status()
+            result = response.json()
+            # 返回是否完整的状态
+            return result.get('success', False) and result.get('is_complete', False)
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 return False
@@ -44,14 +49,15 @@ class PodcastUploader:
         上传单个podcast到服务器
         """
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f'{self.base_url}/upload',
-                    json=podcast
-                )
-                response.raise_for_status()
-                print(f'[uploader] 上传成功: {podcast.get("id")} - {podcast.get("title", "Unknown")}')
-                return True
+            client = get_client(self.base_url)
+            response = await client.post(
+                f'{self.base_url}/upload',
+                json=podcast,
+                timeout=300.0
+            )
+            response.raise_for_status()
+            print(f'[uploader] 上传成功: {podcast.get("id")} - {podcast.get("title", "Unknown")}')
+            return True
         except httpx.HTTPStatusError as e:
             print(f'[uploader] 上传失败 (HTTP {e.response.status_code}): {podcast.get("id")}')
             print(f'[uploader] 错误信息: {e.response.text}')
@@ -74,24 +80,25 @@ class PodcastUploader:
             # 使用批量上传接口
             try:
                 print(f'[uploader] 开始批量上传 {len(podcasts)} 个podcasts（使用批量接口）...')
-                async with httpx.AsyncClient(timeout=600.0) as client:
-                    response = await client.post(
-                        f'{self.base_url}/upload/batch',
-                        json=podcasts
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    success_count = result.get('success_count', 0)
-                    fail_count = result.get('fail_count', 0)
-                    
-                    print(f'[uploader] 批量上传完成：成功 {success_count}，失败 {fail_count}')
-                    
-                    return {
-                        'success': success_count,
-                        'failed': fail_count,
-                        'total': len(podcasts)
-                    }
+                client = get_client(self.base_url)
+                response = await client.post(
+                    f'{self.base_url}/upload/batch',
+                    json=podcasts,
+                    timeout=600.0
+                )
+                response.raise_for_status()
+                result = response.json()
+                
+                success_count = result.get('success_count', 0)
+                fail_count = result.get('fail_count', 0)
+                
+                print(f'[uploader] 批量上传完成：成功 {success_count}，失败 {fail_count}')
+                
+                return {
+                    'success': success_count,
+                    'failed': fail_count,
+                    'total': len(podcasts)
+                }
             except httpx.HTTPStatusError as e:
                 print(f'[uploader] 批量上传失败 (HTTP {e.response.status_code})')
                 print(f'[uploader] 错误信息: {e.response.text}')
@@ -10,14 +10,17 @@ VOA Learning English 本地处理器
 不上传到 COS 和服务端，仅保存到本地
 """
 import asyncio
+import contextlib
 import json
 import hashlib
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import pandas as pd
-import httpx
 import time
-from whisperx_service import _process_audio_file
+from audio_cache import get_audio_cache
+from downloader import download_to_file
+from http_client import close_all, get_client
+from whisperx_service import WHISPERX_CLIP_BATCH_FILES, _process_audio_file, close_clip_batcher, transcribe_clip
 from translator import translate_segments, get_translator
 from voa_config import (
     VOA_ARCHIVE_DIR,
@@ -56,6 +59,8 @@ class VoaProcessor:
         # 线程安全锁
         self.state_lock = asyncio.Lock()
         self.metadata_lock = asyncio.Lock()
+        # 翻译阶段的并发限制，由 process_batch 设置；下载和转录可以多领先几个，凑满合批转录
+        self.translation_semaphore: Optional[asyncio.Semaphore] = None
 
     def _ensure_directories(self):
         """确保目录存在"""
@@ -148,8 +153,8 @@ class VoaProcessor:
 
     async def download_audio(self, podcast: Dict[str, Any]) -> Optional[Path]:
         """
-        下载音频到本地（带重试机制）
-        支持断点续传：如果已下载则跳过
+        下载音频到本地（流式写盘，带重试机制）
+        支持断点续传：如果已下载则跳过，下载中断时从已下载的位置续传
         """
         podcast_id = podcast['id']
         audio_url = podcast['audioURL']
@@ -166,32 +171,25 @@ class VoaProcessor:
         print(f'[voa-processor] 开始下载音频: {podcast["title"]}')
         print(f'[voa-processor] URL: {audio_url}')
 
-        for retry in range(self.max_retries):
-            try:
-                async with httpx.AsyncClient(timeout=300.0) as client:
-                    response = await client.get(audio_url)
-                    response.raise_for_status()
-
-                    # 保存音频文件
-                    audio_path.write_bytes(response.content)
-                    file_size = len(response.content)
-                    print(f'[voa-processor] 音频下载完成: {file_size} bytes -> {audio_path}')
+        cache = get_audio_cache()
+        try:
+            if cache is not None:
+                await cache.materialize(audio_url, audio_path, max_retries=self.max_retries)
+            else:
+                await download_to_file(
+                    audio_url, audio_path, client=get_client(audio_url), max_retries=self.max_retries
+                )
+        except Exception as e:
+            print(f'[voa-processor] 下载音频失败（已达最大重试次数）: {e}')
+            return None
+        print(f'[voa-processor] 音频下载完成: {audio_path.stat().st_size} bytes -> {audio_path}')
 
-                    # 更新状态（线程安全）
-                    async with self.state_lock:
-                        self.state['downloaded'][podcast_id] = str(audio_path)
-                    await self._save_state()
+        # 更新状态（线程安全）
+        async with self.state_lock:
+            self.state['downloaded'][podcast_id] = str(audio_path)
+        await self._save_state()
 
-                    return audio_path
-            except Exception as e:
-                if retry < self.max_retries - 1:
-                    wait_time = 2 ** retry  # 指数退避：1s, 2s, 4s
-                    print(f'[voa-processor] 下载音频失败 (重试 {retry + 1}/{self.max_retries}): {e}')
-                    print(f'[voa-processor] 等待 {wait_time}s 后重试...')
-                    await asyncio.sleep(wait_time)
-                else:
-                    print(f'[voa-processor] 下载音频失败（已达最大重试次数）: {e}')
-                    return None
+        return audio_path
 
     async def process_podcast(self, podcast: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -221,7 +219,11 @@ class VoaProcessor:
         for retry in range(self.max_retries):
             try:
                 print(f'[voa-processor] 开始转录音频...')
-                transcription_result = await _process_audio_file(audio_path)
+                # process_batch 中与其它短音频合批转录；单独处理（如重试）时直接转录，不等待凑批
+                if self.translation_semaphore is not None:
+                    transcription_result = await transcribe_clip(audio_path)
+                else:
+                    transcription_result = await _process_audio_file(audio_path)
                 segments = transcription_result.get('segments', [])
                 detected_language = transcription_result.get('language', 'en')
                 print(f'[voa-processor] 转录完成：{len(segments)} 个片段')
@@ -240,60 +242,61 @@ class VoaProcessor:
             print(f'[voa-processor] 转录结果为空')
             return None
 
-        # 3. 翻译 segments（带重试，最多重试 5 次）
-        translation_max_retries = 5
-        translation_success = False
-        for retry in range(translation_max_retries):
-            try:
-                print(f'[voa-processor] 开始翻译 {len(segments)} 个片段...')
-                translations = await translate_segments(
-                    segments,
-                    source_lang=detected_language,
-                    target_lang='zh',
-                    use_context=True,
-                    use_full_context=True
-                )
-                for i, segment in enumerate(segments):
-                    segment['translation'] = translations[i] if i < len(translations) else ''
-                success_count = sum(1 for t in translations if t)
-                print(f'[voa-processor] 翻译完成：成功 {success_count}/{len(segments)} 段')
-                translation_success = True
-                break
-            except Exception as e:
-                if retry < translation_max_retries - 1:
-                    wait_time = 2 ** retry
-                    print(f'[voa-processor] 翻译失败 (重试 {retry + 1}/{translation_max_retries}): {e}')
-                    print(f'[voa-processor] 等待 {wait_time}s 后重试...')
-                    await asyncio.sleep(wait_time)
-                else:
-                    print(f'[voa-processor] 翻译失败（已达最大重试次数）: {e}')
-                    # 翻译失败是致命的，返回 None
-                    return None
+        async with self.translation_semaphore or contextlib.nullcontext():
+            # 3. 翻译 segments（带重试，最多重试 5 次）
+            translation_max_retries = 5
+            translation_success = False
+            for retry in range(translation_max_retries):
+                try:
+                    print(f'[voa-processor] 开始翻译 {len(segments)} 个片段...')
+                    translations = await translate_segments(
+                        segments,
+                        source_lang=detected_language,
+                        target_lang='zh',
+                        use_context=True,
+                        use_full_context=True
+                    )
+                    for i, segment in enumerate(segments):
+                        segment['translation'] = translations[i] if i < len(translations) else ''
+                    success_count = sum(1 for t in translations if t)
+                    print(f'[voa-processor] 翻译完成：成功 {success_count}/{len(segments)} 段')
+                    translation_success = True
+                    break
+                except Exception as e:
+                    if retry < translation_max_retries - 1:
+                        wait_time = 2 ** retry
+                        print(f'[voa-processor] 翻译失败 (重试 {retry + 1}/{translation_max_retries}): {e}')
+                        print(f'[voa-processor] 等待 {wait_time}s 后重试...')
+                        await asyncio.sleep(wait_time)
+                    else:
+                        print(f'[voa-processor] 翻译失败（已达最大重试次数）: {e}')
+                        # 翻译失败是致命的，返回 None
+                        return None
 
-        if not translation_success:
-            print(f'[voa-processor] 翻译失败，跳过此 podcast')
-            return None
+            if not translation_success:
+                print(f'[voa-processor] 翻译失败，跳过此 podcast')
+                return None
 
-        # 4. 翻译标题
-        title_translation = None
-        title = podcast.get('title')
-        if title:
-            try:
-                print(f'[voa-processor] 开始翻译标题: {title}')
-                translator = await get_translator()
-                title_translations = await translator.translate_batch(
-                    [title],
-                    source_lang=detected_language,
-                    target_lang='zh',
-                    use_reflection=True,
-                    use_context=False,
-                    use_full_context=False
-                )
-                if title_translations and title_translations[0]:
-                    title_translation = title_translations[0]
-                    print(f'[voa-processor] 标题翻译完成: {title_translation}')
-            except Exception as e:
-                print(f'[voa-processor] 标题翻译失败: {e}')
+            # 4. 翻译标题
+            title_translation = None
+            title = podcast.get('title')
+            if title:
+                try:
+                    print(f'[voa-processor] 开始翻译标题: {title}')
+                    translator = await get_translator()
+                    title_translations = await translator.translate_batch(
+                        [title],
+                        source_lang=detected_language,
+                        target_lang='zh',
+                        use_reflection=True,
+                        use_context=False,
+                        use_full_context=False
+                    )
+                    if title_translations and title_translations[0]:
+                        title_translation = title_translations[0]
+                        print(f'[voa-processor] 标题翻译完成: {title_translation}')
+                except Exception as e:
+                    print(f'[voa-processor] 标题翻译失败: {e}')
 
         # 5. 保存 segments 到本地
         segments_path = self._get_segments_path(podcast)
@@ -390,8 +393,10 @@ class VoaProcessor:
             print(f'[voa-processor] 没有需要处理的 podcasts')
             return []
 
-        # 使用 Semaphore 控制并发数
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # 使用 Semaphore 控制并发数：翻译最多 max_concurrent 个，
+        # 另外允许 WHISPERX_CLIP_BATCH_FILES 个 podcast 在下载/转录，凑成合批转录
+        self.translation_semaphore = asyncio.Semaphore(max_concurrent)
+        semaphore = asyncio.Semaphore(max_concurrent + WHISPERX_CLIP_BATCH_FILES)
         successful = []
         skipped = 0
         failed = 0
@@ -496,12 +501,16 @@ async def main():
 
     print('=== VOA Learning English 本地处理器 ===')
     print(f'并发数: {args.concurrent}')
-    await processor.process_batch(
-        limit=args.limit,
-        channel_filter=args.channel,
-        skip_processed=True,
-        max_concurrent=args.concurrent
-    )
+    try:
+        await processor.process_batch(
+            limit=args.limit,
+            channel_filter=args.channel,
+            skip_processed=True,
+            max_concurrent=args.concurrent
+        )
+    finally:
+        await close_clip_batcher()
+        await close_all()
 
     print('\n=== 处理完成 ===')
     stats = processor.get_statistics()
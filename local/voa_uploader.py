@@ -13,6 +13,7 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from cos_service import COSService
 from uploader import PodcastUploader
+from http_client import close_all
 from voa_config import (
     VOA_ARCHIVE_DIR,
     VOA_METADATA_FILE,
@@ -367,12 +368,15 @@ async def main():
     print(f'服务器: {server_url}')
     print(f'并发数: {args.concurrent}')
 
-    result = await uploader.upload_batch(
-        limit=args.limit,
-        channel_filter=args.channel,
-        skip_uploaded=True,
-        max_concurrent=args.concurrent
-    )
+    try:
+        result = await uploader.upload_batch(
+            limit=args.limit,
+            channel_filter=args.channel,
+            skip_uploaded=True,
+            max_concurrent=args.concurrent
+        )
+    finally:
+        await close_all()
 
     print('\n=== 上传完成 ===')
     print(f'成功: {result["success"]} 个')
@@ -1,9 +1,11 @@
 import os
 import tempfile
 import asyncio
+import hashlib
 import time
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Union
+import numpy as np
 import torch
 _real_torch_load = torch.load
 def _torch_load_legacy(*args, **kwargs):
@@ -11,12 +13,44 @@ def _torch_load_legacy(*args, **kwargs):
     return _real_torch_load(*args, **kwargs)
 torch.load = _torch_load_legacy
 import whisperx
-import httpx
+
+try:
+    from .align_model_cache import AlignModelCache
+    from .audio_cache import get_audio_cache
+    from .transcription_cache import get_transcription_cache
+    from .transcription_pool import TranscriptionPool, default_threads_per_worker, load_whisper_model
+    from .downloader import DownloadError, download_to_file
+    from .http_client import get_client
+except ImportError:
+    from align_model_cache import AlignModelCache
+    from audio_cache import get_audio_cache
+    from transcription_cache import get_transcription_cache
+    from transcription_pool import TranscriptionPool, default_threads_per_worker, load_whisper_model
+    from downloader import DownloadError, download_to_file
+    from http_client import get_client
 
 WHISPERX_MODEL_ID = os.getenv('WHISPERX_MODEL_ID', 'large-v3')
 WHISPERX_BATCH_SIZE = int(os.getenv('WHISPERX_BATCH_SIZE', '8'))
 WHISPERX_COMPUTE_TYPE = os.getenv('WHISPERX_COMPUTE_TYPE')
 WHISPERX_DEVICE_OVERRIDE = os.getenv('WHISPERX_DEVICE')
+# 对齐模型覆盖（默认: 按语言使用 whisperx 自带的默认模型）
+WHISPERX_ALIGN_MODEL = os.getenv('WHISPERX_ALIGN_MODEL') or None
+# 对齐模型缓存的内存上限（MB），以及启动时预加载的语言（逗号分隔）
+WHISPERX_ALIGN_CACHE_MB = float(os.getenv('WHISPERX_ALIGN_CACHE_MB', '4096'))
+WHISPERX_ALIGN_PRELOAD = [
+    code.strip() for code in os.getenv('WHISPERX_ALIGN_PRELOAD', 'en').split(',') if code.strip()
+]
+# whisperx.load_audio 输出的采样率
+WHISPERX_SAMPLE_RATE = 16000
+# 预热用合成音频的时长（秒）
+WHISPERX_WARMUP_SECONDS = float(os.getenv('WHISPERX_WARMUP_SECONDS', '10'))
+# 短音频合批转录：一批最多几个文件，第一个文件到达后最多等待几秒凑批
+WHISPERX_CLIP_BATCH_FILES = int(os.getenv('WHISPERX_CLIP_BATCH_FILES', '8'))
+WHISPERX_CLIP_BATCH_WINDOW = float(os.getenv('WHISPERX_CLIP_BATCH_WINDOW', '2'))
+# whisperx 默认的 VAD 合并长度（秒）
+_VAD_CHUNK_SIZE = 30
+# 解码后的 PCM（16kHz float32）缓存目录，为空时不落盘；重复处理同一音频时直接 memmap 读取
+WHISPERX_DECODE_CACHE_DIR = os.getenv('WHISPERX_DECODE_CACHE_DIR', '')
 
 def _detect_device() -> Tuple[str, str]:
     default_compute = WHISPERX_COMPUTE_TYPE
@@ -32,46 +66,126 @@ def _detect_device() -> Tuple[str, str]:
 
 DEVICE, COMPUTE_TYPE = _detect_device()
 
+# CPU 多进程转录：工作进程数（默认 1，即进程内单模型），每个进程的线程数（默认 CPU 核数 / 进程数）
+WHISPERX_CPU_WORKERS = int(os.getenv('WHISPERX_CPU_WORKERS', '1'))
+WHISPERX_THREADS_PER_WORKER = int(
+    os.getenv('WHISPERX_THREADS_PER_WORKER', str(default_threads_per_worker(WHISPERX_CPU_WORKERS)))
+)
+USE_TRANSCRIPTION_POOL = DEVICE == 'cpu' and WHISPERX_CPU_WORKERS > 1
+# 可以同时转录的音频数，流水线的转录阶段按这个值设置并发
+TRANSCRIBE_CONCURRENCY = WHISPERX_CPU_WORKERS if USE_TRANSCRIPTION_POOL else 1
+
+def _load_align_model(code: str):
+    return whisperx.load_align_model(language_code=code, device=DEVICE, model_name=WHISPERX_ALIGN_MODEL)
+
+
+def _release_device_memory(_code: str):
+    if DEVICE == 'cuda':
+        torch.cuda.empty_cache()
+
+
 class WhisperResources:
     def __init__(self) -> None:
         self.model = None
-        self.align_models: Dict[str, Tuple[object, dict]] = {}
+        self.pool: Optional[TranscriptionPool] = None
+        # 对齐模型按语言做 LRU，每种语言单独加载，不再占用 self.lock
+        self.align_models = AlignModelCache(
+            _load_align_model,
+            int(WHISPERX_ALIGN_CACHE_MB * 1024 * 1024),
+            on_evict=_release_device_memory,
+        )
+        self._align_preloaded = False
         self.lock = asyncio.Lock()
-        # 使用信号量限制 WhisperX 同时只能处理一个音频（因为模型不是线程安全的）
-        self.semaphore = asyncio.Semaphore(1)
+        # 使用信号量限制同时转录的音频数：进程内单模型时为 1（模型不是线程安全的），
+        # 多进程转录时为工作进程数
+        self.semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+        # 对齐模型在主进程里，多进程转录时对齐仍然串行
+        self.align_lock = asyncio.Lock()
+        self.load_seconds: Optional[float] = None
+        self.warmed_up = False
+        # 本轮（如一次定时任务）第一个实际转录的任务耗时，用于对比冷启动与预热后的延迟
+        self.first_job: Optional[Dict] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None or self.pool is not None
 
     async def ensure_model(self):
-        if self.model:
+        if self.model or self.pool:
             return
         async with self.lock:
-            if self.model:
+            if self.model or self.pool:
                 return
-            loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(
-                None, lambda: whisperx.load_model(WHISPERX_MODEL_ID, DEVICE, compute_type=COMPUTE_TYPE)
-            )
+            load_start = time.time()
+            if USE_TRANSCRIPTION_POOL:
+                self.pool = TranscriptionPool(
+                    WHISPERX_CPU_WORKERS,
+                    WHISPERX_THREADS_PER_WORKER,
+                    WHISPERX_MODEL_ID,
+                    DEVICE,
+                    COMPUTE_TYPE,
+                )
+            else:
+                loop = asyncio.get_event_loop()
+                # 与工作进程相同的加载参数（CPU 上线程数为 WHISPERX_THREADS_PER_WORKER）
+                self.model = await loop.run_in_executor(
+                    None,
+                    load_whisper_model,
+                    WHISPERX_MODEL_ID,
+                    DEVICE,
+                    COMPUTE_TYPE,
+                    WHISPERX_THREADS_PER_WORKER,
+                )
+            self.load_seconds = time.time() - load_start
+            print(f'[whisperx] 模型 {WHISPERX_MODEL_ID} 加载完成（耗时 {self.load_seconds:.2f}s）')
+        await self.preload_align_models()
+
+    async def preload_align_models(self):
+        """预加载 WHISPERX_ALIGN_PRELOAD 中的语言（只执行一次）"""
+        if self._align_preloaded:
+            return
+        self._align_preloaded = True
+        await self.align_models.preload(WHISPERX_ALIGN_PRELOAD)
 
     async def get_align_model(self, language_code: str):
-        code = language_code or 'en'
-        if code in self.align_models:
-            return self.align_models[code]
-        async with self.lock:
-            if code in self.align_models:
-                return self.align_models[code]
-            loop = asyncio.get_event_loop()
-            def _load_align():
-                return whisperx.load_align_model(language_code=code, device=DEVICE)
-            align_model, metadata = await loop.run_in_executor(None, _load_align)
-            self.align_models[code] = (align_model, metadata)
-            return self.align_models[code]
+        return await self.align_models.get(language_code)
+
+    def align_stats(self) -> Dict:
+        """对齐模型缓存的命中、未命中、加载耗时等指标"""
+        return self.align_models.summary()
+
+    def reset_job_stats(self):
+        """开始新一轮任务前调用，重新记录本轮第一个任务的耗时"""
+        self.first_job = None
+
+    def record_job(self, seconds: float, cold: bool):
+        if self.first_job is not None:
+            return
+        self.first_job = {'seconds': round(seconds, 2), 'cold': cold, 'warmed_up': self.warmed_up}
+        state = '冷启动（含模型加载）' if cold else ('已预热' if self.warmed_up else '模型已加载')
+        print(f'[whisperx] 本轮首个转录任务耗时 {seconds:.2f}s（{state}）')
 
 
 resources = WhisperResources()
 
 
-async def transcribe_audio_url(audio_url: str) -> Dict:
-    await resources.ensure_model()
+async def download_audio(audio_url: str) -> Path:
+    """下载音频到临时文件并返回路径，调用方负责删除"""
     print(f'[whisperx] 开始从 URL 下载音频文件: {audio_url}')
+    cache = get_audio_cache()
+    if cache is not None:
+        # 经过本地音频缓存：返回的是缓存对象的硬链接，删除它不影响缓存
+        tmp_path = cache.work_path(audio_url)
+        try:
+            await cache.materialize(audio_url, tmp_path)
+        except DownloadError as e:
+            _cleanup_temp_file(tmp_path)
+            raise Exception(str(e))
+        except Exception:
+            _cleanup_temp_file(tmp_path)
+            raise
+        print(f'[whisperx] 音频文件就绪 ({tmp_path.stat().st_size} bytes)')
+        return tmp_path
     try:
         from urllib.parse import urlparse
         parsed_url = urlparse(audio_url)
@@ -79,100 +193,588 @@ async def transcribe_audio_url(audio_url: str) -> Dict:
         suffix = path.suffix or '.mp3'
     except Exception:
         suffix = '.mp3'
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp_path = Path(tmp.name)
+    # 下载目标按 URL 固定，失败时保留 <download_path>.part，下次下载同一 URL 时用 Range 续传；
+    # 完成后改名为独立的临时文件交给调用方，同一 URL 的并发调用不会互相删掉对方的文件
+    url_hash = hashlib.sha256(audio_url.strip().encode('utf-8')).hexdigest()[:32]
+    download_path = Path(tempfile.gettempdir()) / f'whisperx-download-{url_hash}{suffix}'
+    fd, tmp_name = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        for attempt in range(2):
+            result = await download_to_file(audio_url, download_path, client=get_client(audio_url))
+            try:
+                os.replace(download_path, tmp_path)
+                break
+            except FileNotFoundError:
+                # 同一 URL 的另一个调用先把下载结果改名拿走了，重新下载一份
+                if attempt == 1:
+                    raise
+        print(f'[whisperx] 音频文件下载完成 ({result.size} bytes)')
+        return tmp_path
+    except DownloadError as e:
+        _cleanup_temp_file(tmp_path)
+        raise Exception(str(e))
+    except Exception:
+        _cleanup_temp_file(tmp_path)
+        raise
+
+
+async def transcribe_audio_url(audio_url: str) -> Dict:
+    await resources.ensure_model()
+    tmp_path = await download_audio(audio_url)
     try:
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.get(audio_url)
-            response.raise_for_status()
-            tmp.write(response.content)
-            tmp.flush()
-            tmp.close()
-            file_size = len(response.content)
-            print(f'[whisperx] 音频文件下载完成 ({file_size} bytes)')
         result = await _process_audio_file(tmp_path)
         result['temp_file_path'] = str(tmp_path)
         return result
-    except httpx.HTTPStatusError as e:
-        _cleanup_temp_file(tmp_path)
-        raise Exception(f'下载音频文件失败: {e.response.status_code}')
-    except httpx.RequestError as e:
-        _cleanup_temp_file(tmp_path)
-        raise Exception(f'请求音频 URL 失败: {str(e)}')
     except Exception as error:
         _cleanup_temp_file(tmp_path)
         raise Exception(f'转录失败: {str(error)}')
 
 
-async def _process_audio_file(tmp_path: Path) -> Dict:
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _decode_audio(tmp_path: Path, audio_sha256: Optional[str] = None) -> Tuple[np.ndarray, bool]:
+    """
+    用 ffmpeg 把音频解码为 16kHz 单声道 float32 数组，转录和对齐共用这一份
+
+    设置了 WHISPERX_DECODE_CACHE_DIR 时按文件内容缓存解码结果，命中时以只读 memmap 打开。
+    返回 (audio, 是否命中缓存)
+    """
+    if not WHISPERX_DECODE_CACHE_DIR:
+        return whisperx.load_audio(str(tmp_path)), False
+
+    cache_dir = Path(WHISPERX_DECODE_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / f'{audio_sha256 or _file_sha256(tmp_path)}.f32'
+    if cache_path.exists() and cache_path.stat().st_size > 0:
+        return np.memmap(cache_path, dtype=np.float32, mode='r'), True
+
+    audio = whisperx.load_audio(str(tmp_path))
+    partial = cache_path.with_name(cache_path.name + '.tmp')
+    audio.astype(np.float32, copy=False).tofile(partial)
+    os.replace(partial, cache_path)
+    return audio, False
+
+
+def _build_result(segments, language: str, start_time: float, extra_stats: Dict) -> Dict:
+    payload = []
+    for index, segment in enumerate(segments):
+        start = float(segment.get('start') or 0)
+        end = float(segment.get('end') or start)
+        payload.append(
+            {
+                'text': segment.get('text') or '',
+                'start': max(0.0, start),
+                'end': max(start, end),
+            }
+        )
+    total_time = time.time() - start_time
+    print(f'[whisperx] 全部处理完成（总耗时 {total_time:.2f}s）')
+    return {
+        'segments': payload,
+        'language': language,
+        'stats': {
+            'total_segments': len(payload),
+            'processing_time': round(total_time, 2),
+            **extra_stats,
+        }
+    }
+
+
+async def _lookup_transcription(tmp_path: Path, use_cache: bool = True):
+    """计算音频哈希并查询转录缓存，返回 (cache_key, cached)"""
+    loop = asyncio.get_event_loop()
+    cache = get_transcription_cache() if use_cache else None
+    audio_sha256 = await loop.run_in_executor(None, _file_sha256, tmp_path)
+    cache_key = (audio_sha256, WHISPERX_MODEL_ID, COMPUTE_TYPE, WHISPERX_ALIGN_MODEL or 'default')
+    cached = await loop.run_in_executor(None, cache.get, *cache_key) if cache else None
+    return cache_key, cached
+
+
+async def _decode_for_processing(tmp_path: Path, audio_sha256: str) -> Tuple[np.ndarray, float]:
+    loop = asyncio.get_event_loop()
+    file_size = tmp_path.stat().st_size
+    print(f'[whisperx] 音频文件已保存 ({file_size} bytes)，开始转录...')
+
+    # 只解码一次：之前转录和对齐各自调用 ffmpeg 解码、重采样同一个文件
+    decode_start = time.time()
+    audio, decode_cached = await loop.run_in_executor(None, _decode_audio, tmp_path, audio_sha256)
+    decode_time = time.time() - decode_start
+    audio_duration = len(audio) / WHISPERX_SAMPLE_RATE
+    print(
+        f'[whisperx] 音频解码完成（耗时 {decode_time:.2f}s，时长 {audio_duration:.1f}s'
+        f'{"，复用已缓存的解码结果" if decode_cached else ""}）'
+    )
+    return audio, decode_time
+
+
+async def _align_and_store(cache_key, raw_segments, language: str, audio: np.ndarray, decode_time: float,
+                           use_cache: bool = True):
+    """对齐时间戳并写入转录缓存，返回对齐后的片段（对齐失败时为 None）"""
+    loop = asyncio.get_event_loop()
+    aligned_segments = None
+    try:
+        print(f'[whisperx] 开始对齐时间戳...')
+        align_start = time.time()
+        align_model, metadata = await resources.get_align_model(language)
+
+        # 将同步的 align 操作放到 executor 中执行，避免阻塞 event loop
+        def _run_align():
+            return whisperx.align(
+                raw_segments,
+                align_model,
+                metadata,
+                audio,
+                DEVICE,
+                return_char_alignments=False,
+            )
+
+        async with resources.align_lock:
+            aligned = await loop.run_in_executor(None, _run_align)
+        aligned_segments = aligned.get('segments') or None
+        align_time = time.time() - align_start
+        print(f'[whisperx] 对齐完成（耗时 {align_time:.2f}s，复用解码结果，省去约 {decode_time:.2f}s 的重复解码）')
+    except Exception as error:
+        print(f'[warn] align failed: {error}')
+
+    cache = get_transcription_cache() if use_cache else None
+    if cache is not None:
+        try:
+            await loop.run_in_executor(
+                None, cache.put, *cache_key, language, raw_segments, aligned_segments
+            )
+        except Exception as error:
+            print(f'[warn] 写入转录缓存失败: {error}')
+    return aligned_segments
+
+
+async def _process_audio_file(tmp_path: Path, use_cache: bool = True) -> Dict:
     start_time = time.time()
-    await resources.ensure_model()
+    loop = asyncio.get_event_loop()
+
+    # 转录缓存：同一音频、同一模型配置已经转录过时直接复用（use_cache=False 时不读不写）
+    cache_key, cached = await _lookup_transcription(tmp_path, use_cache)
+    if cached is not None and cached.aligned_segments is not None:
+        print(f'[whisperx] 命中转录缓存（{len(cached.aligned_segments)} 个片段），跳过转录和对齐')
+        return _build_result(cached.aligned_segments, cached.language, start_time, {'cached': True})
+
+    cold = not resources.loaded
+    if cached is None:
+        await resources.ensure_model()
 
     # 使用信号量确保同时只有一个音频在处理（WhisperX 模型不是线程安全的）
     async with resources.semaphore:
-        file_size = tmp_path.stat().st_size
-        print(f'[whisperx] 音频文件已保存 ({file_size} bytes)，开始转录...')
-        loop = asyncio.get_event_loop()
-
-        def _run_transcribe():
-            return resources.model.transcribe(
-                str(tmp_path),
-                batch_size=WHISPERX_BATCH_SIZE,
-            )
-        transcribe_start = time.time()
-        result = await loop.run_in_executor(None, _run_transcribe)
-        transcribe_time = time.time() - transcribe_start
-        segments = result.get('segments') or []
-        language = result.get('language') or 'en'
-        print(f'[whisperx] 转录完成（耗时 {transcribe_time:.2f}s）：检测到 {len(segments)} 个片段，语言: {language}')
+        audio, decode_time = await _decode_for_processing(tmp_path, cache_key[0])
 
-        try:
-            print(f'[whisperx] 开始对齐时间戳...')
-            align_start = time.time()
-            align_model, metadata = await resources.get_align_model(language)
-
-            # 将同步的 align 操作放到 executor 中执行，避免阻塞 event loop
-            def _run_align():
-                return whisperx.align(
-                    segments,
-                    align_model,
-                    metadata,
-                    str(tmp_path),
-                    DEVICE,
-                    return_char_alignments=False,
+        if cached is not None:
+            # 上次对齐失败，只重跑对齐
+            raw_segments = cached.raw_segments
+            language = cached.language
+            print(f'[whisperx] 命中转录缓存（{len(raw_segments)} 个片段，未对齐），跳过转录')
+        else:
+            def _run_transcribe():
+                return resources.model.transcribe(
+                    audio,
+                    batch_size=WHISPERX_BATCH_SIZE,
                 )
+            transcribe_start = time.time()
+            if resources.pool is not None:
+                result = await resources.pool.transcribe(audio, WHISPERX_BATCH_SIZE)
+            else:
+                result = await loop.run_in_executor(None, _run_transcribe)
+            transcribe_time = time.time() - transcribe_start
+            raw_segments = result.get('segments') or []
+            language = result.get('language') or 'en'
+            print(f'[whisperx] 转录完成（耗时 {transcribe_time:.2f}s）：检测到 {len(raw_segments)} 个片段，语言: {language}')
 
-            aligned = await loop.run_in_executor(None, _run_align)
-            segments = aligned.get('segments') or segments
-            align_time = time.time() - align_start
-            print(f'[whisperx] 对齐完成（耗时 {align_time:.2f}s）')
+        aligned_segments = await _align_and_store(
+            cache_key, raw_segments, language, audio, decode_time, use_cache
+        )
+
+    resources.record_job(time.time() - start_time, cold)
+    return _build_result(
+        aligned_segments or raw_segments,
+        language,
+        start_time,
+        {
+            'audio_duration': round(len(audio) / WHISPERX_SAMPLE_RATE, 2),
+            'decode_time': round(decode_time, 2),
+            'cached': cached is not None,
+        },
+    )
+
+
+def _vad_chunks(model, audio: np.ndarray) -> List[Dict]:
+    """用模型自带的 VAD 把音频切成不超过 30s 的语音块（与 model.transcribe 内部一致）"""
+    vad_model = model.vad_model
+    if hasattr(vad_model, 'preprocess_audio'):
+        # whisperx >= 3.3：VAD 封装为 Vad 子类
+        waveform = vad_model.preprocess_audio(audio)
+        merge_chunks = vad_model.merge_chunks
+    else:
+        from whisperx.vad import merge_chunks
+        waveform = torch.from_numpy(audio).unsqueeze(0)
+    segments = vad_model({'waveform': waveform, 'sample_rate': WHISPERX_SAMPLE_RATE})
+    return merge_chunks(
+        segments,
+        _VAD_CHUNK_SIZE,
+        onset=model._vad_params['vad_onset'],
+        offset=model._vad_params['vad_offset'],
+    )
+
+
+def _transcribe_packed(model, audios: List[np.ndarray], batch_size: int) -> List[Dict]:
+    """
+    把多个音频的 VAD 语音块放进同一批推理，再按文件拆回
+
+    每个语音块单独解码，与逐个调用 model.transcribe 的结果一致；
+    短音频（VOA 约 3 分钟，只有几个语音块）不再各自凑不满 batch_size。
+    """
+    from faster_whisper.tokenizer import Tokenizer
+
+    chunks = [_vad_chunks(model, audio) for audio in audios]
+    if model.preset_language is not None:
+        languages = [model.preset_language] * len(audios)
+    else:
+        languages = [model.detect_language(audio) for audio in audios]
+
+    results: List[Dict] = [{'segments': [], 'language': language} for language in languages]
+    original_tokenizer = model.tokenizer
+    try:
+        # tokenizer 与语言绑定，按语言分组推理
+        for language in dict.fromkeys(languages):
+            members = [i for i, lang in enumerate(languages) if lang == language]
+            if model.preset_language is None:
+                model.tokenizer = Tokenizer(
+                    model.model.hf_tokenizer,
+                    model.model.model.is_multilingual,
+                    task='transcribe',
+                    language=language,
+                )
+            order = [(i, chunk) for i in members for chunk in chunks[i]]
+
+            def data():
+                for i, chunk in order:
+                    f1 = int(chunk['start'] * WHISPERX_SAMPLE_RATE)
+                    f2 = int(chunk['end'] * WHISPERX_SAMPLE_RATE)
+                    yield {'inputs': audios[i][f1:f2]}
+
+            for (i, chunk), out in zip(order, model(data(), batch_size=batch_size, num_workers=0)):
+                text = out['text']
+                if batch_size in [0, 1, None]:
+                    text = text[0]
+                results[i]['segments'].append(
+                    {
+                        'text': text,
+                        'start': round(chunk['start'], 3),
+                        'end': round(chunk['end'], 3),
+                    }
+                )
+    finally:
+        model.tokenizer = original_tokenizer
+    return results
+
+
+# _transcribe_packed 用到的 whisperx FasterWhisperPipeline 内部属性（requirements 只约束了 whisperx 下限）
+_PACKED_PIPELINE_ATTRS = ('vad_model', '_vad_params', 'preset_language', 'tokenizer', 'detect_language', 'model')
+_packed_unsupported: Optional[str] = None
+
+
+def _packed_supported(model) -> bool:
+    """检查当前 whisperx 版本是否提供合批转录依赖的内部接口，不满足时只提示一次"""
+    global _packed_unsupported
+    if _packed_unsupported is None:
+        missing = [name for name in _PACKED_PIPELINE_ATTRS if not hasattr(model, name)]
+        if not missing and not hasattr(getattr(model, 'model', None), 'hf_tokenizer'):
+            missing.append('model.hf_tokenizer')
+        if not missing:
+            try:
+                import faster_whisper.tokenizer  # noqa: F401
+            except ImportError:
+                missing.append('faster_whisper.tokenizer')
+        _packed_unsupported = ', '.join(missing)
+        if missing:
+            print(f'[warn] 当前 whisperx 版本缺少合批转录依赖的内部接口（{_packed_unsupported}），改为逐个转录')
+    return not _packed_unsupported
+
+
+def _transcribe_many(model, audios: List[np.ndarray], batch_size: int) -> List[Dict]:
+    if _packed_supported(model):
+        try:
+            return _transcribe_packed(model, audios, batch_size)
         except Exception as error:
-            print(f'[warn] align failed: {error}')
+            # 依赖 whisperx 内部接口，版本不兼容时退回逐个转录
+            print(f'[warn] 合批转录失败，改为逐个转录: {error}')
+    return [model.transcribe(audio, batch_size=batch_size) for audio in audios]
+
+
+async def _process_audio_files(paths: List[Path], use_cache: bool = True) -> List[Union[Dict, Exception]]:
+    """
+    批量转录多个短音频，返回与 paths 一一对应的结果（单个文件失败时对应位置为异常）
 
-        payload = []
-        for index, segment in enumerate(segments):
-            start = float(segment.get('start') or 0)
-            end = float(segment.get('end') or start)
-            payload.append(
+    语音块在文件之间合批推理；缓存、解码、对齐与 _process_audio_file 相同。
+    多进程转录时直接按文件分发给工作进程。
+    """
+    start_time = time.time()
+    loop = asyncio.get_event_loop()
+    results: List[Union[Dict, Exception, None]] = [None] * len(paths)
+
+    lookups = await asyncio.gather(
+        *(_lookup_transcription(p, use_cache) for p in paths), return_exceptions=True
+    )
+    pending = []
+    for i, lookup in enumerate(lookups):
+        if isinstance(lookup, Exception):
+            results[i] = lookup
+            continue
+        cache_key, cached = lookup
+        if cached is not None and cached.aligned_segments is not None:
+            print(f'[whisperx] 命中转录缓存（{len(cached.aligned_segments)} 个片段），跳过转录和对齐')
+            results[i] = _build_result(cached.aligned_segments, cached.language, start_time, {'cached': True})
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    cold = not resources.loaded
+    await resources.ensure_model()
+    if resources.pool is not None or len(pending) == 1:
+        outputs = await asyncio.gather(
+            *(_process_audio_file(paths[i], use_cache) for i in pending), return_exceptions=True
+        )
+        for i, output in zip(pending, outputs):
+            results[i] = output
+        return results
+
+    async with resources.semaphore:
+        decoded = {}
+        for i in pending:
+            try:
+                decoded[i] = await _decode_for_processing(paths[i], lookups[i][0][0])
+            except Exception as error:
+                results[i] = error
+
+        to_transcribe = [i for i in decoded if lookups[i][1] is None]
+        transcribed = {}
+        if to_transcribe:
+            transcribe_start = time.time()
+            outputs = await loop.run_in_executor(
+                None,
+                _transcribe_many,
+                resources.model,
+                [decoded[i][0] for i in to_transcribe],
+                WHISPERX_BATCH_SIZE,
+            )
+            transcribe_time = time.time() - transcribe_start
+            transcribed = dict(zip(to_transcribe, outputs))
+            total_segments = sum(len(output.get('segments') or []) for output in outputs)
+            print(
+                f'[whisperx] 合批转录完成（{len(to_transcribe)} 个文件，耗时 {transcribe_time:.2f}s）：'
+                f'共 {total_segments} 个片段'
+            )
+
+        for i, (audio, decode_time) in decoded.items():
+            cache_key, cached = lookups[i]
+            if cached is not None:
+                raw_segments, language = cached.raw_segments, cached.language
+            else:
+                raw_segments = transcribed[i].get('segments') or []
+                language = transcribed[i].get('language') or 'en'
+            aligned_segments = await _align_and_store(
+                cache_key, raw_segments, language, audio, decode_time, use_cache
+            )
+            results[i] = _build_result(
+                aligned_segments or raw_segments,
+                language,
+                start_time,
                 {
-                    'text': segment.get('text') or '',
-                    'start': max(0.0, start),
-                    'end': max(start, end),
-                }
+                    'audio_duration': round(len(audio) / WHISPERX_SAMPLE_RATE, 2),
+                    'decode_time': round(decode_time, 2),
+                    'cached': cached is not None,
+                    'batched_files': len(to_transcribe),
+                },
             )
-        total_time = time.time() - start_time
-        print(f'[whisperx] 全部处理完成（总耗时 {total_time:.2f}s）')
-        return {
-            'segments': payload,
-            'language': language,
-            'stats': {
-                'total_segments': len(payload),
-                'processing_time': round(total_time, 2),
-            }
-        }
+    resources.record_job(time.time() - start_time, cold)
+    return results
+
+
+class _ClipBatcher:
+    """把并发到达的短音频转录请求攒成一批，交给 _process_audio_files"""
+
+    def __init__(self, max_files: int, window: float):
+        self.max_files = max(1, max_files)
+        self.window = window
+        self._pending: List[Tuple[Path, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 事件循环只弱引用任务，这里持有进行中的批次，避免被回收后 submit() 永远等不到结果
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, path: Path) -> Dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((Path(path), future))
+        if len(self._pending) >= self.max_files:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Path, asyncio.Future]]):
+        try:
+            outputs = await _process_audio_files([path for path, _ in batch])
+        except asyncio.CancelledError:
+            self._fail(batch, RuntimeError('短音频合批转录已关闭'))
+            raise
+        except Exception as error:
+            outputs = [error] * len(batch)
+        for (_, future), output in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[Path, asyncio.Future]], error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self):
+        """取消未发出的批次和进行中的批次，等待中的 submit() 收到异常而不是一直挂起"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        self._fail(batch, RuntimeError('短音频合批转录已关闭'))
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_clip_batcher: Optional[_ClipBatcher] = None
+
+
+async def transcribe_clip(tmp_path: Path) -> Dict:
+    """
+    转录一个短音频，与同一时间窗口内到达的其它短音频合批推理
+
+    返回值与 _process_audio_file 相同，适合 VOA 这类几分钟长的音频批量回填。
+    """
+    global _clip_batcher
+    if _clip_batcher is None:
+        _clip_batcher = _ClipBatcher(WHISPERX_CLIP_BATCH_FILES, WHISPERX_CLIP_BATCH_WINDOW)
+    return await _clip_batcher.submit(tmp_path)
+
+
+async def close_clip_batcher():
+    """关闭短音频合批器（进程退出前调用）"""
+    global _clip_batcher
+    if _clip_batcher is not None:
+        batcher, _clip_batcher = _clip_batcher, None
+        await batcher.close()
+
+
 def _cleanup_temp_file(path: Path):
     try:
         path.unlink(missing_ok=True)
     except Exception:
         pass
 
+
+def _synthetic_clip(seconds: float) -> np.ndarray:
+    """生成类语音的合成音频（调幅的谐波 + 噪声），用于预热"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * WHISPERX_SAMPLE_RATE), dtype=np.float32) / WHISPERX_SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / WHISPERX_SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t)) ** 2
+    audio = 0.1 * envelope * voiced + 0.005 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+async def warm_up() -> Dict[str, float]:
+    """
+    加载模型并用一段合成音频跑一遍转录和对齐
+
+    首次推理会初始化 CUDA / CTranslate2 内核和 VAD 模型，预热后首个真实任务不再承担这部分开销。
+    返回 {'load_seconds', 'warmup_seconds'}
+    """
+    loop = asyncio.get_event_loop()
+    load_start = time.time()
+    await resources.ensure_model()
+    load_seconds = time.time() - load_start
+
+    clip = _synthetic_clip(WHISPERX_WARMUP_SECONDS)
+    warmup_start = time.time()
+    try:
+        if resources.pool is not None:
+            await asyncio.gather(
+                *(resources.pool.transcribe(clip, WHISPERX_BATCH_SIZE) for _ in range(resources.pool.workers))
+            )
+        else:
+            await loop.run_in_executor(
+                None, lambda: resources.model.transcribe(clip, batch_size=WHISPERX_BATCH_SIZE)
+            )
+        for code in WHISPERX_ALIGN_PRELOAD[:1]:
+            align_model, metadata = await resources.get_align_model(code)
+            segments = [{'text': 'hello world', 'start': 0.0, 'end': WHISPERX_WARMUP_SECONDS}]
+            await loop.run_in_executor(
+                None,
+                lambda: whisperx.align(segments, align_model, metadata, clip, DEVICE, return_char_alignments=False),
+            )
+    except Exception as error:
+        print(f'[warn] 预热推理失败（不影响正常处理）: {error}')
+    warmup_seconds = time.time() - warmup_start
+    resources.warmed_up = True
+    print(f'[whisperx] 预热完成：模型加载 {load_seconds:.2f}s，合成音频推理 {warmup_seconds:.2f}s')
+    return {'load_seconds': round(load_seconds, 2), 'warmup_seconds': round(warmup_seconds, 2)}
+
+
+async def _benchmark_clips(paths: List[Path]):
+    """对比逐个转录与合批转录同一组短音频的耗时（不读写转录缓存）"""
+    await resources.ensure_model()
+
+    start = time.perf_counter()
+    for path in paths:
+        await _process_audio_file(path, use_cache=False)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await _process_audio_files(paths, use_cache=False)
+    batched = time.perf_counter() - start
+
+    print(f'[whisperx] {len(paths)} 个音频，batch_size={WHISPERX_BATCH_SIZE}')
+    print(f'[whisperx]   逐个转录: {sequential:.1f}s')
+    print(f'[whisperx]   合批转录: {batched:.1f}s')
+    if batched > 0:
+        print(f'[whisperx]   吞吐提升 {sequential / batched:.2f}x')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='短音频合批转录耗时对比')
+    parser.add_argument('audio', nargs='+', type=Path, help='本地音频文件，例如 voa_archive/audio 下的若干 mp3')
+    args = parser.parse_args()
+    asyncio.run(_benchmark_clips(args.audio))
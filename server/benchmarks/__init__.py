@@ -0,0 +1 @@
+"""服务端性能基准工具"""
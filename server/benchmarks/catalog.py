@@ -0,0 +1,205 @@
+"""为基准测试生成合成数据（频道、节目、用户）"""
+import random
+import sqlite3
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List
+
+from ..migrations import ensure_schema
+
+EPISODES_PER_DAY = 4
+
+
+def build_catalog(
+    db_path: str,
+    channels: int = 10,
+    episodes_per_channel: int = 200,
+    users: int = 1000,
+    vip_ratio: float = 0.3,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    在 db_path 中生成合成数据
+
+    每个频道每天 EPISODES_PER_DAY 期节目，时间戳为当天 UTC 零点（与线上数据一致）。
+
+    Returns:
+        {
+            'channels': [{'company', 'channel'}],
+            'podcast_ids': [...],
+            'channel_dates': {(company, channel): [timestamp, ...]},
+            'vip_devices': [...],
+            'free_devices': [...],
+        }
+    """
+    rng = random.Random(seed)
+    ensure_schema(db_path)
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    channel_list: List[Dict[str, str]] = []
+    channel_dates: Dict[tuple, List[int]] = {}
+    podcast_rows = []
+
+    for c in range(channels):
+        company = f"BenchCo{c % 3}"
+        channel = f"Bench Channel {c}"
+        channel_list.append({'company': company, 'channel': channel})
+        dates = []
+        for e in range(episodes_per_channel):
+            day = today - timedelta(days=e // EPISODES_PER_DAY + 1)
+            timestamp = int(day.timestamp())
+            if not dates or dates[-1] != timestamp:
+                dates.append(timestamp)
+            podcast_id = f"bench-{c:04d}-{e:06d}"
+            podcast_rows.append((
+                podcast_id,
+                company,
+                channel,
+                f"audio/bench/{podcast_id}.mp3",
+                f"https://example.com/{podcast_id}.mp3",
+                f"Episode {e} of channel {c}",
+                f"第 {e} 期",
+                "Synthetic episode for benchmarking",
+                timestamp,
+                'en',
+                rng.randint(120, 3600),
+                f"segments/bench/{podcast_id}.json",
+                rng.randint(20, 400),
+            ))
+        channel_dates[(company, channel)] = dates
+
+    vip_devices = []
+    free_devices = []
+    user_rows = []
+    for u in range(users):
+        device_uuid = f"bench-device-{u:07d}"
+        is_vip = rng.random() < vip_ratio
+        (vip_devices if is_vip else free_devices).append(device_uuid)
+        user_rows.append((device_uuid, 1 if is_vip else 0))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany("""
+            INSERT OR REPLACE INTO podcasts
+            (id, company, channel, audioKey, rawAudioUrl, title, titleTranslation, subtitle,
+             timestamp, language, duration, segmentsKey, segmentCount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, podcast_rows)
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (device_uuid, is_vip) VALUES (?, ?)",
+            user_rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {
+        'channels': channel_list,
+        'podcast_ids': [row[0] for row in podcast_rows],
+        'channel_dates': channel_dates,
+        'vip_devices': vip_devices,
+        'free_devices': free_devices,
+    }
+
+
+def build_auth_records(db_path: str, rows: int, seed: int = 42) -> Dict[str, Any]:
+    """
+    为认证相关的表生成合成数据，每张表约 rows 行
+
+    需在 build_catalog 之后调用：会为部分已有用户关联 original_transaction_id。
+    created_at 均匀分布在过去 400 天内，覆盖指标与日志清理的时间范围。
+
+    Returns:
+        {
+            'transaction_ids': [...],           # purchase_records.original_transaction_id
+            'bindings': [(original_transaction_id, device_uuid), ...],
+            'notification_uuids': [...],
+        }
+    """
+    rng = random.Random(seed)
+    ensure_schema(db_path)
+    now = datetime.now(timezone.utc)
+    now_ms = int(now.timestamp() * 1000)
+
+    def _created_at() -> str:
+        return (now - timedelta(seconds=rng.randint(0, 400 * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    conn = sqlite3.connect(db_path)
+    try:
+        devices = [row[0] for row in conn.execute("SELECT device_uuid FROM users ORDER BY id")]
+        transaction_ids = [f"bench-otid-{i:08d}" for i in range(rows)]
+
+        conn.executemany("""
+            INSERT OR IGNORE INTO purchase_records
+            (original_transaction_id, product_id, purchase_date, expire_date, status, environment,
+             device_count, created_at)
+            VALUES (?, 'bench.vip.monthly', ?, ?, ?, 'production', 1, ?)
+        """, [
+            (
+                otid,
+                now_ms - rng.randint(0, 400) * 86400000,
+                now_ms + rng.randint(-200, 200) * 86400000,
+                rng.choice(('active', 'active', 'expired', 'in_retry', 'refunded')),
+                _created_at(),
+            )
+            for otid in transaction_ids
+        ])
+
+        bindings = []
+        if devices:
+            bindings = [(otid, devices[i % len(devices)]) for i, otid in enumerate(transaction_ids)]
+            conn.executemany("""
+                INSERT OR IGNORE INTO device_bindings
+                (original_transaction_id, device_uuid, device_name, bind_time, last_active_time)
+                VALUES (?, ?, 'Bench iPhone', ?, ?)
+            """, [(otid, device, now_ms, now_ms - rng.randint(0, 10**9)) for otid, device in bindings])
+            conn.executemany(
+                "UPDATE users SET original_transaction_id = ?, created_at = ? WHERE device_uuid = ?",
+                [(otid, _created_at(), device) for otid, device in bindings],
+            )
+
+        conn.executemany("""
+            INSERT INTO transaction_logs
+            (original_transaction_id, transaction_id, jws_token, event_type, device_uuid, created_at)
+            VALUES (?, ?, ?, 'purchase', ?, ?)
+        """, [
+            (otid, f"{otid}-t", 'x' * 64, devices[i % len(devices)] if devices else None, _created_at())
+            for i, otid in enumerate(transaction_ids)
+        ])
+        conn.executemany("""
+            INSERT OR IGNORE INTO purchase_events
+            (transaction_id, original_transaction_id, event_type, device_uuid, created_at)
+            VALUES (?, ?, 'purchase', ?, ?)
+        """, [
+            (f"{otid}-t", otid, devices[i % len(devices)] if devices else None, _created_at())
+            for i, otid in enumerate(transaction_ids)
+        ])
+
+        notification_uuids = [f"bench-notification-{i:08d}" for i in range(rows)]
+        conn.executemany("""
+            INSERT OR IGNORE INTO notification_logs
+            (notification_uuid, notification_type, subtype, original_transaction_id, transaction_id,
+             environment, signed_payload, created_at)
+            VALUES (?, 'DID_RENEW', NULL, ?, ?, 'Production', ?, ?)
+        """, [
+            (uuid, transaction_ids[i], f"{transaction_ids[i]}-t", 'x' * 256, _created_at())
+            for i, uuid in enumerate(notification_uuids)
+        ])
+
+        activity_rows = []
+        if devices:
+            for i in range(rows):
+                day = (now - timedelta(days=i % 400)).date().isoformat()
+                activity_rows.append((day, devices[(i * 7919) % len(devices)]))
+        conn.executemany(
+            "INSERT OR IGNORE INTO auth_activity_daily (day, device_uuid) VALUES (?, ?)",
+            activity_rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {
+        'transaction_ids': transaction_ids,
+        'bindings': bindings,
+        'notification_uuids': notification_uuids,
+    }
@@ -0,0 +1,329 @@
+"""
+服务端接口压测
+
+在临时数据库中生成合成数据，然后用两种方式驱动 server.main:app：
+- asgi：进程内 httpx.ASGITransport（无网络开销，测应用本身）
+- uvicorn：启动真实的 uvicorn 多 worker 进程，通过本地 HTTP 访问
+
+输出每个接口的 p50/p95/p99 与 RPS，并保存为 JSON，便于跨版本对比：
+
+    python -m server.benchmarks.load_test --mode asgi --requests 5000 --concurrency 32
+    python -m server.benchmarks.load_test --mode uvicorn --workers 4 --compare bench_results/last_release.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .catalog import build_catalog
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# (接口名, 权重)，权重大致对应客户端的调用比例
+ENDPOINT_WEIGHTS = [
+    ('channels', 5),
+    ('dates', 10),
+    ('podcasts_by_day', 15),
+    ('paged', 30),
+    ('detail', 30),
+    ('check', 5),
+    ('query', 5),
+]
+
+
+def _prepare_env(db_path: str):
+    """服务端在 import 时读取配置，必须在导入 server.main 之前设置"""
+    os.environ["DB_PATH"] = db_path
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("COS_CDN_DOMAIN", "https://cdn.bench.invalid")
+    os.environ.setdefault("COS_CDN_AUTH_KEY", "bench-key")
+    os.environ["LOG_REQUESTS"] = "none"
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class RequestFactory:
+    """按权重随机生成请求（路径 + 鉴权头）"""
+
+    def __init__(self, catalog: Dict[str, Any], tokens: Dict[str, str], seed: int = 7):
+        self.catalog = catalog
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+        self.names = [name for name, _ in ENDPOINT_WEIGHTS]
+        self.weights = [weight for _, weight in ENDPOINT_WEIGHTS]
+        self.devices = list(tokens.keys())
+
+    def next(self) -> Tuple[str, str, Dict[str, str]]:
+        name = self.rng.choices(self.names, weights=self.weights)[0]
+        channel = self.rng.choice(self.catalog['channels'])
+        company, channel_name = channel['company'], channel['channel']
+        dates = self.catalog['channel_dates'][(company, channel_name)]
+        # 偏向最近的日期和前几页，与真实访问分布接近
+        date = dates[min(len(dates) - 1, int(self.rng.expovariate(0.3)))]
+        device = self.rng.choice(self.devices)
+        headers = {'Authorization': f'Bearer {self.tokens[device]}'}
+        base = f'/podcast/info/channels/{company}/{channel_name}'
+
+        if name == 'channels':
+            path = '/podcast/info/channels'
+        elif name == 'dates':
+            path = f'{base}/dates'
+        elif name == 'podcasts_by_day':
+            path = f'{base}/podcasts?timestamp={date}'
+        elif name == 'paged':
+            page = 1 + min(9, int(self.rng.expovariate(0.5)))
+            path = f'{base}/podcasts/paged?page={page}&limit=20'
+        elif name == 'detail':
+            path = f'/podcast/info/detail/{self.rng.choice(self.catalog["podcast_ids"])}'
+        elif name == 'check':
+            path = f'/podcast/info/check/{self.rng.choice(self.catalog["podcast_ids"])}'
+        else:
+            path = f'/podcast/info/query?company={company}&channel={channel_name}&timestamp={date}'
+        return name, path, headers
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    factory: RequestFactory,
+    total_requests: int,
+    concurrency: int,
+) -> Tuple[List[Tuple[str, float, int]], float]:
+    """并发发送 total_requests 个请求，返回 ([(接口名, 耗时ms, 状态码)], 总耗时s)"""
+    samples: List[Tuple[str, float, int]] = []
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name, path, headers = factory.next()
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append((name, (time.perf_counter() - start) * 1000, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples: List[Tuple[str, float, int]], wall_time: float) -> Dict[str, Any]:
+    by_endpoint: Dict[str, List[Tuple[float, int]]] = {}
+    for name, latency, status in samples:
+        by_endpoint.setdefault(name, []).append((latency, status))
+
+    def _stats(items: List[Tuple[float, int]]) -> Dict[str, Any]:
+        # 403（非 VIP 访问付费内容）是正常业务结果，不计为错误；429（详情接口限流）单独统计；
+        # 其余非 2xx（含连接失败的 0）都计为错误。延迟分位数只统计正常响应
+        rate_limited = sum(1 for _, status in items if status == 429)
+        errors = sum(1 for _, status in items if not (200 <= status < 300 or status in (403, 429)))
+        latencies = sorted(latency for latency, status in items if 200 <= status < 300 or status == 403)
+        return {
+            'count': len(items),
+            'errors': errors,
+            'rate_limited': rate_limited,
+            'rps': round(len(items) / wall_time, 1) if wall_time > 0 else 0,
+            'p50_ms': round(_percentile(latencies, 50), 2),
+            'p95_ms': round(_percentile(latencies, 95), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2) if latencies else 0,
+        }
+
+    return {
+        'total': _stats([(latency, status) for _, latency, status in samples]),
+        'endpoints': {name: _stats(items) for name, items in sorted(by_endpoint.items())},
+        'wall_time_s': round(wall_time, 3),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get('/')).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'uvicorn 未在 {timeout}s 内启动: {base_url}')
+
+
+async def _bench_asgi(run: Callable, concurrency: int):
+    from ..main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        return await run(client)
+
+
+async def _bench_uvicorn(run: Callable, concurrency: int, workers: int):
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'server.main:app',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+        ],
+        cwd=str(ROOT_DIR),
+        env=os.environ.copy(),
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        await _wait_ready(base_url)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            return await run(client)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=str(ROOT_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """与基线结果对比，返回每个接口 p95 与 RPS 的变化"""
+    lines = []
+    base_endpoints = baseline.get('results', {}).get('endpoints', {})
+    for name, stats in current['results']['endpoints'].items():
+        base = base_endpoints.get(name)
+        if not base:
+            continue
+        p95_delta = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0
+        rps_delta = (stats['rps'] - base['rps']) / base['rps'] * 100 if base['rps'] else 0
+        lines.append(
+            f"{name:16s} p95 {base['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f}ms ({p95_delta:+.1f}%)  "
+            f"rps {base['rps']:8.1f} -> {stats['rps']:8.1f} ({rps_delta:+.1f}%)"
+        )
+    return lines
+
+
+def print_report(report: Dict[str, Any]):
+    results = report['results']
+    print(f"\n模式: {report['config']['mode']}  并发: {report['config']['concurrency']}  "
+          f"总耗时: {results['wall_time_s']}s")
+    print(f"{'endpoint':16s} {'count':>7s} {'err':>5s} {'429':>5s} {'rps':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+    for name, stats in rows:
+        print(f"{name:16s} {stats['count']:7d} {stats['errors']:5d} {stats.get('rate_limited', 0):5d} {stats['rps']:9.1f} "
+              f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}")
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix='lf-bench-') as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        _prepare_env(db_path)
+
+        build_start = time.perf_counter()
+        catalog = build_catalog(
+            db_path,
+            channels=args.channels,
+            episodes_per_channel=args.episodes,
+            users=args.users,
+            seed=args.seed,
+        )
+        print(f'[bench] 合成数据生成完成（{args.channels} 个频道，{len(catalog["podcast_ids"])} 期节目，'
+              f'{args.users} 个用户，耗时 {time.perf_counter() - build_start:.1f}s）')
+
+        from ..utils.jwt_helper import create_access_token
+        devices = catalog['vip_devices'] + catalog['free_devices']
+        tokens = {device: create_access_token(device) for device in devices[:max(1, args.token_pool)]}
+        factory = RequestFactory(catalog, tokens, seed=args.seed)
+
+        async def run(client: httpx.AsyncClient):
+            if args.warmup:
+                await run_load(client, factory, args.warmup, args.concurrency)
+            return await run_load(client, factory, args.requests, args.concurrency)
+
+        if args.mode == 'asgi':
+            samples, wall_time = await _bench_asgi(run, args.concurrency)
+        else:
+            samples, wall_time = await _bench_uvicorn(run, args.concurrency, args.workers)
+
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'config': {
+            'mode': args.mode,
+            'workers': args.workers if args.mode == 'uvicorn' else 1,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'channels': args.channels,
+            'episodes_per_channel': args.episodes,
+            'users': args.users,
+            'seed': args.seed,
+        },
+        'results': summarize(samples, wall_time),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LanguageFlow 服务端接口压测')
+    parser.add_argument('--mode', choices=['asgi', 'uvicorn'], default='asgi', help='驱动方式（默认 asgi）')
+    parser.add_argument('--workers', type=int, default=4, help='uvicorn worker 数（仅 uvicorn 模式）')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发请求数')
+    parser.add_argument('--requests', type=int, default=5000, help='请求总数')
+    parser.add_argument('--warmup', type=int, default=200, help='预热请求数（不计入结果）')
+    parser.add_argument('--channels', type=int, default=10, help='合成频道数')
+    parser.add_argument('--episodes', type=int, default=500, help='每个频道的节目数')
+    parser.add_argument('--users', type=int, default=2000, help='合成用户数')
+    parser.add_argument('--token-pool', type=int, default=200, help='参与压测的设备数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', type=str, help='结果 JSON 路径（默认 bench_results/<时间>_<模式>.json）')
+    parser.add_argument('--compare', type=str, help='与指定的基线结果 JSON 对比')
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+
+    output = Path(args.output) if args.output else Path('bench_results') / (
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{args.mode}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'\n[bench] 结果已保存: {output}')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        print(f"\n与基线对比（{baseline.get('revision')} @ {baseline.get('generated_at')}）：")
+        for line in compare(report, baseline):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+PodcastDatabase / AuthDatabase 查询计划回归检查
+
+在填充好的临时数据库上逐个调用两个类的方法，通过 trace callback 捕获实际执行的 SQL
+（参数已展开），对每条语句执行 EXPLAIN QUERY PLAN：
+
+- 请求路径上（hot）的方法出现全表扫描（SCAN <table> 且未使用索引）时判定失败
+- EXPECTED_INDEXES 中列出的方法必须命中指定索引，防止索引被删改后查询悄悄退化
+- 同时记录每个数据规模下各方法的耗时，保存为 JSON
+
+存在违规时进程以非零状态退出，可直接放进 CI：
+
+    python -m server.benchmarks.query_plans --sizes 10000
+    python -m server.benchmarks.query_plans --sizes 10000,100000,1000000
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from .catalog import build_auth_records, build_catalog
+from .load_test import _git_revision
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# 合成数据的频道数，节目按 rows / CHANNELS 分配到各频道
+CHANNELS = 20
+
+_SQL_PREFIXES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+# SCAN users / SCAN podcasts；带 INDEX 的扫描（覆盖索引）不算全表扫描
+_FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*\bINDEX\b)')
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """一次方法调用；hot=True 表示在请求路径上，不允许全表扫描"""
+    name: str
+    hot: bool
+    call: Callable[[Any, Any, Dict[str, Any], int], Any]
+
+
+def _channel(data: Dict[str, Any], i: int):
+    channels = data['catalog']['channels']
+    item = channels[i % len(channels)]
+    return item['company'], item['channel']
+
+
+def _podcast_id(data: Dict[str, Any], i: int) -> str:
+    ids = data['catalog']['podcast_ids']
+    return ids[(i * 7919) % len(ids)]
+
+
+def _channel_day(data: Dict[str, Any], i: int) -> int:
+    company, channel = _channel(data, i)
+    dates = data['catalog']['channel_dates'][(company, channel)]
+    return dates[i % len(dates)]
+
+
+def _device(data: Dict[str, Any], i: int) -> str:
+    devices = data['catalog']['vip_devices'] + data['catalog']['free_devices']
+    return devices[(i * 31) % len(devices)]
+
+
+def _otid(data: Dict[str, Any], i: int) -> str:
+    ids = data['auth']['transaction_ids']
+    return ids[(i * 7919) % len(ids)]
+
+
+def _binding(data: Dict[str, Any], i: int):
+    bindings = data['auth']['bindings']
+    return bindings[(i * 7919) % len(bindings)]
+
+
+def _podcast_row(i: int) -> Dict[str, Any]:
+    return {
+        'id': f"qp-insert-{i:08d}",
+        'company': 'BenchCo0',
+        'channel': 'Bench Channel 0',
+        'audioKey': f"audio/qp/{i}.mp3",
+        'timestamp': int(datetime.now(timezone.utc).timestamp()),
+    }
+
+
+SCENARIOS: List[Scenario] = [
+    # PodcastDatabase
+    Scenario('podcast.insert_podcast', True, lambda p, a, d, i: p.insert_podcast(_podcast_row(i))),
+    Scenario('podcast.get_podcast_by_id', True, lambda p, a, d, i: p.get_podcast_by_id(_podcast_id(d, i))),
+    Scenario('podcast.get_podcasts_by_timestamp', True,
+             lambda p, a, d, i: p.get_podcasts_by_timestamp(*_channel(d, i), _channel_day(d, i))),
+    Scenario('podcast.podcast_exists', True, lambda p, a, d, i: p.podcast_exists(_podcast_id(d, i))),
+    Scenario('podcast.is_podcast_complete', True, lambda p, a, d, i: p.is_podcast_complete(_podcast_id(d, i))),
+    Scenario('podcast.get_all_channels', True, lambda p, a, d, i: p.get_all_channels()),
+    Scenario('podcast.get_channel_dates', True, lambda p, a, d, i: p.get_channel_dates(*_channel(d, i))),
+    Scenario('podcast.get_channel_podcasts_by_timestamp', True,
+             lambda p, a, d, i: p.get_channel_podcasts_by_timestamp(*_channel(d, i), _channel_day(d, i))),
+    Scenario('podcast.get_channel_podcasts_paginated.first', True,
+             lambda p, a, d, i: p.get_channel_podcasts_paginated(*_channel(d, i), 1, 20)),
+    Scenario('podcast.get_channel_podcasts_paginated.deep', True,
+             lambda p, a, d, i: p.get_channel_podcasts_paginated(*_channel(d, i), 50, 20)),
+    Scenario('podcast.is_podcast_free', True,
+             lambda p, a, d, i: p.is_podcast_free(
+                 *_channel(d, (i * 7919) % len(d['catalog']['podcast_ids']) // d['episodes']),
+                 _podcast_id(d, i),
+             )),
+    # AuthDatabase
+    Scenario('auth.get_user_by_uuid', True, lambda p, a, d, i: a.get_user_by_uuid(_device(d, i))),
+    Scenario('auth.create_user', True, lambda p, a, d, i: a.create_user(f"qp-device-{i:08d}")),
+    Scenario('auth.update_user_vip_status', True,
+             lambda p, a, d, i: a.update_user_vip_status(_device(d, i), True, _otid(d, i))),
+    Scenario('auth.update_users_vip_status_by_original_transaction_id', True,
+             lambda p, a, d, i: a.update_users_vip_status_by_original_transaction_id(_otid(d, i), True)),
+    Scenario('auth.get_purchase_record', True, lambda p, a, d, i: a.get_purchase_record(_otid(d, i))),
+    Scenario('auth.create_purchase_record', True,
+             lambda p, a, d, i: a.create_purchase_record(
+                 f"qp-otid-{i:08d}", 'bench.vip.monthly', datetime.now(timezone.utc),
+             )),
+    Scenario('auth.update_purchase_record', True,
+             lambda p, a, d, i: a.update_purchase_record(
+                 _otid(d, i), datetime.now(timezone.utc) + timedelta(days=30),
+             )),
+    Scenario('auth.update_purchase_record_expiry', True,
+             lambda p, a, d, i: a.update_purchase_record_expiry(
+                 _otid(d, i), datetime.now(timezone.utc) + timedelta(days=30),
+             )),
+    Scenario('auth.update_purchase_record_status', True,
+             lambda p, a, d, i: a.update_purchase_record_status(_otid(d, i), 'active', environment='production')),
+    Scenario('auth.update_device_count', True, lambda p, a, d, i: a.update_device_count(_otid(d, i), 1)),
+    Scenario('auth.get_device_bindings', True, lambda p, a, d, i: a.get_device_bindings(_otid(d, i))),
+    Scenario('auth.get_device_binding', True, lambda p, a, d, i: a.get_device_binding(*_binding(d, i))),
+    Scenario('auth.create_device_binding', True,
+             lambda p, a, d, i: a.create_device_binding(_otid(d, i), f"qp-device-{i:08d}", 'Bench iPad')),
+    Scenario('auth.update_device_active_time', True,
+             lambda p, a, d, i: a.update_device_active_time(*_binding(d, i))),
+    Scenario('auth.delete_device_binding', True,
+             lambda p, a, d, i: a.delete_device_binding(_otid(d, i), f"qp-missing-{i:08d}")),
+    Scenario('auth.create_transaction_log', True,
+             lambda p, a, d, i: a.create_transaction_log(_otid(d, i), f"qp-t-{i}", 'renew', _device(d, i))),
+    Scenario('auth.log_transaction', True,
+             lambda p, a, d, i: a.log_transaction(_device(d, i), _otid(d, i), 'renew', 'qp-jws')),
+    Scenario('auth.record_auth_activity', True, lambda p, a, d, i: a.record_auth_activity(_device(d, i))),
+    Scenario('auth.record_purchase_event', True,
+             lambda p, a, d, i: a.record_purchase_event(f"qp-t-{i}", _otid(d, i), 'renew', _device(d, i))),
+    Scenario('auth.get_notification_log', True,
+             lambda p, a, d, i: a.get_notification_log(
+                 d['auth']['notification_uuids'][(i * 7919) % len(d['auth']['notification_uuids'])],
+             )),
+    Scenario('auth.create_notification_log', True,
+             lambda p, a, d, i: a.create_notification_log(
+                 f"qp-notification-{i:08d}", 'DID_RENEW', None, _otid(d, i), f"qp-t-{i}", 'Production', 'x' * 256,
+             )),
+    # 管理端指标：date(created_at, ?) 无法使用索引，只记录计划和耗时，不判定失败
+    Scenario('auth.get_metrics_snapshot', False, lambda p, a, d, i: a.get_metrics_snapshot(7)),
+]
+
+# 方法 -> 计划中必须出现的索引
+EXPECTED_INDEXES: Dict[str, List[str]] = {
+    'podcast.get_podcasts_by_timestamp': ['idx_company_channel_timestamp_id'],
+    'podcast.get_channel_dates': ['idx_company_channel_timestamp_id'],
+    'podcast.get_channel_podcasts_by_timestamp': ['idx_company_channel_timestamp_id'],
+    'podcast.get_channel_podcasts_paginated.first': ['idx_company_channel_timestamp_id'],
+    'podcast.get_channel_podcasts_paginated.deep': ['idx_company_channel_timestamp_id'],
+    'podcast.is_podcast_free': ['idx_company_channel_timestamp_id'],
+    'auth.update_users_vip_status_by_original_transaction_id': ['idx_users_trans_id'],
+    'auth.get_device_bindings': ['idx_device_trans_id'],
+}
+
+
+@contextlib.contextmanager
+def _capture_sql() -> Iterator[List[str]]:
+    """临时替换 sqlite3.connect，记录其间所有连接执行的 SQL"""
+    statements: List[str] = []
+    original_connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    sqlite3.connect = traced_connect
+    try:
+        yield statements
+    finally:
+        sqlite3.connect = original_connect
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """返回 EXPLAIN QUERY PLAN 的 detail 列"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """计划中未使用索引的全表扫描"""
+    return [detail for detail in plan if _FULL_SCAN.match(detail) and 'CONSTANT ROW' not in detail]
+
+
+def _normalize(sql: str) -> str:
+    return ' '.join(sql.split())
+
+
+def build_database(db_path: str, rows: int, seed: int = 42) -> Dict[str, Any]:
+    """生成 rows 规模的合成数据（每张表约 rows 行）"""
+    episodes = max(1, rows // CHANNELS)
+    catalog = build_catalog(db_path, channels=CHANNELS, episodes_per_channel=episodes, users=rows, seed=seed)
+    auth = build_auth_records(db_path, rows, seed=seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return {'catalog': catalog, 'auth': auth, 'episodes': episodes}
+
+
+def check_size(rows: int, repeat: int, seed: int = 42) -> Dict[str, Any]:
+    """在 rows 规模下检查所有方法的查询计划并计时"""
+    from ..database import PodcastDatabase
+    from ..models.auth_models import AuthDatabase
+
+    with tempfile.TemporaryDirectory(prefix='lf-qp-') as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'query_plans.db')
+        build_start = time.perf_counter()
+        data = build_database(db_path, rows, seed=seed)
+        build_s = time.perf_counter() - build_start
+        print(f'[query-plans] {rows} 行数据生成完成，耗时 {build_s:.1f}s')
+
+        podcast_db = PodcastDatabase(db_path)
+        auth_db = AuthDatabase(db_path)
+        explain_conn = sqlite3.connect(db_path)
+        results: Dict[str, Any] = {}
+        violations: List[str] = []
+        try:
+            for scenario in SCENARIOS:
+                with _capture_sql() as captured:
+                    scenario.call(podcast_db, auth_db, data, 0)
+
+                statements = []
+                used_plan: List[str] = []
+                for sql in captured:
+                    if not sql.lstrip().upper().startswith(_SQL_PREFIXES):
+                        continue
+                    plan = explain(explain_conn, sql)
+                    scans = full_scans(plan)
+                    used_plan.extend(plan)
+                    statements.append({'sql': _normalize(sql), 'plan': plan, 'full_scans': scans})
+                    if scans and scenario.hot:
+                        violations.append(f"[{rows}] {scenario.name}: 全表扫描 {scans} <- {_normalize(sql)}")
+
+                for index in EXPECTED_INDEXES.get(scenario.name, []):
+                    if not any(index in detail for detail in used_plan):
+                        violations.append(f"[{rows}] {scenario.name}: 未使用索引 {index}")
+
+                timings = []
+                for i in range(1, repeat + 1):
+                    start = time.perf_counter()
+                    scenario.call(podcast_db, auth_db, data, i)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+
+                results[scenario.name] = {
+                    'hot': scenario.hot,
+                    'statements': statements,
+                    'median_ms': round(statistics.median(timings), 3),
+                    'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+                    'max_ms': round(timings[-1], 3),
+                }
+        finally:
+            explain_conn.close()
+
+    return {
+        'rows': rows,
+        'build_s': round(build_s, 1),
+        'scenarios': results,
+        'violations': violations,
+    }
+
+
+def print_report(size_reports: List[Dict[str, Any]]):
+    names = [scenario.name for scenario in SCENARIOS]
+    header = f"{'method':56s}" + ''.join(f"{report['rows']:>12d}" for report in size_reports)
+    print(f"\n中位耗时 (ms)\n{header}")
+    for name in names:
+        cells = ''
+        for report in size_reports:
+            item = report['scenarios'][name]
+            flag = '*' if any(stmt['full_scans'] for stmt in item['statements']) else ' '
+            cells += f"{item['median_ms']:11.3f}{flag}"
+        print(f"{name:56s}{cells}")
+    print("（* 表示计划中包含全表扫描）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LanguageFlow 查询计划回归检查')
+    parser.add_argument('--sizes', type=str, default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='逗号分隔的数据规模（每张表行数）')
+    parser.add_argument('--repeat', type=int, default=50, help='每个方法的计时次数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', type=str, help='结果 JSON 路径（默认 bench_results/<时间>_query_plans.json）')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    size_reports = [check_size(rows, args.repeat, seed=args.seed) for rows in sizes]
+    print_report(size_reports)
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'sqlite_version': sqlite3.sqlite_version,
+        'config': {'sizes': sizes, 'repeat': args.repeat, 'seed': args.seed},
+        'results': size_reports,
+    }
+    output = Path(args.output) if args.output else Path('bench_results') / (
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_query_plans.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'\n[query-plans] 结果已保存: {output}')
+
+    violations = [line for size_report in size_reports for line in size_report['violations']]
+    if violations:
+        print('\n查询计划检查失败：')
+        for line in violations:
+            print(f'  {line}')
+        sys.exit(1)
+    print('\n查询计划检查通过')
+
+
+if __name__ == '__main__':
+    main()
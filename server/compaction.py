@@ -0,0 +1,325 @@
+"""日志表保留与压缩任务
+
+notification_logs / transaction_logs / purchase_events 只增不减，
+其中 signed_payload、jws_token 体积最大。本任务按保留策略：
+
+1. 把过期行完整归档到压缩的 JSONL 旁路文件（有 zstandard 时用 .zst，否则 .gz）
+2. 小批量清空大字段或删除行，每批一个短事务，批次之间让出写锁
+3. 执行 incremental vacuum，归还空闲页并报告回收的空间
+
+不在请求路径上运行，由 cron 定时调用或以 --interval-hours 常驻：
+
+    python -m server.compaction --db podcasts.db
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .migrations import ensure_schema
+
+logger = logging.getLogger('languageflow.compaction')
+
+DEFAULT_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "200"))
+# 批次之间的休眠时间，给请求路径上的写操作让出锁
+DEFAULT_BATCH_PAUSE_MS = float(os.getenv("COMPACTION_BATCH_PAUSE_MS", "20"))
+# 每步 incremental_vacuum 释放的页数（4KB/页时约 1MB），两步之间休眠 batch_pause 让出写锁
+VACUUM_PAGES_PER_STEP = 256
+
+
+def _env_days(name: str, default: int) -> int:
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """单表保留策略，天数为 0 表示不执行对应动作"""
+    table: str
+    strip_columns: Sequence[str]
+    strip_after_days: int
+    delete_after_days: int
+
+
+def load_policies() -> List[RetentionPolicy]:
+    """从环境变量读取保留策略"""
+    return [
+        # notification_uuid 用于通知幂等，行本身保留较久，只提前清空 signed_payload
+        RetentionPolicy(
+            table='notification_logs',
+            strip_columns=('signed_payload',),
+            strip_after_days=_env_days("RETENTION_NOTIFICATION_PAYLOAD_DAYS", 30),
+            delete_after_days=_env_days("RETENTION_NOTIFICATION_DAYS", 365),
+        ),
+        RetentionPolicy(
+            table='transaction_logs',
+            strip_columns=('jws_token',),
+            strip_after_days=_env_days("RETENTION_TRANSACTION_TOKEN_DAYS", 30),
+            delete_after_days=_env_days("RETENTION_TRANSACTION_DAYS", 365),
+        ),
+        # purchase_events 用于交易去重和 total_transactions 指标，默认不删除
+        RetentionPolicy(
+            table='purchase_events',
+            strip_columns=(),
+            strip_after_days=0,
+            delete_after_days=_env_days("RETENTION_PURCHASE_EVENTS_DAYS", 0),
+        ),
+    ]
+
+
+class _ArchiveWriter:
+    """压缩 JSONL 归档文件，首次写入时才创建"""
+
+    def __init__(self, archive_dir: Path, table: str, action: str):
+        self.archive_dir = archive_dir
+        self.table = table
+        self.action = action
+        self.path: Optional[Path] = None
+        self._raw = None
+        self._writer = None
+        self.rows = 0
+
+    def _open(self):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        try:
+            import zstandard
+            self.path = self.archive_dir / f"{self.table}_{self.action}_{stamp}.jsonl.zst"
+            self._raw = open(self.path, 'ab')
+            self._writer = zstandard.ZstdCompressor(level=10).stream_writer(self._raw)
+        except ImportError:
+            self.path = self.archive_dir / f"{self.table}_{self.action}_{stamp}.jsonl.gz"
+            self._writer = gzip.open(self.path, 'ab')
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        if self._writer is None:
+            self._open()
+        data = ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self._writer.write(data.encode('utf-8'))
+        self._writer.flush()
+        if self._raw is not None:
+            os.fsync(self._raw.fileno())
+        self.rows += len(rows)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+
+
+def _space_stats(conn: sqlite3.Connection, db_path: str) -> Dict[str, int]:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {
+        'file_bytes': os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+        'free_bytes': page_size * freelist,
+    }
+
+
+class Compactor:
+    """按保留策略归档、清理日志表"""
+
+    def __init__(
+        self,
+        db_path: str,
+        archive_dir: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_pause_ms: float = DEFAULT_BATCH_PAUSE_MS,
+        policies: Optional[List[RetentionPolicy]] = None,
+    ):
+        self.db_path = db_path
+        self.archive_dir = Path(archive_dir or os.getenv(
+            "COMPACTION_ARCHIVE_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive"),
+        ))
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause_ms / 1000
+        self.policies = policies if policies is not None else load_policies()
+        # 单个写事务的最长持锁时间，用于确认没有长时间阻塞请求
+        self.max_lock_ms = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _process(
+        self,
+        conn: sqlite3.Connection,
+        policy: RetentionPolicy,
+        action: str,
+        days: int,
+    ) -> Dict[str, Any]:
+        """分批归档并清空字段（strip）或删除行（delete）"""
+        cutoff = f"-{days} days"
+        where = "created_at < datetime('now', ?) AND id > ?"
+        if action == 'strip':
+            where += " AND (" + " OR ".join(f"{col} IS NOT NULL" for col in policy.strip_columns) + ")"
+
+        archive = _ArchiveWriter(self.archive_dir, policy.table, action)
+        last_id = 0
+        affected = 0
+        try:
+            while True:
+                rows = conn.execute(
+                    f"SELECT * FROM {policy.table} WHERE {where} ORDER BY id LIMIT ?",
+                    (cutoff, last_id, self.batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                batch = [dict(row) for row in rows]
+                ids = [row['id'] for row in batch]
+                last_id = ids[-1]
+
+                # 先落盘归档，再在短事务里修改；中途崩溃最多导致重复归档，不会丢数据
+                archive.write_rows(batch)
+
+                placeholders = ','.join('?' * len(ids))
+                if action == 'strip':
+                    assignments = ', '.join(f"{col} = NULL" for col in policy.strip_columns)
+                    sql = f"UPDATE {policy.table} SET {assignments} WHERE id IN ({placeholders})"
+                else:
+                    sql = f"DELETE FROM {policy.table} WHERE id IN ({placeholders})"
+
+                lock_start = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(sql, ids)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self.max_lock_ms = max(self.max_lock_ms, (time.perf_counter() - lock_start) * 1000)
+
+                affected += len(ids)
+                if len(rows) < self.batch_size:
+                    break
+                time.sleep(self.batch_pause)
+        finally:
+            archive.close()
+
+        if affected:
+            logger.info(
+                "日志表%s完成 table=%s rows=%s archive=%s",
+                '清理字段' if action == 'strip' else '删除',
+                policy.table, affected, archive.path,
+            )
+        return {
+            'table': policy.table,
+            'action': action,
+            'rows': affected,
+            'archive': str(archive.path) if archive.path else None,
+        }
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection) -> bool:
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum != 2:
+            logger.warning(
+                "数据库未开启 incremental auto_vacuum，空闲页不会归还给文件系统；"
+                "停服后运行 python -m server.compaction --enable-incremental-vacuum 开启"
+            )
+            return False
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            lock_start = time.perf_counter()
+            # sqlite3 的 execute 只 step 一次，incremental_vacuum 每 step 只释放一页；
+            # executescript 把语句执行到底，一次释放 VACUUM_PAGES_PER_STEP 页（连接为自动提交模式）
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+            self.max_lock_ms = max(self.max_lock_ms, (time.perf_counter() - lock_start) * 1000)
+            time.sleep(self.batch_pause)
+        return True
+
+    def run(self) -> Dict[str, Any]:
+        """执行一次完整的压缩，返回报告"""
+        ensure_schema(self.db_path)
+        start = time.perf_counter()
+        self.max_lock_ms = 0.0
+        conn = self._connect()
+        try:
+            before = _space_stats(conn, self.db_path)
+            results = []
+            for policy in self.policies:
+                if policy.strip_columns and policy.strip_after_days > 0:
+                    results.append(self._process(conn, policy, 'strip', policy.strip_after_days))
+                if policy.delete_after_days > 0:
+                    results.append(self._process(conn, policy, 'delete', policy.delete_after_days))
+            freed = _space_stats(conn, self.db_path)['free_bytes']
+            vacuumed = self._incremental_vacuum(conn)
+            after = _space_stats(conn, self.db_path)
+        finally:
+            conn.close()
+
+        report = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'results': results,
+            'file_bytes_before': before['file_bytes'],
+            'file_bytes_after': after['file_bytes'],
+            'reclaimed_bytes': before['file_bytes'] - after['file_bytes'],
+            'free_bytes_after_cleanup': freed,
+            'incremental_vacuum': vacuumed,
+            'max_lock_ms': round(self.max_lock_ms, 2),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+        logger.info(
+            "压缩完成 reclaimed=%s bytes file=%s->%s max_lock=%.2fms duration=%.1fms",
+            report['reclaimed_bytes'], before['file_bytes'], after['file_bytes'],
+            report['max_lock_ms'], report['duration_ms'],
+        )
+        return report
+
+
+def enable_incremental_vacuum(db_path: str):
+    """
+    把数据库切换为 incremental auto_vacuum
+
+    需要一次完整的 VACUUM（重写整个文件并持有排他锁），只能在停服时执行。
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        start = time.perf_counter()
+        conn.execute("VACUUM")
+        logger.info("已开启 incremental auto_vacuum duration=%.1fms", (time.perf_counter() - start) * 1000)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LanguageFlow 日志表保留与压缩任务')
+    parser.add_argument('--db', type=str, default=os.getenv("DB_PATH", "podcasts.db"), help='数据库路径（默认读取 DB_PATH）')
+    parser.add_argument('--archive-dir', type=str, help='归档目录（默认数据库同级 archive/）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批处理行数')
+    parser.add_argument('--interval-hours', type=float, help='常驻模式：每隔 N 小时执行一次')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true', help='开启 incremental auto_vacuum（需停服）')
+    args = parser.parse_args()
+
+    if not logging.getLogger().hasHandlers():
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(args.db)
+        return
+
+    compactor = Compactor(args.db, archive_dir=args.archive_dir, batch_size=args.batch_size)
+    while True:
+        report = compactor.run()
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if not args.interval_hours:
+            break
+        time.sleep(args.interval_hours * 3600)
+
+
+if __name__ == '__main__':
+    main()
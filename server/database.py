@@ -2,56 +2,13 @@
 import sqlite3
 from datetime import datetime
 from typing import Optional, List, Dict, Any
+from .migrations import ensure_schema
 
 class PodcastDatabase:
     """Podcast数据库操作类"""
     def __init__(self, db_path: str = "podcasts.db"):
         self.db_path = db_path
-        self._init_database()
-    
-    def _init_database(self):
-        """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建podcasts表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS podcasts (
-                id TEXT PRIMARY KEY,
-                company TEXT NOT NULL,
-                channel TEXT NOT NULL,
-                audioKey TEXT NOT NULL,
-                rawAudioUrl TEXT,
-                title TEXT,
-                titleTranslation TEXT,
-                subtitle TEXT,
-                timestamp INTEGER NOT NULL,
-                language TEXT NOT NULL DEFAULT 'en',
-                duration INTEGER,
-                segmentsKey TEXT,
-                segmentCount INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        # 创建索引
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_company_channel 
-            ON podcasts(company, channel)
-        """)
-
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_company_channel_timestamp_id
-            ON podcasts(company, channel, timestamp DESC, id DESC)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON podcasts(timestamp)
-        """)
-        
-        conn.commit()
-        conn.close()
+        ensure_schema(self.db_path)
     
     def insert_podcast(self, podcast_data: Dict[str, Any]) -> str:
         # id 由客户端提供
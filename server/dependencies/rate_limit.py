@@ -0,0 +1,51 @@
+import math
+import os
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
+
+from .auth import get_current_device_uuid
+from ..utils.rate_limiter import TokenBucketRateLimiter
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# 详情接口：默认允许连续 30 次突发请求，之后每 2 秒恢复 1 次
+DETAIL_RATE = float(os.getenv("RATE_LIMIT_DETAIL_RATE", "0.5"))
+DETAIL_BURST = int(os.getenv("RATE_LIMIT_DETAIL_BURST", "30"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# 多 worker 共享限流状态的文件，设为空字符串时每个 worker 单独限流
+RATE_LIMIT_SHARED_PATH = os.getenv(
+    "RATE_LIMIT_SHARED_PATH",
+    os.getenv("DB_PATH", "podcasts.db") + ".ratelimit",
+)
+# 与共享限流状态同步的间隔（秒），worker 之间最多在一个周期内各自放行
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "0.2"))
+
+detail_limiter = TokenBucketRateLimiter(
+    rate=DETAIL_RATE,
+    burst=DETAIL_BURST,
+    max_keys=RATE_LIMIT_MAX_KEYS,
+    shared_path=RATE_LIMIT_SHARED_PATH or None,
+    sync_interval=RATE_LIMIT_SYNC_INTERVAL,
+)
+
+
+async def limit_detail_requests(
+    device_uuid: Annotated[str, Depends(get_current_device_uuid)]
+) -> str:
+    """
+    按 device_uuid 对详情接口限流，通过时返回 device_uuid
+
+    Raises:
+        HTTPException: 超出限额时抛出 429 错误，Retry-After 为建议等待秒数
+    """
+    if not RATE_LIMIT_ENABLED:
+        return device_uuid
+
+    allowed, retry_after = detail_limiter.acquire(device_uuid)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+    return device_uuid
@@ -20,6 +20,7 @@ from .api.metrics_api import get_metrics_handler
 from .schemas.auth import RegisterRequest
 from .schemas.payment import VerifyPurchaseRequest, AppStoreNotificationRequest
 from .dependencies.auth import get_current_device_uuid
+from .dependencies.rate_limit import limit_detail_requests
 
 app = FastAPI(
     title='LanguageFlow Service',
@@ -289,14 +290,14 @@ async def check_podcast_complete(
 
 @podcast_router.get('/detail/{podcast_id}')
 async def get_podcast_detail_by_id(
-    device_uuid: Annotated[str, Depends(get_current_device_uuid)],
+    device_uuid: Annotated[str, Depends(limit_detail_requests)],
     podcast_id: str,
     expires: int = Query(180, description='URL有效期（秒），默认180秒（3分钟）', ge=60, le=3600),
 ):
     """
     根据ID获取podcast详情
     会自动生成临时URL（预签名URL）并返回
-    需要VIP权限（免费试听除外）
+    需要VIP权限（免费试听除外），按设备限流（超出返回429）
     """
     try:
         podcast = podcast_db.get_podcast_by_id(podcast_id)
@@ -0,0 +1,364 @@
+"""数据库 schema 版本化迁移
+
+迁移按版本号顺序执行，已执行的版本记录在 schema_version 表中。
+生产环境由 run.sh 在启动 uvicorn 之前执行一次：
+
+    python -m server.migrations --db podcasts.db
+
+worker 启动时只做一次版本检查（ensure_schema），不再重复执行 DDL。
+"""
+import argparse
+import fcntl
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Any
+
+logger = logging.getLogger('languageflow.migrations')
+
+
+@dataclass(frozen=True)
+class Migration:
+    """单个迁移
+
+    online=True 时每条语句单独提交（不包在一个大事务里），
+    用于在已有数据的表上建索引，避免长时间持有写锁。
+    因为可能在中途被打断后重跑，online 迁移的语句必须是幂等的（IF NOT EXISTS）。
+    """
+    version: int
+    name: str
+    statements: Sequence[str]
+    online: bool = False
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name='podcasts_baseline',
+        statements=[
+            """
+            CREATE TABLE IF NOT EXISTS podcasts (
+                id TEXT PRIMARY KEY,
+                company TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                audioKey TEXT NOT NULL,
+                rawAudioUrl TEXT,
+                title TEXT,
+                titleTranslation TEXT,
+                subtitle TEXT,
+                timestamp INTEGER NOT NULL,
+                language TEXT NOT NULL DEFAULT 'en',
+                duration INTEGER,
+                segmentsKey TEXT,
+                segmentCount INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_company_channel ON podcasts(company, channel)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_company_channel_timestamp_id
+            ON podcasts(company, channel, timestamp DESC, id DESC)
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_timestamp ON podcasts(timestamp)",
+        ],
+    ),
+    Migration(
+        version=2,
+        name='auth_baseline',
+        statements=[
+            # 用户表
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_uuid TEXT UNIQUE NOT NULL,
+                original_transaction_id TEXT,
+                is_vip INTEGER DEFAULT 0,
+                vip_expire_time INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # 付费凭证表
+            """
+            CREATE TABLE IF NOT EXISTS purchase_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                original_transaction_id TEXT UNIQUE NOT NULL,
+                product_id TEXT NOT NULL,
+                purchase_date INTEGER NOT NULL,
+                expire_date INTEGER,
+                status TEXT DEFAULT 'active',
+                environment TEXT DEFAULT 'production',
+                device_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # 设备绑定表
+            """
+            CREATE TABLE IF NOT EXISTS device_bindings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                original_transaction_id TEXT NOT NULL,
+                device_uuid TEXT NOT NULL,
+                device_name TEXT,
+                bind_time INTEGER,
+                last_active_time INTEGER,
+                UNIQUE(original_transaction_id, device_uuid)
+            )
+            """,
+            # 交易日志表
+            """
+            CREATE TABLE IF NOT EXISTS transaction_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                original_transaction_id TEXT NOT NULL,
+                transaction_id TEXT NOT NULL,
+                jws_token TEXT,
+                event_type TEXT,
+                device_uuid TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # 登录/注册日活记录表
+            """
+            CREATE TABLE IF NOT EXISTS auth_activity_daily (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                device_uuid TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(day, device_uuid)
+            )
+            """,
+            # 成功交易事件表（去重）
+            """
+            CREATE TABLE IF NOT EXISTS purchase_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                transaction_id TEXT UNIQUE NOT NULL,
+                original_transaction_id TEXT NOT NULL,
+                event_type TEXT,
+                device_uuid TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # App Store 通知日志表
+            """
+            CREATE TABLE IF NOT EXISTS notification_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_uuid TEXT UNIQUE NOT NULL,
+                notification_type TEXT,
+                subtype TEXT,
+                original_transaction_id TEXT,
+                transaction_id TEXT,
+                environment TEXT,
+                signed_payload TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_users_uuid ON users(device_uuid)",
+            "CREATE INDEX IF NOT EXISTS idx_users_trans_id ON users(original_transaction_id)",
+            "CREATE INDEX IF NOT EXISTS idx_purchase_trans_id ON purchase_records(original_transaction_id)",
+            "CREATE INDEX IF NOT EXISTS idx_device_trans_id ON device_bindings(original_transaction_id)",
+            "CREATE INDEX IF NOT EXISTS idx_device_active ON device_bindings(last_active_time)",
+            "CREATE INDEX IF NOT EXISTS idx_notification_uuid ON notification_logs(notification_uuid)",
+            "CREATE INDEX IF NOT EXISTS idx_notification_trans_id ON notification_logs(original_transaction_id)",
+            "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_purchase_created_at ON purchase_records(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_auth_activity_day ON auth_activity_daily(day)",
+            "CREATE INDEX IF NOT EXISTS idx_purchase_events_created_at ON purchase_events(created_at)",
+        ],
+    ),
+    Migration(
+        version=3,
+        name='podcasts_updated_at_index',
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_podcasts_updated_at ON podcasts(updated_at)",
+        ],
+        online=True,
+    ),
+    Migration(
+        version=4,
+        name='log_tables_created_at_index',
+        statements=[
+            # 供 server.compaction 按时间清理日志表使用
+            "CREATE INDEX IF NOT EXISTS idx_notification_created_at ON notification_logs(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_transaction_logs_created_at ON transaction_logs(created_at)",
+        ],
+        online=True,
+    ),
+]
+
+LATEST_VERSION = max(migration.version for migration in MIGRATIONS)
+
+# 已确认 schema 为最新的数据库路径（进程内缓存，避免每次构造 Database 都查询）
+_checked_paths: Set[str] = set()
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # isolation_level=None：事务由迁移逻辑显式控制
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            duration_ms REAL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _read_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'
+    """).fetchone()
+    if not row:
+        return 0
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def get_schema_version(db_path: str) -> int:
+    """读取当前 schema 版本（没有 schema_version 表时返回 0）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return _read_version(conn)
+    finally:
+        conn.close()
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> float:
+    """执行单个迁移，返回耗时（毫秒）"""
+    start = time.perf_counter()
+    if migration.online:
+        for sql in migration.statements:
+            stmt_start = time.perf_counter()
+            conn.execute(sql)
+            logger.info(
+                "迁移语句完成 version=%s duration=%.1fms sql=%s",
+                migration.version,
+                (time.perf_counter() - stmt_start) * 1000,
+                " ".join(sql.split())[:120],
+            )
+        duration_ms = (time.perf_counter() - start) * 1000
+        conn.execute(
+            "INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)",
+            (migration.version, migration.name, duration_ms),
+        )
+        return duration_ms
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for sql in migration.statements:
+            conn.execute(sql)
+        duration_ms = (time.perf_counter() - start) * 1000
+        conn.execute(
+            "INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)",
+            (migration.version, migration.name, duration_ms),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return duration_ms
+
+
+def run_migrations(db_path: str, target_version: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    执行所有未执行的迁移
+
+    多个进程同时调用时通过文件锁串行化：第一个进程执行迁移，
+    其余进程拿到锁后发现版本已是最新，直接返回。
+
+    Returns:
+        本次执行的迁移列表 [{'version', 'name', 'duration_ms'}]
+    """
+    target = target_version if target_version is not None else LATEST_VERSION
+    applied: List[Dict[str, Any]] = []
+    lock_path = f"{db_path}.migrate.lock"
+
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            conn = _connect(db_path)
+            try:
+                _ensure_version_table(conn)
+                current = _read_version(conn)
+                pending = [m for m in MIGRATIONS if current < m.version <= target]
+                if not pending:
+                    logger.info("schema 已是最新 db=%s version=%s", db_path, current)
+                    return applied
+
+                total_start = time.perf_counter()
+                for migration in sorted(pending, key=lambda m: m.version):
+                    logger.info(
+                        "开始执行迁移 version=%s name=%s online=%s",
+                        migration.version, migration.name, migration.online,
+                    )
+                    duration_ms = _apply(conn, migration)
+                    logger.info(
+                        "迁移完成 version=%s name=%s duration=%.1fms",
+                        migration.version, migration.name, duration_ms,
+                    )
+                    applied.append({
+                        'version': migration.version,
+                        'name': migration.name,
+                        'duration_ms': round(duration_ms, 1),
+                    })
+                logger.info(
+                    "全部迁移完成 db=%s version=%s->%s count=%s duration=%.1fms",
+                    db_path, current, applied[-1]['version'], len(applied),
+                    (time.perf_counter() - total_start) * 1000,
+                )
+            finally:
+                conn.close()
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    return applied
+
+
+def ensure_schema(db_path: str):
+    """
+    确认数据库 schema 为最新版本
+
+    版本已是最新时只做一次查询；否则在 DB_AUTO_MIGRATE 开启时（默认开启）执行迁移，
+    关闭时抛出异常，提示先运行 `python -m server.migrations`。
+    """
+    if db_path in _checked_paths:
+        return
+    if get_schema_version(db_path) < LATEST_VERSION:
+        if os.getenv("DB_AUTO_MIGRATE", "true").lower() != "true":
+            raise RuntimeError(
+                f"数据库 schema 不是最新版本（需要 {LATEST_VERSION}），请先运行 python -m server.migrations"
+            )
+        run_migrations(db_path)
+    _checked_paths.add(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LanguageFlow 数据库迁移')
+    parser.add_argument('--db', type=str, default=os.getenv("DB_PATH", "podcasts.db"), help='数据库路径（默认读取 DB_PATH）')
+    parser.add_argument('--target', type=int, help='迁移到指定版本（默认最新）')
+    parser.add_argument('--status', action='store_true', help='只显示当前版本，不执行迁移')
+    args = parser.parse_args()
+
+    if not logging.getLogger().hasHandlers():
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    if args.status:
+        print(f'当前版本: {get_schema_version(args.db)} / 最新版本: {LATEST_VERSION}')
+        return
+
+    applied = run_migrations(args.db, target_version=args.target)
+    for item in applied:
+        print(f"  v{item['version']} {item['name']}: {item['duration_ms']}ms")
+    print(f'当前版本: {get_schema_version(args.db)}')
+
+
+if __name__ == '__main__':
+    main()
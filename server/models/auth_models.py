@@ -4,6 +4,8 @@ import sqlite3
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Any
 
+from ..migrations import ensure_schema
+
 
 def _to_timestamp_ms(dt: Optional[datetime]) -> Optional[int]:
     """将 datetime 转为毫秒级时间戳（UTC）"""
@@ -39,121 +41,7 @@ class AuthDatabase:
 
     def __init__(self, db_path: str = "podcasts.db"):
         self.db_path = db_path
-        self._init_tables()
-
-    def _init_tables(self):
-        """初始化认证相关表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # 用户表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_uuid TEXT UNIQUE NOT NULL,
-                original_transaction_id TEXT,
-                is_vip INTEGER DEFAULT 0,
-                vip_expire_time INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # 付费凭证表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS purchase_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                original_transaction_id TEXT UNIQUE NOT NULL,
-                product_id TEXT NOT NULL,
-                purchase_date INTEGER NOT NULL,
-                expire_date INTEGER,
-                status TEXT DEFAULT 'active',
-                environment TEXT DEFAULT 'production',
-                device_count INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # 设备绑定表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS device_bindings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                original_transaction_id TEXT NOT NULL,
-                device_uuid TEXT NOT NULL,
-                device_name TEXT,
-                bind_time INTEGER,
-                last_active_time INTEGER,
-                UNIQUE(original_transaction_id, device_uuid)
-            )
-        """)
-
-        # 交易日志表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transaction_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                original_transaction_id TEXT NOT NULL,
-                transaction_id TEXT NOT NULL,
-                jws_token TEXT,
-                event_type TEXT,
-                device_uuid TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # 登录/注册日活记录表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS auth_activity_daily (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                day TEXT NOT NULL,
-                device_uuid TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(day, device_uuid)
-            )
-        """)
-
-        # 成功交易事件表（去重）
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS purchase_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id TEXT UNIQUE NOT NULL,
-                original_transaction_id TEXT NOT NULL,
-                event_type TEXT,
-                device_uuid TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # App Store 通知日志表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notification_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                notification_uuid TEXT UNIQUE NOT NULL,
-                notification_type TEXT,
-                subtype TEXT,
-                original_transaction_id TEXT,
-                transaction_id TEXT,
-                environment TEXT,
-                signed_payload TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # 创建索引
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_uuid ON users(device_uuid)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_trans_id ON users(original_transaction_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchase_trans_id ON purchase_records(original_transaction_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_device_trans_id ON device_bindings(original_transaction_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_device_active ON device_bindings(last_active_time)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_uuid ON notification_logs(notification_uuid)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_trans_id ON notification_logs(original_transaction_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchase_created_at ON purchase_records(created_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_activity_day ON auth_activity_daily(day)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchase_events_created_at ON purchase_events(created_at)")
-
-        conn.commit()
-        conn.close()
+        ensure_schema(self.db_path)
 
     # 用户相关操作
     def get_user_by_uuid(self, device_uuid: str) -> Optional[Dict[str, Any]]:
@@ -52,6 +52,10 @@ EOF
   echo "[Server] 启动服务（端口 ${PORT}）..."
   
   cd "$ROOT_DIR" || exit 1
+
+  # 每次部署只执行一次迁移，worker 启动时只做版本检查
+  echo "[Server] 执行数据库迁移..."
+  "$VENV_PATH/bin/python" -m server.migrations || exit 1
   
   if [ "$ENV" = "production" ]; then
     # 生产环境：多worker，无reload
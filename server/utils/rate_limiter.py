@@ -0,0 +1,212 @@
+"""按设备限流（令牌桶）
+
+每个 device_uuid 一个令牌桶：容量 burst，每秒补充 rate 个令牌，每次请求消耗 1 个。
+
+状态保存方式：
+- 令牌桶始终保存在进程内的有界 LRU（OrderedDict）中，超过 max_keys 时淘汰最久未访问的设备。
+  被淘汰的桶下次访问时按满桶重建，长时间不活跃的设备本来就接近满桶，影响可以忽略。
+  acquire 只做内存操作，可以直接在事件循环中调用
+- 多 worker 共享（shared_path）：后台线程每 sync_interval 秒把本 worker 访问过的设备
+  及其消耗的令牌数合并到一个独立的小 SQLite 文件（WAL + synchronous=OFF，限流状态丢失只会放宽一次），
+  并拉取其它 worker 更新过的桶覆盖本地。本 worker 内存中没有某设备的桶时（第一次访问或已被 LRU 淘汰），
+  acquire 先按主键读一次共享行（WAL 下读不会被写阻塞），不会按满桶放行其它 worker 已经消耗过的设备。
+  其它 worker 尚未同步的消耗（最多一个同步周期）看不到，这段时间内各 worker 可能各自多放行一些。
+  共享文件不可用（锁超时等）时跳过本次同步，继续按进程内令牌桶限流，不影响正常请求
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger('languageflow.ratelimit')
+
+# 每同步这么多次，清理一次超过 burst / rate 秒未访问的桶（早已补满，等价于不存在）
+_PRUNE_EVERY = 1000
+
+
+class TokenBucketRateLimiter:
+    """令牌桶限流器"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_keys: int = 10000,
+        shared_path: Optional[str] = None,
+        sync_interval: float = 0.2,
+    ):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数）
+            max_keys: 进程内 LRU 最多保存的设备数
+            shared_path: 多 worker 共享状态的 SQLite 文件路径，为空时只在进程内限流
+            sync_interval: 与共享状态同步的间隔秒数
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst must be >= 1")
+        self.rate = rate
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self.shared_path = shared_path
+        self.sync_interval = sync_interval
+        # key -> (tokens, updated_at)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # 上次同步以来访问过的 key -> 消耗的令牌数（仅共享模式使用）
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # 后台同步线程和 acquire 各用一个连接，避免 acquire 读到同步线程未提交的事务
+        self._conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._syncs = 0
+        self._last_sync = 0.0
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_pid: Optional[int] = None
+
+    def _remember(self, cache: OrderedDict, key: str, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_keys:
+            cache.popitem(last=False)
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def _acquire_local(self, key: str, now: float) -> Tuple[bool, float]:
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = self._refill(tokens, updated_at, now)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._remember(self._buckets, key, (tokens, now))
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """
+        尝试为 key 消耗一个令牌（共享模式下本 worker 第一次遇到 key 时读一次共享行，其余只访问内存）
+
+        Returns:
+            (是否放行, 建议的重试等待秒数)
+        """
+        if self.shared_path:
+            self._ensure_sync_thread()
+        now = time.time()
+        with self._lock:
+            if self.shared_path and key not in self._buckets:
+                row = self._load_shared(key)
+                if row is not None:
+                    self._buckets[key] = (row[0], row[1])
+            allowed, retry_after = self._acquire_local(key, now)
+            if self.shared_path:
+                self._pending[key] = self._pending.get(key, 0) + (1 if allowed else 0)
+        return allowed, retry_after
+
+    def _ensure_sync_thread(self):
+        # 按进程启动：fork 出来的 worker 不会继承父进程的线程
+        pid = os.getpid()
+        if self._sync_pid == pid:
+            return
+        with self._lock:
+            if self._sync_pid == pid:
+                return
+            self._sync_pid = pid
+            self._conn = None
+            self._read_conn = None
+            self._last_sync = 0.0
+            self._sync_thread = threading.Thread(
+                target=self._sync_loop, name='rate-limit-sync', daemon=True
+            )
+            self._sync_thread.start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as error:
+                logger.warning("同步共享限流状态失败，本周期按进程内限流: %s", error)
+
+    def _open_shared(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.shared_path, timeout=0.1, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_buckets_updated_at ON rate_buckets (updated_at)"
+        )
+        return conn
+
+    def _shared_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open_shared()
+        return self._conn
+
+    def _load_shared(self, key: str) -> Optional[Tuple[float, float]]:
+        """读取 key 在共享状态中的 (tokens, updated_at)，没有记录或共享文件不可用时返回 None"""
+        try:
+            if self._read_conn is None:
+                self._read_conn = self._open_shared()
+            return self._read_conn.execute(
+                "SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as error:
+            logger.warning("读取共享限流状态失败，按进程内限流: %s", error)
+            return None
+
+    def sync(self):
+        """
+        把上次同步以来本 worker 的消耗合并到共享状态，并拉取其它 worker 更新过的桶
+
+        由后台线程定期调用；共享文件不可用时抛出 sqlite3.Error，本次的消耗不再合并（只会放宽一次）。
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        now = time.time()
+        since = self._last_sync
+        conn = self._shared_conn()
+        conn.execute("BEGIN IMMEDIATE" if pending else "BEGIN")
+        try:
+            for key, used in pending.items():
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = self._refill(row[0], row[1], now) if row else self.burst
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, max(0.0, tokens - used), now),
+                )
+            # 本 worker 刚写入的和其它 worker 上次同步以来写入的桶（多读一个周期，避免漏掉
+            # 时间戳早于上次同步、提交却晚于上次同步的写入）
+            rows = conn.execute(
+                "SELECT key, tokens, updated_at FROM rate_buckets WHERE updated_at >= ?",
+                (min(since, now) - self.sync_interval,),
+            ).fetchall()
+            self._syncs += 1
+            if pending and self._syncs % _PRUNE_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM rate_buckets WHERE updated_at < ?",
+                    (now - self.burst / self.rate,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._last_sync = now
+
+        with self._lock:
+            for key, tokens, updated_at in rows:
+                # 同步期间本地又放行的请求从共享结果中扣除
+                tokens = self._refill(tokens, updated_at, now) - self._pending.get(key, 0)
+                self._remember(self._buckets, key, (max(0.0, tokens), now))